@@ -42,6 +42,15 @@ try:
     cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS delivery_date TIMESTAMP;")
     cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS volume_m3 DECIMAL(10, 2);")
     
+    # Rate sheet quote stored with each order
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS manufacturer VARCHAR(255);")
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS quoted_rate DECIMAL(10, 2);")
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS quote_warehouse VARCHAR(255);")
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS quote_destination VARCHAR(255);")
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS rate_sheet_version VARCHAR(32);")
+    cursor.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS quoted_at TIMESTAMP;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_orders_manufacturer ON orders (manufacturer);")
+    
     # Commit the changes
     conn.commit()
     logger.info("Columns added successfully")
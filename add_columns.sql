@@ -1,3 +1,12 @@
 -- Add missing columns to orders table
 ALTER TABLE orders ADD COLUMN IF NOT EXISTS delivery_date TIMESTAMP;
 ALTER TABLE orders ADD COLUMN IF NOT EXISTS volume_m3 DECIMAL(10, 2);
+
+-- Rate sheet quote stored with each order
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS manufacturer VARCHAR(255);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS quoted_rate DECIMAL(10, 2);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS quote_warehouse VARCHAR(255);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS quote_destination VARCHAR(255);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS rate_sheet_version VARCHAR(32);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS quoted_at TIMESTAMP;
+CREATE INDEX IF NOT EXISTS ix_orders_manufacturer ON orders (manufacturer);
@@ -0,0 +1,96 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+from sqlalchemy.orm import Session
+
+from ..database import get_db, SessionLocal
+from ..models.order_models import OrderAssignment, OrderFilterRequest, OrderStatus
+from ..models.optimization_models import (
+    OptimizationImprovement, OptimizationJob, OptimizationJobRequest, OptimizationJobResult, OptimizationJobStatus,
+    OptimizationStrategyStats
+)
+from ..services.optimization_jobs import OptimizationJobRecord, get_optimization_jobs
+from ..crud.order_crud import get_order, filter_orders
+from .orders import assign_orders
+
+router = APIRouter(prefix="/optimization", tags=["optimization"])
+optimization_jobs = get_optimization_jobs()
+
+async def _assign_orders_in_new_session(assignments: List[OrderAssignment]) -> int:
+    """Assign a finished job's orders; the request's session is closed by then"""
+    db = SessionLocal()
+    try:
+        return await assign_orders(db, assignments)
+    finally:
+        db.close()
+
+def _get_job(job_id: str) -> OptimizationJobRecord:
+    job = optimization_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Optimization job not found")
+    return job
+
+@router.post("/jobs", response_model=OptimizationJob, status_code=202)
+async def submit_optimization_job(request: OptimizationJobRequest, db: Session = Depends(get_db)):
+    """Start optimizing the given orders, or pending orders by priority, in the background"""
+    if request.order_ids:
+        orders = [get_order(db, order_id) for order_id in request.order_ids]
+        missing = [order_id for order_id, order in zip(request.order_ids, orders) if order is None]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Orders not found: {', '.join(missing)}")
+    else:
+        filter_req = OrderFilterRequest(
+            status=[OrderStatus.PENDING],
+            priority=[request.priority] if request.priority else None
+        )
+        orders = filter_orders(db, filter_req)[:request.limit]
+
+    if not orders:
+        raise HTTPException(status_code=400, detail="No orders to optimize")
+
+    job = optimization_jobs.submit(
+        orders, _assign_orders_in_new_session if request.assign else None,
+        request.warm_start, request.decompose, request.portfolio
+    )
+    return await asyncio.to_thread(optimization_jobs.describe, job)
+
+# Describing a solving job reads its progress from the manager process, so these endpoints
+# run on the threadpool rather than the event loop
+@router.get("/jobs", response_model=List[OptimizationJob])
+def list_optimization_jobs():
+    """List optimization jobs, oldest first"""
+    return [optimization_jobs.describe(job) for job in optimization_jobs.list_jobs()]
+
+@router.get("/jobs/{job_id}", response_model=OptimizationJob)
+def get_optimization_job(job_id: str):
+    """Get an optimization job's status and solver progress"""
+    return optimization_jobs.describe(_get_job(job_id))
+
+@router.get("/jobs/{job_id}/result", response_model=OptimizationJobResult)
+def get_optimization_job_result(job_id: str):
+    """Get the assignments of a completed optimization job"""
+    job = _get_job(job_id)
+    if job.status != OptimizationJobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Optimization job is {job.status.value}")
+    return OptimizationJobResult(
+        job_id=job.job_id,
+        assignments=job.assignments,
+        assigned_count=job.assigned_count,
+        stop_reason=job.stop_reason,
+        improvements=[OptimizationImprovement(elapsed=elapsed, objective=objective) for elapsed, objective in job.improvements]
+    )
+
+@router.delete("/jobs/{job_id}", response_model=OptimizationJob)
+async def cancel_optimization_job(job_id: str):
+    """Cancel an optimization job; nothing is assigned"""
+    job = await optimization_jobs.cancel_async(job_id) or _get_job(job_id)
+    return await asyncio.to_thread(optimization_jobs.describe, job)
+
+@router.get("/strategies", response_model=List[OptimizationStrategyStats])
+async def get_strategy_stats():
+    """How often each search strategy found the best routes in portfolio solves, most wins first"""
+    stats = [
+        OptimizationStrategyStats(strategy=strategy, **counts)
+        for strategy, counts in optimization_jobs.engine.strategy_stats.items()
+    ]
+    return sorted(stats, key=lambda item: (-item.wins, item.strategy))
@@ -4,8 +4,10 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..models.order_models import Order, OrderStatus, OrderPriority, OrderUpdateRequest, OrderFilterRequest
-from ..services.optimization_engine import OptimizationEngine
+from ..models.order_models import (
+    Order, OrderAssignment, OrderStatus, OrderPriority, OrderUpdateRequest, OrderFilterRequest, QuoteBackfillResponse
+)
+from ..services.optimization_engine import get_optimization_engine
 from ..services.samsara_service import SamsaraService
 from ..crud.order_crud import (
     create_order,
@@ -13,17 +15,21 @@ from ..crud.order_crud import (
     get_orders,
     update_order,
     delete_order,
-    filter_orders
+    filter_orders,
+    backfill_order_quotes,
+    quote_order_async
 )
 
 router = APIRouter(prefix="/orders", tags=["orders"])
-optimization_engine = OptimizationEngine()
+optimization_engine = get_optimization_engine()
 samsara_service = SamsaraService()
 
 @router.post("/", response_model=Order)
 async def create_new_order(order: Order, db: Session = Depends(get_db)):
     """Create a new transportation order"""
-    return create_order(db, order)
+    # Quote off the event loop; a cold rate sheet would otherwise stall every request
+    order = await quote_order_async(order)
+    return create_order(db, order, quote=False)
 
 @router.get("/{order_id}", response_model=Order)
 async def get_order_by_id(order_id: str, db: Session = Depends(get_db)):
@@ -75,26 +81,35 @@ async def filter_orders_by_criteria(filter_request: OrderFilterRequest, db: Sess
     """Filter orders by various criteria"""
     return filter_orders(db, filter_request)
 
+@router.post("/quotes/backfill", response_model=QuoteBackfillResponse)
+def backfill_quotes(
+    only_missing: bool = Query(True, description="Only quote orders without a quote"),
+    db: Session = Depends(get_db)
+):
+    """Quote stored orders, each from the rate sheet version in effect at its pickup date"""
+    return backfill_order_quotes(db, only_missing=only_missing)
+
 @router.post("/{order_id}/optimize", response_model=bool)
-async def optimize_order(order_id: str, db: Session = Depends(get_db)):
-    """Optimize a single order assignment"""
+async def optimize_order(order_id: str, full: bool = False, db: Session = Depends(get_db)):
+    """Optimize a single order assignment (inserted into the current plan unless full is set)"""
     db_order = get_order(db, order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
     # Run optimization for this order
-    assignments = await optimization_engine.optimize_assignments([db_order])
+    plan = await optimization_engine.plan_assignments([db_order], fast_path=False if full else None)
     
-    if not assignments:
+    if not plan or not plan.assignments:
         raise HTTPException(status_code=400, detail="Could not find optimal assignment")
     
     # Assign the order in Samsara
-    assignment_success = await samsara_service.assign_order(assignments[0])
+    assignment_success = await samsara_service.assign_order(plan.assignments[0])
     
     if assignment_success:
         # Update order status to assigned
         order_update = OrderUpdateRequest(status=OrderStatus.ASSIGNED)
         update_order(db, order_id, order_update)
+        optimization_engine.accept_plan(plan)
         
     return assignment_success
 
@@ -102,9 +117,10 @@ async def optimize_order(order_id: str, db: Session = Depends(get_db)):
 async def optimize_pending_orders(
     priority: Optional[OrderPriority] = None,
     limit: int = 10,
+    full: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Optimize multiple pending orders"""
+    """Optimize multiple pending orders (small batches are inserted into the current plan unless full is set)"""
     # Get pending orders
     filter_req = OrderFilterRequest(
         status=[OrderStatus.PENDING],
@@ -116,9 +132,22 @@ async def optimize_pending_orders(
         return 0
     
     # Run optimization
-    assignments = await optimization_engine.optimize_assignments(pending_orders)
+    plan = await optimization_engine.plan_assignments(pending_orders, fast_path=False if full else None)
+    if plan is None:
+        return 0
+    
+    assigned_count = await assign_orders(db, plan.assignments)
+    if assigned_count:
+        optimization_engine.accept_plan(plan)
+    return assigned_count
+
+async def assign_orders(db: Session, assignments: List[OrderAssignment]) -> int:
+    """
+    Assign orders in Samsara and mark them assigned
     
-    # Assign orders in Samsara and update status
+    Returns:
+        Number of orders assigned
+    """
     assigned_count = 0
     for assignment in assignments:
         assignment_success = await samsara_service.assign_order(assignment)
@@ -1,70 +1,222 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from email.utils import formatdate, parsedate_to_datetime
 from typing import List, Optional, Dict
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..models.rate_models import RateRequest, RateResponse, BulkRateRequest, BulkRateResponse
-from ..services.rate_service import RateService
+from ..models.rate_models import (
+    RateRequest, RateResponse, BulkRateRequest, BulkRateResponse, TariffMatrixResponse, CarrierComparisonResponse,
+    DestinationMatchResponse, RateSheetVersionsResponse, AutocompleteResponse
+)
+from ..services.rate_service import get_rate_service
+from ..services.rate_metadata import MetadataEntry
+from ..services.bulk_quoting import quote_ndjson, spool_body
+from ..services.carrier_rate_service import CarrierRateService
 
 router = APIRouter(prefix="/rates", tags=["rates"])
-rate_service = RateService()
+rate_service = get_rate_service()
+carrier_rate_service = CarrierRateService()
+
+# Largest weight grid accepted by /tariff
+MAX_TARIFF_WEIGHTS = 1000
+
+# Most suggestions returned by /autocomplete
+MAX_AUTOCOMPLETE_RESULTS = 50
+
+def metadata_response(request: Request, entry: MetadataEntry, key: str) -> Response:
+    """Serve a metadata list with ETag/Last-Modified, or 304 if the client already holds this version"""
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",  # Clients may keep it but must revalidate
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                if int(entry.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp():
+                    return Response(status_code=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+    
+    return JSONResponse({key: entry.data}, headers=headers)
 
 @router.get("/manufacturers")
-def get_manufacturers():
+def get_manufacturers(request: Request):
     """Get list of available manufacturers"""
-    return {"manufacturers": rate_service.get_available_manufacturers()}
+    return metadata_response(request, rate_service.get_manufacturers_metadata(), "manufacturers")
 
 @router.get("/warehouses")
-def get_warehouses(manufacturer: str):
+def get_warehouses(request: Request, manufacturer: str):
     """Get list of warehouses for a manufacturer"""
-    warehouses = rate_service.get_warehouses(manufacturer)
-    if not warehouses:
+    entry = rate_service.get_warehouses_metadata(manufacturer)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Manufacturer not found.")
-    return {"warehouses": warehouses}
+    return metadata_response(request, entry, "warehouses")
 
 @router.get("/destinations")
-def get_destinations(manufacturer: str, warehouse: str):
+def get_destinations(request: Request, manufacturer: str, warehouse: str):
     """Get list of destinations for a manufacturer and warehouse"""
-    destinations = rate_service.get_destinations(manufacturer, warehouse)
-    if not destinations:
+    entry = rate_service.get_destinations_metadata(manufacturer, warehouse)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Warehouse data not found.")
-    return {"destinations": destinations}
+    return metadata_response(request, entry, "destinations")
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+def autocomplete_destination(
+    q: str,
+    limit: int = Query(default=10, ge=1, le=MAX_AUTOCOMPLETE_RESULTS),
+    manufacturer: Optional[str] = None,
+    warehouse: Optional[str] = None
+):
+    """Suggest destinations starting with what the user typed, across every rate sheet"""
+    suggestions = rate_service.get_destination_index().search(q, limit, manufacturer, warehouse)
+    return AutocompleteResponse(query=q, suggestions=suggestions)
+
+@router.get("/resolve-destination", response_model=DestinationMatchResponse)
+def resolve_destination(manufacturer: str, warehouse: str, destination: str):
+    """Match a misspelled or differently formatted destination to the rate sheet"""
+    match = rate_service.resolve_destination(manufacturer, warehouse, destination)
+    if match is None:
+        raise HTTPException(status_code=404, detail="No matching destination found.")
+    return DestinationMatchResponse(query=destination, destination=match.destination, match_score=match.score)
 
 @router.post("/calculate", response_model=RateResponse)
 async def calculate_freight_rate(request: RateRequest):
     """Calculate rate for a single route"""
-    rate = rate_service.calculate_rate(request)
+    # Sheet loading runs on the rate service's loader pool, so a cold sheet does not block the event loop
+    rate, compiled = await rate_service.quote_rate_async(request)
     if rate == 0.0:
         raise HTTPException(status_code=404, detail="Rate data not found.")
-    return RateResponse(rate=rate)
+    match = compiled.resolve(request.destination)
+    return RateResponse(
+        rate=rate,
+        destination=match.destination if match else None,
+        match_score=match.score if match else None
+    )
 
 @router.post("/bulk-calculate", response_model=BulkRateResponse)
 async def calculate_bulk_rates(request: BulkRateRequest):
     """Calculate rates for multiple routes"""
-    rates = []
-    for req in request.requests:
+    # Routes without rate data come back as 0.0
+    rates = await rate_service.calculate_rates_async(request.requests)
+    return BulkRateResponse(rates=rates)
+
+@router.post("/bulk-calculate/stream")
+async def calculate_bulk_rates_stream(request: Request):
+    """
+    Calculate rates for an NDJSON stream of routes
+
+    Each request line ({"manufacturer", "warehouse", "destination", "weight"}, optional "id")
+    gets one result line ({"line", "id", "rate"} or {"line", "id", "error"}). The body is
+    spooled (to disk past a few MB) and then priced chunk by chunk, each chunk streamed back
+    as soon as it is done, so memory stays flat however many lines are sent.
+    """
+    body = await spool_body(request.stream())
+    
+    def results():
         try:
-            rate = rate_service.calculate_rate(req)
-            rates.append(rate)
-        except Exception:
-            # Skip routes with errors
-            rates.append(0.0)
+            yield from quote_ndjson(rate_service, body)
+        finally:
+            body.close()
     
-    return BulkRateResponse(rates=rates)
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.get("/tariff", response_model=TariffMatrixResponse)
+def get_tariff_matrix(
+    manufacturer: str,
+    warehouse: str,
+    weights: Optional[str] = Query(default=None, description="Comma-separated weights in lbs; overrides the range below"),
+    min_weight: float = 1000,
+    max_weight: float = 40000,
+    step: float = 1000
+):
+    """Get rates for every destination of a warehouse across a weight grid"""
+    if weights:
+        try:
+            grid = [float(weight) for weight in weights.split(",") if weight.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Weights must be comma-separated numbers.")
+        if not all(math.isfinite(weight) and weight >= 0 for weight in grid):
+            raise HTTPException(status_code=400, detail="Weights must be finite and not negative.")
+    else:
+        if not all(math.isfinite(value) and value >= 0 for value in (min_weight, max_weight, step)):
+            raise HTTPException(status_code=400, detail="Weight range must be finite and not negative.")
+        if step <= 0 or max_weight < min_weight:
+            raise HTTPException(status_code=400, detail="Invalid weight range.")
+        count = int((max_weight - min_weight) // step) + 1
+        if count > MAX_TARIFF_WEIGHTS:
+            raise HTTPException(status_code=400, detail=f"Weight grid is limited to {MAX_TARIFF_WEIGHTS} weights.")
+        grid = [min_weight + i * step for i in range(count)]
+    
+    if not grid or len(grid) > MAX_TARIFF_WEIGHTS:
+        raise HTTPException(status_code=400, detail=f"Weight grid must have 1 to {MAX_TARIFF_WEIGHTS} weights.")
+    
+    tariff = rate_service.get_tariff_matrix(manufacturer, warehouse, grid)
+    if tariff is None or not tariff["destinations"]:
+        raise HTTPException(status_code=404, detail="Warehouse data not found.")
+    return tariff
+
+@router.get("/carriers")
+def get_carriers():
+    """Get list of carriers with rate tables"""
+    return {"carriers": carrier_rate_service.get_carriers()}
+
+@router.get("/carriers/{carrier}")
+def get_carrier_rates(carrier: str):
+    """Get a carrier's rate table"""
+    rates = carrier_rate_service.get_carrier_rates(carrier)
+    if rates is None:
+        raise HTTPException(status_code=404, detail="Carrier not found.")
+    return rates
+
+@router.post("/carriers/compare", response_model=CarrierComparisonResponse)
+def compare_carriers(request: BulkRateRequest):
+    """Find the cheapest carrier for each shipment (warehouse is the origin, weight in lbs)"""
+    # A sync endpoint, so FastAPI runs the pricing on its threadpool rather than the event loop
+    return CarrierComparisonResponse(results=carrier_rate_service.find_cheapest(request.requests))
 
 @router.get("/rate")
 def get_cached_rate(manufacturer: str, warehouse: str, destination: str, weight: float):
-    """Get cached rate if available"""
+    """Get rate from the lane cache if the lane has been quoted before"""
     rate = rate_service.get_cached_rate(manufacturer, warehouse, destination, weight)
     if rate is None:
         raise HTTPException(status_code=404, detail="Rate not found in cache.")
     return {"rate": rate}
 
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Get lane cache size and hit/miss/eviction counters"""
+    return rate_service.get_cache_stats()
+
+@router.get("/versions", response_model=RateSheetVersionsResponse)
+def get_sheet_versions(manufacturer: str, warehouse: str):
+    """Get the effective-dated versions of a rate sheet, oldest first"""
+    return RateSheetVersionsResponse(
+        manufacturer=manufacturer,
+        warehouse=warehouse,
+        versions=rate_service.rate_history.get_versions(manufacturer, warehouse)
+    )
+
+@router.get("/reload-events")
+def get_reload_events():
+    """Get recent rate workbook reloads (version and load time of each)"""
+    return {"watching": rate_service.watcher_active, "events": list(rate_service.reload_events)}
+
 # Legacy endpoints for compatibility with optimization engine
 @router.get("/distance")
 async def calculate_distance(origin: str, destination: str):
     """Calculate distance between two locations"""
-    distance = rate_service._calculate_distance(origin, destination)
+    # Only locations from orders and rate sheets are geocoded, not arbitrary request parameters
+    distance = rate_service._calculate_distance(origin, destination, geocode=False)
     if distance == float("inf"):
         raise HTTPException(status_code=404, detail="Location coordinates not found")
     return {"distance_km": distance}
@@ -72,7 +224,7 @@ async def calculate_distance(origin: str, destination: str):
 @router.get("/coordinates")
 def get_location_coordinates(location: str):
     """Get coordinates for a location"""
-    coords = rate_service._get_location_coordinates(location)
+    coords = rate_service._get_location_coordinates(location, geocode=False)
     if not coords:
         raise HTTPException(status_code=404, detail="Location coordinates not found")
     return {"lat": coords[0], "lon": coords[1]}
@@ -0,0 +1 @@
+# This file makes the server/benchmarks directory a Python package
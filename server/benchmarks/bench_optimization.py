@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Optimization Engine Benchmarks
+
+This script generates random vehicle routing instances and compares arc evaluation
+through Python callbacks (how the engine registered its distance and time callbacks
+before) with integer matrices registered natively in OR-Tools. Each instance is solved
+both ways to the same local optimum, timing the solve, and both ways under the same
+guided local search time limit, comparing the objective reached. The matrix model is
+also timed through solve_routing as the engine runs it: with the plateau limit, as
+optimize_routes solves, and with a cancel event as well, as optimization jobs solve. So
+the speedups users see are reported next to the bare one.
+
+Usage:
+    python server/benchmarks/bench_optimization.py [--sizes N,N] [--vehicles N] [--time-limit S] [--plateau-time S] [--output FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import ortools
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from server.benchmarks.bench_rate_service import time_calls
+from server.services.routing_model import (
+    MAX_WAITING_TIME, TIME_HORIZON, UNREACHABLE_DISTANCE, UNREACHABLE_TIME, RoutingProblem, build_routing_model,
+    solve_routing, to_int_matrix
+)
+
+SIZES = [50, 100, 200]
+
+# Plateau settings of the engine (see OptimizationEngine), used for the engine configuration timings
+PLATEAU_IMPROVEMENT = float(os.getenv("PLATEAU_IMPROVEMENT", "0.001"))
+PLATEAU_TIME = float(os.getenv("PLATEAU_TIME", "10"))
+
+# Time limit of the engine configuration solves to the local optimum; the local optimum is reached first
+ENGINE_TIME_LIMIT = 3600  # seconds
+
+
+def make_instance(size: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, int]]]:
+    """
+    Random locations in a 200 km square, the depot at node 0
+
+    Returns:
+        Tuple of (distance_matrix, time_matrix, time_windows) as the engine builds them
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 200, (size, 2))
+    distance_km = np.sqrt(((points[:, np.newaxis, :] - points[np.newaxis, :, :]) ** 2).sum(axis=2))
+    windows = [(0, TIME_HORIZON)] + [
+        (0, int(rng.choice([480, 960, TIME_HORIZON]))) for _ in range(size - 1)
+    ]
+    return to_int_matrix(distance_km * 1000, UNREACHABLE_DISTANCE), to_int_matrix(distance_km, UNREACHABLE_TIME), windows
+
+
+def build_callback_model(distance_matrix: np.ndarray, time_matrix: np.ndarray, time_windows: List[Tuple[int, int]],
+                         num_vehicles: int) -> Tuple[pywrapcp.RoutingIndexManager, pywrapcp.RoutingModel]:
+    """The same model as build_routing_model, with arcs evaluated by Python callbacks over nested lists"""
+    distances = distance_matrix.tolist()
+    times = time_matrix.tolist()
+    manager = pywrapcp.RoutingIndexManager(len(distances), num_vehicles, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        return distances[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+    def time_callback(from_index, to_index):
+        return times[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+    routing.SetArcCostEvaluatorOfAllVehicles(routing.RegisterTransitCallback(distance_callback))
+    routing.AddDimension(routing.RegisterTransitCallback(time_callback), MAX_WAITING_TIME, TIME_HORIZON, False, 'Time')
+    time_dimension = routing.GetDimensionOrDie('Time')
+    for node, (earliest, latest) in enumerate(time_windows[1:], start=1):
+        time_dimension.CumulVar(manager.NodeToIndex(node)).SetRange(earliest, latest)
+    for vehicle_id in range(num_vehicles):
+        time_dimension.CumulVar(routing.Start(vehicle_id)).SetRange(*time_windows[0])
+    return manager, routing
+
+
+def solve(model: Tuple[pywrapcp.RoutingIndexManager, pywrapcp.RoutingModel], time_limit: float = 0) -> Dict[str, Any]:
+    """
+    Solve a model with the engine's first solution strategy
+
+    Args:
+        model: (manager, routing) to solve
+        time_limit: Seconds of guided local search, or 0 to stop at the first local optimum
+
+    Returns:
+        Objective (None without a solution) and solve time in ms
+    """
+    _, routing = model
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    if time_limit:
+        search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        search_parameters.time_limit.FromMilliseconds(int(time_limit * 1000))
+    else:
+        search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GREEDY_DESCENT
+
+    start = time.perf_counter()
+    solution = routing.SolveWithParameters(search_parameters)
+    return {
+        "objective": solution.ObjectiveValue() if solution else None,
+        "solve_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def solve_as_engine(distance_matrix: np.ndarray, time_matrix: np.ndarray, time_windows: List[Tuple[int, int]],
+                    num_vehicles: int, plateau_time: float = PLATEAU_TIME, cancellable: bool = False) -> Dict[str, Any]:
+    """
+    Solve to the local optimum through solve_routing with the engine's plateau limit
+
+    Args:
+        cancellable: Attach a cancel event, as optimization jobs do
+
+    Returns:
+        Objective (None without a solution) and solve time in ms
+    """
+    problem = RoutingProblem(
+        distance_matrix, time_matrix, time_windows, num_vehicles, time_limit=ENGINE_TIME_LIMIT,
+        local_search_metaheuristic="GREEDY_DESCENT", plateau_improvement=PLATEAU_IMPROVEMENT, plateau_time=plateau_time
+    )
+    start = time.perf_counter()
+    solution = solve_routing(problem, threading.Event() if cancellable else None)
+    return {
+        "objective": solution.objective if solution else None,
+        "solve_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def run_benchmarks(sizes: List[int] = SIZES, vehicles: int = 5, time_limit: float = 2.0,
+                   repeat: int = 3, seed: int = 0, plateau_time: float = PLATEAU_TIME) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare callback and matrix registration on random instances
+
+    Args:
+        sizes: Number of locations (depot included) per instance
+        vehicles: Vehicles per instance
+        time_limit: Guided local search seconds for the fixed time limit comparison (0 to skip)
+        repeat: Timed solves to the local optimum per registration
+        seed: Seed for the generated instances
+        plateau_time: Plateau time of the engine configuration solves
+
+    Returns:
+        Results keyed by instance size: local optimum timings and objectives of both
+        registrations and of the matrix model solved as the engine and its jobs solve it,
+        the speedup of each over callbacks, and the objectives reached under the time limit
+    """
+    results = {}
+    for size in sizes:
+        distance_matrix, time_matrix, time_windows = make_instance(size, seed + size)
+        builders = {
+            "callback": lambda: build_callback_model(distance_matrix, time_matrix, time_windows, vehicles),
+            "matrix": lambda: build_routing_model(distance_matrix, time_matrix, time_windows, vehicles),
+        }
+
+        result = {}
+        for name, build in builders.items():
+            objectives = []
+            result[name] = time_calls(lambda model: objectives.append(solve(model)["objective"]), repeat, setup=build)
+            result[name]["objective"] = objectives[-1]
+            if time_limit:
+                result[name]["time_limited_objective"] = solve(build(), time_limit)["objective"]
+
+        for name, cancellable in (("engine", False), ("job", True)):
+            objectives = []
+            result[name] = time_calls(
+                lambda _: objectives.append(solve_as_engine(
+                    distance_matrix, time_matrix, time_windows, vehicles, plateau_time, cancellable
+                )["objective"]),
+                repeat
+            )
+            result[name]["objective"] = objectives[-1]
+
+        result["speedup"] = round(result["callback"]["median_ms"] / result["matrix"]["median_ms"], 2)
+        result["engine_speedup"] = round(result["callback"]["median_ms"] / result["engine"]["median_ms"], 2)
+        result["job_speedup"] = round(result["callback"]["median_ms"] / result["job"]["median_ms"], 2)
+        results[str(size)] = result
+    return results
+
+
+def main():
+    """Main function to run the benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark callback versus matrix arc evaluation in the routing solver")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES), help="Comma-separated location counts")
+    parser.add_argument("--vehicles", type=int, default=5, help="Vehicles per instance")
+    parser.add_argument("--time-limit", type=float, default=2.0, help="Seconds of guided local search for the objective comparison (0 to skip)")
+    parser.add_argument("--plateau-time", type=float, default=PLATEAU_TIME, help="Plateau time of the engine configuration solves (default: PLATEAU_TIME)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed solves per registration")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated instances")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmark_results/optimization-<time>.json)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = run_benchmarks(sizes, args.vehicles, args.time_limit, args.repeat, args.seed, args.plateau_time)
+
+    for size, result in results.items():
+        print(f"  {size:>5} locations  callback {result['callback']['median_ms']:>10.1f} ms  "
+              f"matrix {result['matrix']['median_ms']:>10.1f} ms  x{result['speedup']:.2f}  "
+              f"engine {result['engine']['median_ms']:>10.1f} ms  x{result['engine_speedup']:.2f}  "
+              f"job {result['job']['median_ms']:>10.1f} ms  x{result['job_speedup']:.2f}")
+        if args.time_limit:
+            print(f"  {'':>5}            objective after {args.time_limit:g}s: "
+                  f"callback {result['callback']['time_limited_objective']}  matrix {result['matrix']['time_limited_objective']}")
+
+    report = {
+        "benchmark": "optimization",
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "ortools": ortools.__version__,
+        },
+        "config": {
+            "sizes": sizes,
+            "vehicles": args.vehicles,
+            "time_limit": args.time_limit,
+            "plateau_improvement": PLATEAU_IMPROVEMENT,
+            "plateau_time": args.plateau_time,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        "benchmark_results", f"optimization-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
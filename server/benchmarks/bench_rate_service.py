@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Rate Service Benchmarks
+
+This script generates synthetic multi-sheet rate workbooks and measures the rate
+service: sheet loading, single quotes cold and warm, destination lists and bulk
+quoting. Results are written as JSON and can be compared against an earlier run.
+
+Usage:
+    python server/benchmarks/bench_rate_service.py [--destinations N] [--warehouses N] [--output FILE] [--compare FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from server.benchmarks.rate_sheet_generator import generate_workbook
+from server.models.rate_models import RateRequest
+from server.services.rate_service import RateService
+from server.services.rate_snapshot import compile_workbook
+
+BULK_SIZES = [1000, 10000, 100000]
+
+# A benchmark whose median is this much slower than the baseline counts as a regression
+REGRESSION_THRESHOLD = 1.25
+
+
+def time_calls(fn: Callable[[Any], Any], repeat: int, setup: Optional[Callable[[], Any]] = None, ops: int = 1) -> Dict[str, float]:
+    """
+    Time repeated runs of a function
+
+    Args:
+        fn: Function to time; receives the value returned by setup (or None)
+        repeat: Number of timed runs
+        setup: Untimed preparation before each run
+        ops: Operations performed by one run, for the throughput figure
+
+    Returns:
+        Run count, min/median/mean/max run time in ms and operations per second
+    """
+    durations = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    median = statistics.median(durations)
+    return {
+        "runs": repeat,
+        "ops_per_run": ops,
+        "min_ms": round(min(durations), 4),
+        "median_ms": round(median, 4),
+        "mean_ms": round(statistics.mean(durations), 4),
+        "max_ms": round(max(durations), 4),
+        "ops_per_sec": round(ops / (median / 1000), 1) if median > 0 else None,
+    }
+
+
+def make_service(rate_sheets_dir: str) -> RateService:
+    """Create a rate service that parses the workbooks directly (no snapshot, no watcher)"""
+    service = RateService()
+    service.rate_sheets_dir = rate_sheets_dir
+    service.snapshot_dir = None
+    service.history_dir = None
+    return service
+
+
+def make_requests(manufacturer: str, sheets: Dict[str, List[str]], count: int, seed: int = 0) -> List[RateRequest]:
+    """Random shipments across every sheet of a workbook, weights across all brackets"""
+    rng = np.random.default_rng(seed)
+    warehouses = list(sheets)
+    weights = rng.uniform(100, 45000, count).round(1)
+    requests = []
+    for i in range(count):
+        warehouse = warehouses[rng.integers(len(warehouses))]
+        destinations = sheets[warehouse]
+        requests.append(RateRequest(
+            manufacturer=manufacturer,
+            warehouse=warehouse,
+            destination=destinations[rng.integers(len(destinations))],
+            weight=float(weights[i])
+        ))
+    return requests
+
+
+def run_benchmarks(rate_sheets_dir: str, manufacturer: str, sheets: Dict[str, List[str]],
+                   bulk_sizes: List[int] = BULK_SIZES, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Run every rate service benchmark against a generated workbook
+
+    Args:
+        rate_sheets_dir: Directory containing the workbook
+        manufacturer: Workbook name
+        sheets: Destinations of each sheet keyed by warehouse
+        bulk_sizes: Request counts for the bulk quoting benchmarks
+        repeat: Timed runs per benchmark
+
+    Returns:
+        Timings keyed by benchmark name
+    """
+    warehouse = next(iter(sheets))
+    file_path = os.path.join(rate_sheets_dir, f"{manufacturer}.xlsx")
+    single = make_requests(manufacturer, {warehouse: sheets[warehouse]}, 1)[0]
+    results = {}
+
+    # Parsing: one sheet through pandas, and the whole workbook into compiled sheets
+    service = make_service(rate_sheets_dir)
+    results["get_rates"] = time_calls(lambda _: service.get_rates(manufacturer, warehouse), repeat)
+    results["compile_workbook"] = time_calls(lambda _: compile_workbook(file_path), max(1, repeat // 2), ops=len(sheets))
+
+    # First quote on a fresh service: parse and compile the sheet, then price
+    results["calculate_rate_cold"] = time_calls(
+        lambda cold: cold.calculate_rate(single), repeat, setup=lambda: make_service(rate_sheets_dir)
+    )
+
+    # Quotes and destination lists once every sheet is compiled
+    warm = make_service(rate_sheets_dir)
+    quotes = make_requests(manufacturer, sheets, 1000, seed=1)
+    for request in quotes:
+        warm.calculate_rate(request)
+    results["calculate_rate_warm"] = time_calls(
+        lambda _: [warm.calculate_rate(request) for request in quotes], repeat, ops=len(quotes)
+    )
+    results["get_destinations_warm"] = time_calls(
+        lambda _: [warm.get_destinations(manufacturer, w) for w in sheets], repeat, ops=len(sheets)
+    )
+
+    for size in bulk_sizes:
+        requests = make_requests(manufacturer, sheets, size, seed=size)
+        results[f"calculate_rates_{size}"] = time_calls(lambda _: warm.calculate_rates(requests), repeat, ops=size)
+
+    return results
+
+
+def compare_results(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                    threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Compare median run times against a baseline run
+
+    Returns:
+        Names of the benchmarks that got slower by more than the threshold
+    """
+    regressions = []
+    for name, timing in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("median_ms"):
+            continue
+        ratio = timing["median_ms"] / previous["median_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"  {name:<28} {previous['median_ms']:>12.3f} ms -> {timing['median_ms']:>12.3f} ms  x{ratio:.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """Main function to run the benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark the rate service on synthetic rate workbooks")
+    parser.add_argument("--destinations", type=int, default=3000, help="Destinations per sheet")
+    parser.add_argument("--warehouses", type=int, default=4, help="Warehouse sheets in the workbook")
+    parser.add_argument("--bulk-sizes", default=",".join(str(size) for size in BULK_SIZES), help="Comma-separated bulk request counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated workbook and requests")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmark_results/rate_service-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    rate_sheets_dir = tempfile.mkdtemp(prefix="rate_bench_")
+    try:
+        manufacturer = "Bench"
+        print(f"Generating workbook: {args.warehouses} sheets x {args.destinations} destinations")
+        sheets = generate_workbook(
+            os.path.join(rate_sheets_dir, f"{manufacturer}.xlsx"), args.warehouses, args.destinations, args.seed
+        )
+        bulk_sizes = [int(size) for size in args.bulk_sizes.split(",") if size.strip()]
+        results = run_benchmarks(rate_sheets_dir, manufacturer, sheets, bulk_sizes, args.repeat)
+    finally:
+        shutil.rmtree(rate_sheets_dir, ignore_errors=True)
+
+    for name, timing in results.items():
+        print(f"  {name:<28} median {timing['median_ms']:>12.3f} ms  {timing['ops_per_sec'] or 0:>14,.0f} ops/s")
+
+    report = {
+        "benchmark": "rate_service",
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "config": {
+            "destinations": args.destinations,
+            "warehouses": args.warehouses,
+            "bulk_sizes": bulk_sizes,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        "benchmark_results", f"rate_service-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        if baseline.get("config") != report["config"]:
+            print(f"  Warning: baseline config {baseline.get('config')} differs from this run")
+        regressions = compare_results(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+PROVINCES = ["AB", "BC", "MB", "SK", "ON", "QC"]
+
+# Per-bracket rate relative to the 0-1999 lbs rate, as in the manufacturers' sheets
+BRACKET_FACTORS = [1.0, 0.906, 0.625, 0.406, 0.266]
+
+# Columns of a manufacturer rate sheet (the first header names the origin warehouse)
+RATE_SHEET_COLUMNS = [
+    "Prov", "Minimum", "0 - 1999lbs", "2000 -4999lbs", "5000 -9999lbs", "10000 - 19999lbs", "20000 lbs +", "T/L Rates"
+]
+
+
+def destination_names(count: int, seed: int = 0) -> List[str]:
+    """Generate unique, town-like destination names"""
+    rng = np.random.default_rng(seed)
+    prefixes = ["Fort", "Port", "Lake", "Mount", "St.", "New", "North", "Grand", "", "", "", ""]
+    stems = ["Ald", "Bren", "Cam", "Dray", "Elk", "Fair", "Glen", "Hay", "Kin", "Lang", "Mel", "Nip",
+             "Oak", "Pil", "Ros", "Sel", "Tis", "Ver", "Wey", "York"]
+    suffixes = ["ton", "ville", "wood", "dale", "field", "burg", "mere", "view", "ford", "brook"]
+
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = f"{rng.choice(prefixes)} {rng.choice(stems)}{rng.choice(suffixes)}".strip()
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def generate_rate_sheet(warehouse: str, destinations: List[str], seed: int = 0) -> pd.DataFrame:
+    """
+    Generate one warehouse sheet in the layout of the manufacturers' rate sheets
+
+    Args:
+        warehouse: Origin warehouse, used in the first column header
+        destinations: Destination names, one row each
+        seed: Random seed
+
+    Returns:
+        Sheet with destination, province, minimum, bracket and truckload columns
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(8.0, 45.0, len(destinations)).round(4)  # 0-1999 lbs rate per 100 lbs
+    df = pd.DataFrame({f"Ex {warehouse}\nto destination": destinations})
+    df["Prov"] = rng.choice(PROVINCES, len(destinations))
+    df["Minimum"] = (base * 10).round(3)
+    for column, factor in zip(RATE_SHEET_COLUMNS[2:7], BRACKET_FACTORS):
+        df[column] = (base * factor).round(5)
+    df["T/L Rates"] = (base * 100).round(1)
+
+    # Sheets group destinations with blank rows in between
+    blank = pd.DataFrame([[None] * len(df.columns)], columns=df.columns)
+    groups = np.array_split(np.arange(len(df)), max(1, len(df) // 50))
+    return pd.concat([part for rows in groups for part in (df.iloc[rows], blank)], ignore_index=True)
+
+
+def generate_workbook(file_path: str, warehouses: int = 4, destinations: int = 2000, seed: int = 0) -> Dict[str, List[str]]:
+    """
+    Write a synthetic manufacturer workbook with one sheet per warehouse
+
+    Args:
+        file_path: Path of the .xlsx file to write
+        warehouses: Number of warehouse sheets
+        destinations: Destinations per sheet
+        seed: Random seed (the same seed writes the same workbook)
+
+    Returns:
+        Destinations of each sheet keyed by warehouse
+    """
+    names = destination_names(destinations, seed)
+    sheets = {}
+    with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
+        for i in range(warehouses):
+            warehouse = f"Warehouse {i + 1}"
+            generate_rate_sheet(warehouse, names, seed + i + 1).to_excel(writer, sheet_name=warehouse, index=False)
+            sheets[warehouse] = names
+    return sheets
+
+
+def generate_rate_sheets(rate_sheets_dir: str, manufacturers: int = 2, warehouses: int = 4, destinations: int = 2000,
+                         seed: int = 0, prefix: str = "Bench") -> Dict[str, Dict[str, List[str]]]:
+    """Write several synthetic manufacturer workbooks to a directory; returns their sheets keyed by manufacturer"""
+    os.makedirs(rate_sheets_dir, exist_ok=True)
+    workbooks = {}
+    for i in range(manufacturers):
+        manufacturer = f"{prefix}{i + 1}"
+        workbooks[manufacturer] = generate_workbook(
+            os.path.join(rate_sheets_dir, f"{manufacturer}.xlsx"), warehouses, destinations, seed + 100 * i
+        )
+    return workbooks
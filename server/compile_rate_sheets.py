@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Rate Sheet Compiler
+
+This script compiles the Excel rate sheets in rate_sheets/ into a binary snapshot
+that the rate service loads at startup instead of parsing the workbooks.
+Only workbooks that changed since the last snapshot are reparsed, and their new
+versions are recorded in the rate history.
+
+Usage:
+    python compile_rate_sheets.py [--rate-sheets-dir DIR] [--snapshot-dir DIR] [--history-dir DIR] [--workers N] [--force]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services.rate_snapshot import compile_rate_sheets
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("RateSheetCompiler")
+
+def main():
+    """Main function to compile the rate sheets"""
+    parser = argparse.ArgumentParser(description="Compile Excel rate sheets into a binary snapshot")
+    parser.add_argument("--rate-sheets-dir", default="./rate_sheets/", help="Directory containing the .xlsx rate sheets")
+    parser.add_argument("--snapshot-dir", default=os.getenv("RATE_SNAPSHOT_DIR", "./rate_snapshots/"), help="Directory to write the snapshot to")
+    parser.add_argument("--history-dir", default=os.getenv("RATE_HISTORY_DIR", "./rate_history/"), help="Directory to record new rate sheet versions in")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parser processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Reparse every workbook even if the snapshot is current")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    snapshot = compile_rate_sheets(args.rate_sheets_dir, args.snapshot_dir, max_workers=args.workers, force=args.force,
+                                   history_dir=args.history_dir)
+    
+    if snapshot is None:
+        logger.error(f"No rate sheets found in {args.rate_sheets_dir}")
+        sys.exit(1)
+    
+    logger.info(f"Rate snapshot {snapshot.version} ready in {time.perf_counter() - start:.2f}s "
+                f"({len(snapshot.get_manufacturers())} manufacturers, {len(snapshot.rates)} rate rows)")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,50 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 from ..models.order_models import Order, OrderStatus, OrderPriority, OrderUpdateRequest, OrderFilterRequest
 from ..database.models import OrderModel
+from ..services.rate_service import LBS_PER_KG, get_rate_service
 
-def create_order(db: Session, order: Order) -> Order:
-    """Create a new order in the database"""
+def _quote_fields(quote: Dict[str, Any], quoted_at: datetime) -> Dict[str, Any]:
+    """Map a rate service quote to the order's quote columns"""
+    return {
+        "quoted_rate": quote["rate"],
+        "quote_warehouse": quote["warehouse"],
+        "quote_destination": quote["destination"],
+        "rate_sheet_version": quote["version"],
+        "quoted_at": quoted_at,
+    }
+
+def apply_quote(order: Order, quote: Dict[str, Any]) -> Order:
+    """Copy of an order carrying a rate service quote, quoted now"""
+    return order.model_copy(update=_quote_fields(quote, datetime.utcnow()))
+
+def quote_order(order: Order) -> Order:
+    """Price an order against its manufacturer's rate sheets (unchanged if already quoted or unpriceable)"""
+    if not order.manufacturer or order.quoted_rate is not None:
+        return order
+    
+    quote = get_rate_service().quote_orders([order])[0]
+    if quote is None:
+        return order
+    return apply_quote(order, quote)
+
+async def quote_order_async(order: Order) -> Order:
+    """quote_order for async endpoints: the rate sheets are read off the event loop"""
+    if not order.manufacturer or order.quoted_rate is not None:
+        return order
+    
+    quote = (await get_rate_service().quote_orders_async([order]))[0]
+    if quote is None:
+        return order
+    return apply_quote(order, quote)
+
+def create_order(db: Session, order: Order, quote: bool = True) -> Order:
+    """Create a new order in the database, quoting it from the rate sheets (unless quote is False)"""
+    if quote:
+        order = quote_order(order)
     db_order = OrderModel(
         id=order.id,
         customer_id=order.customer_id,
@@ -22,6 +59,12 @@ def create_order(db: Session, order: Order) -> Order:
         volume_m3=order.volume_m3,
         special_requirements=order.special_requirements,
         notes=order.notes,
+        manufacturer=order.manufacturer,
+        quoted_rate=order.quoted_rate,
+        quote_warehouse=order.quote_warehouse,
+        quote_destination=order.quote_destination,
+        rate_sheet_version=order.rate_sheet_version,
+        quoted_at=order.quoted_at,
         created_at=order.created_at,
         updated_at=order.updated_at
     )
@@ -128,6 +171,43 @@ def filter_orders(db: Session, filter_request: OrderFilterRequest) -> List[Order
     
     return [_map_to_order(db_order) for db_order in db_orders]
 
+def backfill_order_quotes(db: Session, only_missing: bool = True) -> Dict[str, int]:
+    """
+    Quote stored orders from the rate sheets, all in one pass
+    
+    Args:
+        db: Database session
+        only_missing: Only quote orders without a quote (False re-quotes every order,
+            each with the rate sheet version in effect at its pickup date)
+    
+    Returns:
+        Number of orders checked, quoted and left unquoted
+    """
+    query = db.query(
+        OrderModel.id, OrderModel.manufacturer, OrderModel.ship_from, OrderModel.ship_to, OrderModel.weight_kg,
+        OrderModel.pickup_date
+    ).filter(OrderModel.manufacturer.isnot(None))
+    
+    if only_missing:
+        query = query.filter(OrderModel.quoted_rate.is_(None))
+    
+    rows = query.all()
+    quotes = get_rate_service().quote_shipments(
+        [(row.manufacturer, row.ship_from, row.ship_to, (row.weight_kg or 0) * LBS_PER_KG) for row in rows],
+        [row.pickup_date for row in rows]
+    )
+    
+    quoted_at = datetime.utcnow()
+    mappings = [
+        {"id": row.id, **_quote_fields(quote, quoted_at)}
+        for row, quote in zip(rows, quotes) if quote is not None
+    ]
+    if mappings:
+        db.bulk_update_mappings(OrderModel, mappings)
+        db.commit()
+    
+    return {"checked": len(rows), "quoted": len(mappings), "unquoted": len(rows) - len(mappings)}
+
 def _map_to_order(db_order: OrderModel) -> Order:
     """Map database model to Pydantic model"""
     return Order(
@@ -144,6 +224,12 @@ def _map_to_order(db_order: OrderModel) -> Order:
         volume_m3=db_order.volume_m3,
         special_requirements=db_order.special_requirements,
         notes=db_order.notes,
+        manufacturer=db_order.manufacturer,
+        quoted_rate=db_order.quoted_rate,
+        quote_warehouse=db_order.quote_warehouse,
+        quote_destination=db_order.quote_destination,
+        rate_sheet_version=db_order.rate_sheet_version,
+        quoted_at=db_order.quoted_at,
         created_at=db_order.created_at,
         updated_at=db_order.updated_at
     )
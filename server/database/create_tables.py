@@ -19,7 +19,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 
 # Import the database models and engine
 from server.database import engine, Base
-from server.database.models import OrderModel, TruckModel, TrailerModel, OrderAssignmentModel
+from server.database.models import OrderModel, TruckModel, TrailerModel, OrderAssignmentModel, LocationModel
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +22,12 @@ class OrderModel(Base):
     volume_m3 = Column(Float, nullable=True)  # Make sure this column is created
     special_requirements = Column(JSON, default={})
     notes = Column(String, nullable=True)
+    manufacturer = Column(String, nullable=True, index=True)
+    quoted_rate = Column(Float, nullable=True)  # Rate sheet price at ingest time
+    quote_warehouse = Column(String, nullable=True)
+    quote_destination = Column(String, nullable=True)
+    rate_sheet_version = Column(String, nullable=True)
+    quoted_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -72,3 +78,15 @@ class OrderAssignmentModel(Base):
     order = relationship("OrderModel", back_populates="assignments")
     truck = relationship("TruckModel", back_populates="assignments")
     trailer = relationship("TrailerModel", back_populates="assignments")
+
+class LocationModel(Base):
+    """SQLAlchemy model for geocoded locations used by the fallback distance calculations"""
+    __tablename__ = "locations"
+    
+    name = Column(String, primary_key=True, index=True)  # Normalized (lowercase, single-spaced) location name
+    display_name = Column(String)
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    source = Column(String)  # "default" or "geocode"
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
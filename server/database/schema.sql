@@ -15,6 +15,12 @@ CREATE TABLE IF NOT EXISTS orders (
   volume_m3 DECIMAL(10, 2),
   special_requirements JSONB DEFAULT '{}',
   notes TEXT,
+  manufacturer VARCHAR(255),
+  quoted_rate DECIMAL(10, 2),
+  quote_warehouse VARCHAR(255),
+  quote_destination VARCHAR(255),
+  rate_sheet_version VARCHAR(32),
+  quoted_at TIMESTAMP,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -50,6 +56,17 @@ CREATE TABLE IF NOT EXISTS order_assignments (
   assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create locations table if it doesn't exist
+CREATE TABLE IF NOT EXISTS locations (
+  name VARCHAR(255) PRIMARY KEY,
+  display_name VARCHAR(255),
+  lat DOUBLE PRECISION NOT NULL,
+  lon DOUBLE PRECISION NOT NULL,
+  source VARCHAR(50),
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create index on status for faster queries
 CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
 
@@ -6,15 +6,19 @@ import os
 import threading
 from dotenv import load_dotenv
 
-from server.database import engine, Base, get_db
+from server.database import engine, Base, get_db, SessionLocal
 from server.database.models import OrderModel, TruckModel, TrailerModel
-from server.api import orders, rates, fleet, pdf
+from server.api import orders, rates, fleet, pdf, optimization
 from server.services.samsara_service import SamsaraService
-from server.services.rate_service import RateService
+from server.services.rate_service import get_rate_service
 from server.services.google_maps_service import GoogleMapsService
 from server.services.weather_service import WeatherService
-from server.services.optimization_engine import OptimizationEngine
+from server.services.optimization_engine import get_optimization_engine
+from server.services.optimization_jobs import get_optimization_jobs
+from server.services.routing_model import shutdown_solver_pool
 from server.services.pdf_watcher_service import PDFWatcherService
+from server.services.location_store import LocationStore
+from server.services.rate_sheet_watcher import RateSheetWatcher
 
 # Load environment variables
 load_dotenv()
@@ -52,13 +56,23 @@ app.include_router(orders.router, prefix="/api")
 app.include_router(rates.router, prefix="/api")
 app.include_router(fleet.router, prefix="/api")
 app.include_router(pdf.router, prefix="/api")
+app.include_router(optimization.router, prefix="/api")
 
 # Initialize services
 samsara_service = SamsaraService()
-rate_service = RateService()
+rate_service = get_rate_service()
 google_maps_service = GoogleMapsService()
 weather_service = WeatherService()
-optimization_engine = OptimizationEngine()
+optimization_engine = get_optimization_engine()
+
+# Runs optimizations as background jobs, solving in a process pool
+optimization_jobs = get_optimization_jobs()
+
+# Location coordinates for fallback distances (geocoded with Google Maps when configured)
+location_store = LocationStore(SessionLocal, GoogleMapsService if os.getenv("GOOGLE_MAPS_API_KEY") else None)
+
+# Recompiles changed rate workbooks in the background and swaps them into the rate service
+rate_sheet_watcher = RateSheetWatcher(rate_service)
 
 # Initialize PDF watcher service
 pdf_watcher_service = None
@@ -89,6 +103,12 @@ async def startup_event():
     else:
         print("Weather API key configured.")
     
+    # Preload stored locations and geocode unknown ones in the background
+    location_count = location_store.load(rate_service.default_coordinates)
+    rate_service.location_store = location_store
+    location_store.start()
+    print(f"Location store loaded {location_count} locations")
+    
     # Start PDF watcher service in a separate thread
     global pdf_watcher_service, pdf_watcher_thread
     pdf_watcher_service = PDFWatcherService()
@@ -105,6 +125,14 @@ async def startup_event():
     pdf_watcher_thread.start()
     print("PDF Watcher Service started in background")
     
+    # Compile any changed rate sheets into the binary snapshot and load them in the background,
+    # then keep watching the workbooks; quotes fall back to the Excel sheets until they are loaded
+    try:
+        rate_sheet_watcher.start()
+        print("Rate sheet watcher started")
+    except Exception as e:
+        print(f"Rate sheet watcher error: {str(e)}")
+    
     print("All services initialized successfully.")
 
 @app.on_event("shutdown")
@@ -121,6 +149,22 @@ async def shutdown_event():
         except Exception as e:
             print(f"Error stopping PDF Watcher Service: {str(e)}")
     
+    # Stop watching rate sheets
+    try:
+        rate_sheet_watcher.stop()
+    except Exception as e:
+        print(f"Error stopping rate sheet watcher: {str(e)}")
+    
+    # Stop background geocoding
+    location_store.stop()
+    
+    # Cancel running optimizations and stop the solver processes
+    try:
+        optimization_jobs.shutdown()
+        shutdown_solver_pool(wait=False)
+    except Exception as e:
+        print(f"Error stopping optimization jobs: {str(e)}")
+    
     # Close other services
     await samsara_service.close()
     await google_maps_service.close()
@@ -156,6 +200,10 @@ async def get_config():
         },
         "optimization_settings": {
             "max_optimization_time": int(os.getenv("MAX_OPTIMIZATION_TIME", "30")),
+            "min_optimization_time": float(os.getenv("MIN_OPTIMIZATION_TIME", "2")),
+            "optimization_time_per_location": float(os.getenv("OPTIMIZATION_TIME_PER_LOCATION", "0.1")),
+            "plateau_improvement": float(os.getenv("PLATEAU_IMPROVEMENT", "0.001")),
+            "plateau_time": float(os.getenv("PLATEAU_TIME", "10")),
             "revenue_weight": float(os.getenv("REVENUE_WEIGHT", "0.5")),
             "cost_weight": float(os.getenv("COST_WEIGHT", "0.3")),
             "time_weight": float(os.getenv("TIME_WEIGHT", "0.2"))
@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+from .order_models import OrderAssignment, OrderPriority
+
+class OptimizationJobStatus(str, Enum):
+    """Enum for optimization job status"""
+    QUEUED = "queued"
+    PREPARING = "preparing"  # Fetching the fleet and building the distance and time matrices
+    SOLVING = "solving"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class OptimizationJobRequest(BaseModel):
+    """Model for an optimization job request: the given orders, or pending orders by priority"""
+    order_ids: Optional[List[str]] = Field(default=None)
+    priority: Optional[OrderPriority] = Field(default=None)
+    limit: int = Field(default=10, ge=1)
+    assign: bool = Field(default=True)  # Assign the orders in Samsara and mark them assigned when the job completes
+    warm_start: bool = Field(default=True)  # Start from the last accepted plan for the depot
+    decompose: Optional[bool] = Field(default=None)  # Solve by region; by default for large problems
+    portfolio: Optional[bool] = Field(default=None)  # Solve with several search strategies at once; by default per OPTIMIZATION_PORTFOLIO
+
+class OptimizationProgress(BaseModel):
+    """Model for the progress of an optimization job's search"""
+    solutions: int = Field(default=0)  # Solutions found so far
+    objective: Optional[int] = Field(default=None)  # Best objective so far
+    elapsed: float = Field(default=0.0)  # Seconds searched
+    time_limit: Optional[float] = Field(default=None)  # Seconds
+
+class OptimizationJob(BaseModel):
+    """Model for an optimization job"""
+    job_id: str
+    status: OptimizationJobStatus
+    order_ids: List[str]
+    created_at: datetime
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
+    progress: OptimizationProgress = Field(default_factory=OptimizationProgress)
+    strategy: Optional[str] = Field(default=None)  # Search strategy of the routes found (first solution/metaheuristic)
+    stop_reason: Optional[str] = Field(default=None)  # Why the search stopped: completed, time_limit, plateau or cancelled
+    error: Optional[str] = Field(default=None)
+
+class OptimizationImprovement(BaseModel):
+    """Model for a new best objective found during a search"""
+    elapsed: float  # Seconds into the search
+    objective: int
+
+class OptimizationJobResult(BaseModel):
+    """Model for the result of a completed optimization job"""
+    job_id: str
+    assignments: List[OrderAssignment]
+    assigned_count: int  # Assignments applied in Samsara and marked assigned
+    stop_reason: Optional[str] = Field(default=None)  # Why the search stopped
+    improvements: List[OptimizationImprovement] = Field(default_factory=list)  # The objective's improvement curve
+
+class OptimizationStrategyStats(BaseModel):
+    """Model for how a search strategy has done in portfolio solves"""
+    strategy: str  # First solution strategy/local search metaheuristic
+    runs: int  # Portfolio solves it took part in
+    wins: int  # Solves where it found the best routes
@@ -32,6 +32,12 @@ class Order(BaseModel):
     volume_m3: Optional[float] = Field(default=None)
     special_requirements: Dict[str, bool] = Field(default_factory=dict)
     notes: Optional[str] = Field(default=None)
+    manufacturer: Optional[str] = Field(default=None)
+    quoted_rate: Optional[float] = Field(default=None)
+    quote_warehouse: Optional[str] = Field(default=None)
+    quote_destination: Optional[str] = Field(default=None)
+    rate_sheet_version: Optional[str] = Field(default=None)
+    quoted_at: Optional[datetime] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -78,3 +84,9 @@ class OrderFilterRequest(BaseModel):
     to_date: Optional[datetime] = Field(default=None)
     ship_from: Optional[str] = Field(default=None)
     ship_to: Optional[str] = Field(default=None)
+
+class QuoteBackfillResponse(BaseModel):
+    """Model for the result of quoting stored orders"""
+    checked: int
+    quoted: int
+    unquoted: int
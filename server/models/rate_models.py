@@ -11,10 +11,35 @@ class RateRequest(BaseModel):
     destination: str
     weight: float
     special_requirements: Optional[List[str]] = Field(default=None)
+    pickup_date: Optional[datetime] = Field(default=None)  # Price with the rate sheet version in effect then
 
 class RateResponse(BaseModel):
     """Model for a rate response"""
     rate: float
+    destination: Optional[str] = Field(default=None)  # Sheet destination the request was matched to
+    match_score: Optional[float] = Field(default=None)  # 1.0 for an exact match, lower for fuzzy matches
+
+class DestinationMatchResponse(BaseModel):
+    """Model for a destination resolved against a rate sheet"""
+    query: str
+    destination: str
+    match_score: float
+
+class SheetReference(BaseModel):
+    """Model for a rate sheet: manufacturer workbook and warehouse sheet"""
+    manufacturer: str
+    warehouse: str
+
+class DestinationSuggestion(BaseModel):
+    """Model for an autocomplete suggestion"""
+    destination: str
+    province: Optional[str] = Field(default=None)
+    sheets: List[SheetReference]  # Sheets with rates to this destination
+
+class AutocompleteResponse(BaseModel):
+    """Model for destination autocomplete results"""
+    query: str
+    suggestions: List[DestinationSuggestion]
 
 class BulkRateRequest(BaseModel):
     """Model for a bulk rate request"""
@@ -24,6 +49,37 @@ class BulkRateResponse(BaseModel):
     """Model for a bulk rate response"""
     rates: List[float]
 
+class TariffMatrixResponse(BaseModel):
+    """Model for a tariff matrix: rate for every destination of a warehouse at every weight in the grid"""
+    manufacturer: str
+    warehouse: str
+    destinations: List[str]
+    weights: List[float]
+    rates: List[List[float]]  # One row per destination, one column per weight (0.0 where the sheet has no rate)
+
+class RateSheetVersion(BaseModel):
+    """Model for one effective-dated version of a rate sheet"""
+    version: str  # Workbook version the sheet was loaded from
+    effective_from: datetime
+    rows: int
+    changed_rows: int  # Rows added or changed since the previous version
+
+class RateSheetVersionsResponse(BaseModel):
+    """Model for the version history of a rate sheet"""
+    manufacturer: str
+    warehouse: str
+    versions: List[RateSheetVersion]
+
+class CarrierQuote(BaseModel):
+    """Model for the carrier comparison of one shipment"""
+    carrier: Optional[str] = Field(default=None)  # Cheapest carrier, None if no carrier can take the shipment
+    cost: Optional[float] = Field(default=None)
+    quotes: Dict[str, Optional[float]] = Field(default_factory=dict)  # Every carrier's price (None if not offered)
+
+class CarrierComparisonResponse(BaseModel):
+    """Model for a carrier comparison response"""
+    results: List[CarrierQuote]
+
 # Legacy models for compatibility with optimization engine
 class LocationCoordinates(BaseModel):
     """Model for location coordinates"""
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Rate Quoting CLI
+
+This script quotes a CSV file of shipments against the rate sheets. Rows are read,
+priced through the vectorized rate engine and written out one chunk at a time, so
+files of any size are quoted in constant memory.
+
+The input needs manufacturer, warehouse, destination and weight (lbs) columns; every
+input column is written back, followed by rate (0.0 where the sheet has no rate) and
+error (for rows that could not be read).
+
+Usage:
+    python quote_rates.py INPUT.csv [--output OUTPUT.csv] [--chunk-size N] [--rate-sheets-dir DIR]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.services.bulk_quoting import BULK_CHUNK_SIZE, quote_csv
+from server.services.rate_service import RateService
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("RateQuoter")
+
+def main():
+    """Main function to quote a CSV of shipments"""
+    parser = argparse.ArgumentParser(description="Quote a CSV of shipments against the rate sheets")
+    parser.add_argument("input", help="CSV with manufacturer, warehouse, destination and weight columns ('-' for stdin)")
+    parser.add_argument("--output", default="-", help="CSV to write the quotes to (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Rows priced per pass")
+    parser.add_argument("--rate-sheets-dir", default=None, help="Directory containing the .xlsx rate sheets")
+    args = parser.parse_args()
+
+    rate_service = RateService()
+    if args.rate_sheets_dir:
+        rate_service.rate_sheets_dir = args.rate_sheets_dir
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", newline="", encoding="utf-8-sig")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        counts = quote_csv(rate_service, source, target, max(args.chunk_size, 1))
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    logger.info(f"Quoted {counts['rows']} rows in {time.perf_counter() - start:.2f}s "
+                f"({counts['quoted']} quoted, {counts['unquoted']} without rate data, {counts['invalid']} invalid)")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
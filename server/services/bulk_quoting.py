@@ -0,0 +1,133 @@
+import os
+import csv
+import json
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+from pydantic import ValidationError
+
+from ..models.rate_models import RateRequest
+
+# Requests priced per pass through the vectorized engine; bounds memory whatever the input size
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "10000"))
+
+# Streamed request bodies larger than this are spooled to disk instead of memory
+BULK_SPOOL_MEMORY = 8 * 1024 * 1024  # bytes
+
+# Columns a quoting CSV must have
+CSV_REQUEST_FIELDS = ("manufacturer", "warehouse", "destination", "weight")
+
+# A parsed input line: (line number, request or None, id to echo, error message or None)
+ParsedLine = Tuple[int, Optional[RateRequest], Any, Optional[str]]
+
+
+def parse_request_line(line_no: int, line: Union[str, bytes]) -> Optional[ParsedLine]:
+    """Parse one NDJSON request line (None for blank lines)"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        return line_no, RateRequest(**data), data.get("id"), None
+    except ValidationError as e:
+        return line_no, None, data.get("id"), "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+    except ValueError as e:
+        return line_no, None, None, str(e)
+
+
+def quote_lines(chunk: List[ParsedLine], rates: List[float]) -> Iterator[str]:
+    """Format a priced chunk as NDJSON lines, in input order"""
+    priced = iter(rates)
+    for line_no, request, request_id, error in chunk:
+        result: Dict[str, Any] = {"line": line_no}
+        if request_id is not None:
+            result["id"] = request_id
+        if request is None:
+            result["error"] = error
+        else:
+            result["rate"] = next(priced)
+        yield json.dumps(result, separators=(",", ":")) + "\n"
+
+
+async def spool_body(body: AsyncIterable[bytes]) -> SpooledTemporaryFile:
+    """Receive a request body into a spooled file (held in memory up to BULK_SPOOL_MEMORY, then on disk)"""
+    spool = SpooledTemporaryFile(max_size=BULK_SPOOL_MEMORY, mode="w+b")
+    async for data in body:
+        spool.write(data)
+    spool.seek(0)
+    return spool
+
+
+def quote_ndjson(rate_service, lines: Iterable[Union[str, bytes]], chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Quote NDJSON rate requests, emitting one NDJSON result line per request
+
+    Each chunk's results are emitted as one block as soon as it is priced; only one
+    chunk is held in memory.
+
+    Args:
+        rate_service: RateService used to price each chunk
+        lines: Request lines ({"manufacturer", "warehouse", "destination", "weight"}, optional "id")
+        chunk_size: Requests priced per pass (default BULK_CHUNK_SIZE)
+
+    Returns:
+        Blocks of result lines ({"line", "id"?, "rate"} or {"line", "id"?, "error"}), in input order
+    """
+    parsed = (parse_request_line(line_no, line) for line_no, line in enumerate(lines, start=1))
+    parsed = (item for item in parsed if item is not None)
+    while True:
+        chunk = list(islice(parsed, chunk_size or BULK_CHUNK_SIZE))
+        if not chunk:
+            return
+        rates = rate_service.calculate_rates([request for _, request, _, _ in chunk if request is not None])
+        yield "".join(quote_lines(chunk, rates))  # One write per chunk, not per line
+
+
+def quote_csv(rate_service, source: TextIO, target: TextIO, chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Quote a CSV of shipments, writing every input row back with "rate" and "error" columns
+
+    Args:
+        rate_service: RateService used to price each chunk
+        source: CSV with manufacturer, warehouse, destination and weight columns (others are kept)
+        target: Where the quoted CSV is written
+        chunk_size: Rows priced per pass; only one chunk is held in memory
+
+    Returns:
+        Number of rows read, quoted (rate found), unquoted (no rate data) and invalid
+    """
+    reader = csv.DictReader(source)
+    missing = [field for field in CSV_REQUEST_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+
+    writer = csv.DictWriter(target, fieldnames=[*reader.fieldnames, "rate", "error"], extrasaction="ignore")
+    writer.writeheader()
+    counts = {"rows": 0, "quoted": 0, "unquoted": 0, "invalid": 0}
+
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            return counts
+
+        requests: List[Optional[RateRequest]] = []
+        for row in rows:
+            try:
+                requests.append(RateRequest(**{field: row[field] for field in CSV_REQUEST_FIELDS}))
+            except ValidationError as e:
+                requests.append(None)
+                row["error"] = "; ".join(f"{error['loc'][0]}: {error['msg']}" for error in e.errors())
+
+        rates = iter(rate_service.calculate_rates([request for request in requests if request is not None]))
+        for row, request in zip(rows, requests):
+            if request is None:
+                counts["invalid"] += 1
+            else:
+                row["rate"] = next(rates)
+                counts["quoted" if row["rate"] > 0 else "unquoted"] += 1
+            writer.writerow(row)
+        counts["rows"] += len(rows)
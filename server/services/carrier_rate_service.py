@@ -0,0 +1,244 @@
+import os
+import json
+import logging
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..models.rate_models import RateRequest
+from .rate_index import normalize_destination
+from .rate_service import LBS_PER_KG
+
+logger = logging.getLogger("CarrierRateService")
+
+# Aliases used for special requirements across orders, PDFs and carrier tables
+REQUIREMENT_ALIASES = {
+    "hazardous": "hazardous",
+    "hazardous_material": "hazardous",
+    "hazardous_materials": "hazardous",
+    "hazmat": "hazardous",
+    "dangerous_goods": "hazardous",
+    "refrigerated": "temperature_controlled",
+    "requires_refrigeration": "temperature_controlled",
+    "requires_heating": "temperature_controlled",
+    "heated": "temperature_controlled",
+    "temperature_controlled": "temperature_controlled",
+    "fragile": "special_handling",
+    "special_handling": "special_handling",
+    "pharmaceutical": "pharmaceutical",
+}
+
+# Requirement that triggers each fee in a weight-bracket table; fees not listed apply to every shipment
+FEE_REQUIREMENTS = {
+    "hazardous_material_fee": "hazardous",
+    "special_handling_fee": "special_handling",
+    "pharmaceutical_handling_fee": "pharmaceutical",
+    "temperature_monitoring_fee": "temperature_controlled",
+}
+
+# Requirements a lane table must list for the carrier to take the shipment
+LANE_CAPABILITIES = ("hazardous", "temperature_controlled")
+
+
+def normalize_requirements(requirements: Optional[Iterable[str]]) -> frozenset:
+    """Map special requirement names (list, or dict of flags) onto canonical requirement names"""
+    if not requirements:
+        return frozenset()
+    if isinstance(requirements, dict):
+        requirements = [name for name, value in requirements.items() if value]
+    return frozenset(REQUIREMENT_ALIASES.get(str(name).lower(), str(name).lower()) for name in requirements)
+
+
+class ShipmentBatch:
+    """Shipments in columnar form for pricing against every carrier table"""
+
+    def __init__(self, requests: List[RateRequest]):
+        self.weights_kg = np.fromiter((r.weight for r in requests), dtype=np.float64, count=len(requests)) / LBS_PER_KG
+
+        # Normalize each distinct value once; batches repeat the same lanes and requirements
+        names: Dict[str, str] = {}
+        requirement_sets: Dict[Tuple, frozenset] = {}
+        self.origins = [names.get(r.warehouse) or names.setdefault(r.warehouse, normalize_destination(r.warehouse)) for r in requests]
+        self.destinations = [names.get(r.destination) or names.setdefault(r.destination, normalize_destination(r.destination)) for r in requests]
+        self.requirements = []
+        for r in requests:
+            key = tuple(r.special_requirements or ())
+            if key not in requirement_sets:
+                requirement_sets[key] = normalize_requirements(r.special_requirements)
+            self.requirements.append(requirement_sets[key])
+        self.flags: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.weights_kg)
+
+    def has(self, requirement: str) -> np.ndarray:
+        """Get a boolean mask of shipments with a (canonical) special requirement"""
+        if requirement not in self.flags:
+            self.flags[requirement] = np.fromiter((requirement in r for r in self.requirements), dtype=bool, count=len(self))
+        return self.flags[requirement]
+
+
+class WeightBracketTable:
+    """Carrier table priced by weight brackets, compiled into arrays for piecewise evaluation"""
+
+    def __init__(self, carrier: str, data: Dict[str, Any]):
+        self.carrier = carrier
+        brackets = sorted(data["rates"], key=lambda r: r["weight_range"][0])
+        self.lower_bounds = np.array([b["weight_range"][0] for b in brackets], dtype=np.float64)
+        self.max_weight = float(brackets[-1]["weight_range"][1])
+        self.rate_per_100kg = np.array([b["rate_per_100kg"] for b in brackets], dtype=np.float64)
+        self.minimum_charge = np.array([b["minimum_charge"] for b in brackets], dtype=np.float64)
+        self.fuel_surcharge = float(data.get("fuel_surcharge", 0.0))
+        self.fees = {name: float(value) for name, value in data.items() if name.endswith("_fee")}
+
+    def quote(self, shipments: ShipmentBatch) -> np.ndarray:
+        """Price shipments (inf where the weight is outside the table)"""
+        weights_kg = shipments.weights_kg
+        # Each bracket runs up to the next one's lower bound, closing the gaps between ranges
+        brackets = np.clip(np.searchsorted(self.lower_bounds, weights_kg, side="right") - 1, 0, None)
+        linehaul = np.maximum(self.minimum_charge[brackets], weights_kg / 100 * self.rate_per_100kg[brackets])
+        cost = linehaul * (1 + self.fuel_surcharge)
+
+        for name, amount in self.fees.items():
+            requirement = FEE_REQUIREMENTS.get(name)
+            if requirement is None:
+                cost += amount
+            else:
+                cost += amount * shipments.has(requirement)
+
+        cost[(weights_kg < self.lower_bounds[0]) | (weights_kg > self.max_weight)] = np.inf
+        return cost
+
+
+class LaneTable:
+    """Carrier table priced per km on origin/destination lanes"""
+
+    def __init__(self, carrier: str, data: Dict[str, Any]):
+        self.carrier = carrier
+        lanes = data["rates"]
+        self.lanes = {
+            (normalize_destination(lane["origin"]), normalize_destination(lane["destination"])): i
+            for i, lane in enumerate(lanes)
+        }
+        self.rate_per_km = np.array([lane["rate_per_km"] for lane in lanes], dtype=np.float64)
+        self.min_charge = np.array([lane["min_charge"] for lane in lanes], dtype=np.float64)
+        self.capabilities = [normalize_requirements(lane.get("special_requirements")) for lane in lanes]
+
+        # Great-circle lane distances from the coordinates in the table
+        lat1, lon1, lat2, lon2 = (
+            np.radians([lane[field] for lane in lanes])
+            for field in ("origin_lat", "origin_lon", "destination_lat", "destination_lon")
+        )
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        self.distance_km = 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def quote(self, shipments: ShipmentBatch) -> np.ndarray:
+        """Price shipments (inf where the carrier has no lane or cannot meet the requirements)"""
+        lane_ids = np.fromiter(
+            (self.lanes.get(lane, -1) for lane in zip(shipments.origins, shipments.destinations)),
+            dtype=np.int64, count=len(shipments)
+        )
+        served = lane_ids >= 0
+        for requirement in LANE_CAPABILITIES:
+            # Trailing False is picked up by lane_ids == -1
+            capable = np.array([requirement in capabilities for capabilities in self.capabilities] + [False])
+            served &= ~shipments.has(requirement) | capable[lane_ids]
+
+        cost = np.full(len(lane_ids), np.inf)
+        lanes = lane_ids[served]
+        cost[served] = np.maximum(self.min_charge[lanes], self.rate_per_km[lanes] * self.distance_km[lanes])
+        return cost
+
+
+class CarrierRateService:
+    """Compares carriers from the JSON rate tables in server/data/rate_tables"""
+
+    def __init__(self, rate_tables_dir: Optional[str] = None):
+        self.rate_tables_dir = rate_tables_dir or os.path.join(os.path.dirname(__file__), "..", "data", "rate_tables")
+
+        # Compiled tables keyed by carrier, rebuilt when any table file changes
+        self.tables: Dict[str, Any] = {}
+        self.raw_tables: Dict[str, Dict[str, Any]] = {}
+        self.tables_signature: Optional[Tuple] = None
+
+    def _load_tables(self) -> Dict[str, Any]:
+        """Compile the carrier tables, reloading them if a file was added, removed or changed"""
+        try:
+            filenames = sorted(f for f in os.listdir(self.rate_tables_dir) if f.endswith("_rates.json"))
+        except OSError:
+            return {}
+        signature = tuple((f, os.path.getmtime(os.path.join(self.rate_tables_dir, f))) for f in filenames)
+        if signature == self.tables_signature:
+            return self.tables
+
+        tables = {}
+        raw_tables = {}
+        for filename in filenames:
+            try:
+                with open(os.path.join(self.rate_tables_dir, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                carrier = data.get("carrier") or filename[:-len("_rates.json")]
+                if data["rates"] and "weight_range" in data["rates"][0]:
+                    tables[carrier] = WeightBracketTable(carrier, data)
+                else:
+                    tables[carrier] = LaneTable(carrier, data)
+                raw_tables[carrier] = data
+            except Exception as e:
+                logger.error(f"Error loading carrier rate table {filename}: {str(e)}")
+
+        self.tables = tables
+        self.raw_tables = raw_tables
+        self.tables_signature = signature
+        return tables
+
+    def get_carriers(self) -> List[str]:
+        """Get list of carriers with rate tables"""
+        return list(self._load_tables())
+
+    def get_carrier_rates(self, carrier: str) -> Optional[Dict[str, Any]]:
+        """Get the rate table of a carrier as stored"""
+        self._load_tables()
+        return self.raw_tables.get(carrier)
+
+    def quote_carriers(self, requests: List[RateRequest]) -> Tuple[List[str], np.ndarray]:
+        """
+        Price every shipment with every carrier in one vectorized pass
+
+        Args:
+            requests: Shipments; weight is in lbs as for the rate sheets, warehouse is the origin
+
+        Returns:
+            Tuple of (carriers, costs) where costs has shape (shipments, carriers) and is inf
+            where a carrier cannot take the shipment
+        """
+        tables = self._load_tables()
+        carriers = list(tables)
+        shipments = ShipmentBatch(requests)
+
+        costs = np.full((len(shipments), len(carriers)), np.inf)
+        for column, carrier in enumerate(carriers):
+            costs[:, column] = tables[carrier].quote(shipments)
+        return carriers, np.round(costs, 2)
+
+    def find_cheapest(self, requests: List[RateRequest]) -> List[Dict[str, Any]]:
+        """
+        Find the cheapest carrier for each shipment
+
+        Returns:
+            One result per shipment with the cheapest carrier and cost (None if no carrier
+            can take it) and every carrier's quote
+        """
+        carriers, costs = self.quote_carriers(requests)
+        if not carriers:
+            return [{"carrier": None, "cost": None, "quotes": {}} for _ in requests]
+
+        best = np.argmin(costs, axis=1)
+        best_costs = costs[np.arange(len(requests)), best]
+        offered = np.where(np.isinf(costs), None, costs).tolist()
+        return [
+            {
+                "carrier": None if cost is None else carriers[column],
+                "cost": cost,
+                "quotes": dict(zip(carriers, quotes)),
+            }
+            for column, cost, quotes in zip(best.tolist(), np.where(np.isinf(best_costs), None, best_costs).tolist(), offered)
+        ]
@@ -0,0 +1,147 @@
+import bisect
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from .destination_resolver import match_key
+from .rate_index import CompiledRateSheet
+
+# Upper bound for keys starting with a prefix (keys are lowercase letters, digits and spaces)
+_PREFIX_END = "\uffff"
+
+
+class DestinationIndex:
+    """
+    Prefix index over the destinations of every compiled rate sheet
+
+    Destinations are grouped by name and province and kept in sorted arrays: one of full
+    names and one of every later word onwards ("john" finds "Saint John"). A query is a
+    binary search for the prefix range plus a partial sort of that range by how many
+    sheets carry the destination, so it stays well under a millisecond.
+    """
+
+    def __init__(self, sheets: Dict[Tuple[str, str], CompiledRateSheet]):
+        """
+        Args:
+            sheets: Compiled sheets keyed by (manufacturer, warehouse)
+        """
+        entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for (manufacturer, warehouse), compiled in sorted(sheets.items()):
+            for row in sorted(set(compiled.lookup.values())):
+                city, province = compiled.cities[row], compiled.provinces[row]
+                key = (match_key(city), match_key(province) if province else "")
+                if not key[0]:
+                    continue
+                entry = entries.setdefault(key, {"destination": city, "province": province, "sheets": []})
+                if (manufacturer, warehouse) not in entry["sheets"]:
+                    entry["sheets"].append((manufacturer, warehouse))
+
+        # Destination ids follow name order, so a full-name prefix range is a range of ids
+        ordered = sorted(entries)
+        self.keys: List[str] = [name for name, _ in ordered]
+        self.destinations: List[str] = [entries[key]["destination"] for key in ordered]
+        self.provinces: List[Optional[str]] = [entries[key]["province"] for key in ordered]
+        self.sheets: List[List[Tuple[str, str]]] = [entries[key]["sheets"] for key in ordered]
+
+        words = sorted(
+            (" ".join(parts[start:]), destination_id)
+            for destination_id, name in enumerate(self.keys)
+            for parts in [name.split()]
+            for start in range(1, len(parts))
+        )
+        self.word_keys: List[str] = [word for word, _ in words]
+        self.word_ids = np.array([destination_id for _, destination_id in words], dtype=np.int64)
+
+        # Rank of each destination: carried by more sheets first, then by name
+        order = sorted(range(len(self.keys)), key=lambda i: (-len(self.sheets[i]), self.keys[i]))
+        self.ranks = np.empty(len(self.keys), dtype=np.int64)
+        self.ranks[order] = np.arange(len(self.keys))
+
+        # Masks are only built for manufacturers and warehouses the index has sheets for, so
+        # there is at most one per manufacturer, warehouse and sheet
+        self.sheet_keys = set(sheets)
+        self.manufacturers = {manufacturer for manufacturer, _ in sheets}
+        self.warehouses = {warehouse for _, warehouse in sheets}
+        self.masks: Dict[Tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _mask(self, manufacturer: Optional[str], warehouse: Optional[str]) -> Optional[np.ndarray]:
+        """Destinations carried by a manufacturer and/or warehouse, built on first use (None if no sheet matches)"""
+        key = (manufacturer, warehouse)
+        mask = self.masks.get(key)
+        if mask is None:
+            if manufacturer is not None and warehouse is not None:
+                known = key in self.sheet_keys
+            else:
+                known = manufacturer in self.manufacturers if manufacturer is not None else warehouse in self.warehouses
+            if not known:
+                return None
+            mask = np.fromiter(
+                (
+                    any((manufacturer is None or m == manufacturer) and (warehouse is None or w == warehouse) for m, w in sheets)
+                    for sheets in self.sheets
+                ),
+                dtype=bool,
+                count=len(self.sheets)
+            )
+            self.masks[key] = mask
+        return mask
+
+    def _top(self, ids: np.ndarray, mask: Optional[np.ndarray], limit: int) -> np.ndarray:
+        """Best ranked ids allowed by the mask, in rank order"""
+        if mask is not None:
+            ids = ids[mask[ids]]
+        if limit <= 0:
+            return ids[:0]
+        if len(ids) > limit:
+            ids = ids[np.argpartition(self.ranks[ids], limit - 1)[:limit]]
+        return ids[np.argsort(self.ranks[ids])]
+
+    def search(self, prefix: str, limit: int = 10, manufacturer: Optional[str] = None,
+               warehouse: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find destinations starting with a prefix
+
+        Args:
+            prefix: What the user typed so far (case and punctuation insensitive)
+            limit: Maximum number of suggestions
+            manufacturer: Only destinations in this manufacturer's sheets
+            warehouse: Only destinations in sheets of this warehouse (the manufacturer's, if given)
+
+        Returns:
+            Suggestions with destination, province and the (manufacturer, warehouse) sheets
+            that carry it: exact name first, then names starting with the prefix, then names
+            with a later word starting with it; each group by number of sheets
+        """
+        query = match_key(prefix)
+        if not query or limit <= 0:
+            return []
+        mask = None
+        if manufacturer is not None or warehouse is not None:
+            mask = self._mask(manufacturer, warehouse)
+            if mask is None:
+                return []
+
+        # The exact name sorts first in the prefix range ("regina" before "regina beach")
+        start = bisect.bisect_left(self.keys, query)
+        exact_end = bisect.bisect_right(self.keys, query, start)
+        end = bisect.bisect_left(self.keys, query + _PREFIX_END, exact_end)
+        found = self._top(np.arange(start, exact_end), mask, limit)
+        found = np.concatenate([found, self._top(np.arange(exact_end, end), mask, limit - len(found))])
+
+        if len(found) < limit:
+            start = bisect.bisect_left(self.word_keys, query)
+            end = bisect.bisect_left(self.word_keys, query + _PREFIX_END, start)
+            ids = np.unique(self.word_ids[start:end])
+            ids = ids[~np.isin(ids, found)]
+            found = np.concatenate([found, self._top(ids, mask, limit - len(found))])
+
+        return [
+            {
+                "destination": self.destinations[i],
+                "province": self.provinces[i],
+                "sheets": [{"manufacturer": m, "warehouse": w} for m, w in self.sheets[i]],
+            }
+            for i in found.tolist()
+        ]
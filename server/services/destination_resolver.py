@@ -0,0 +1,156 @@
+import re
+from collections import namedtuple
+from typing import Dict, List, Optional, Set, Tuple
+
+# Result of resolving a destination: row in the rate sheet, canonical destination name and a 0-1 score
+DestinationMatch = namedtuple("DestinationMatch", ["row", "destination", "score"])
+
+# Lowest trigram similarity accepted as a match
+FUZZY_MIN_SCORE = 0.5
+
+# Score multiplier for a candidate in a different province than the one asked for
+PROVINCE_MISMATCH_PENALTY = 0.8
+
+# Resolved queries remembered per sheet
+RESOLVER_CACHE_SIZE = 4096
+
+PROVINCE_CODES = {
+    "alberta": "ab",
+    "british columbia": "bc",
+    "manitoba": "mb",
+    "new brunswick": "nb",
+    "newfoundland and labrador": "nl",
+    "newfoundland": "nl",
+    "nova scotia": "ns",
+    "northwest territories": "nt",
+    "nunavut": "nu",
+    "ontario": "on",
+    "prince edward island": "pe",
+    "quebec": "qc",
+    "saskatchewan": "sk",
+    "yukon": "yt",
+}
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def match_key(text: str) -> str:
+    """Reduce a place name to lowercase words without punctuation ("St. Adolphe, MB" -> "st adolphe mb")"""
+    return " ".join(_NON_ALPHANUMERIC.sub(" ", str(text).lower()).split())
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a match key, padded so word boundaries count"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DestinationResolver:
+    """Exact, province-aware and trigram matching of destination names against one rate sheet"""
+
+    def __init__(self, cities: List[Optional[str]], provinces: List[Optional[str]], rows: List[int]):
+        """
+        Args:
+            cities: Destination cell of each sheet row
+            provinces: Province cell of each sheet row
+            rows: Rows that have rate data and can be matched
+        """
+        self.cities = cities
+        self.provinces = [match_key(p) if p else "" for p in provinces]
+
+        # Match key -> rows with that city (in sheet order)
+        self.rows_by_key: Dict[str, List[int]] = {}
+        for row in rows:
+            self.rows_by_key.setdefault(match_key(cities[row]), []).append(row)
+        self.keys = list(self.rows_by_key)
+        self.known_provinces = {p for p in self.provinces if p}
+
+        # Trigram -> ids of keys containing it, and each key's trigram count
+        self.postings: Dict[str, List[int]] = {}
+        self.trigram_counts: List[int] = []
+        for key_id, key in enumerate(self.keys):
+            grams = trigrams(key)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(key_id)
+
+        self.cache: Dict[str, Optional[DestinationMatch]] = {}
+
+    def _split_province(self, key: str) -> Tuple[str, Optional[str]]:
+        """Split a trailing province code or name off a match key"""
+        tokens = key.split()
+        if len(tokens) > 1 and tokens[-1] in self.known_provinces:
+            return " ".join(tokens[:-1]), tokens[-1]
+        for name, code in PROVINCE_CODES.items():
+            if key.endswith(" " + name):
+                return key[:-len(name) - 1], code
+        return key, None
+
+    def _pick_row(self, rows: List[int], province: Optional[str]) -> Tuple[int, bool]:
+        """Pick the row in the requested province if there is one; returns (row, province matched)"""
+        if province:
+            for row in rows:
+                if self.provinces[row] == province:
+                    return row, True
+            return rows[0], False
+        return rows[0], True
+
+    def _match(self, row: int, score: float) -> DestinationMatch:
+        return DestinationMatch(row, self.cities[row], round(score, 3))
+
+    def resolve(self, destination: str) -> Optional[DestinationMatch]:
+        """
+        Resolve a destination name to a sheet row
+
+        Tries the name as given, then without a trailing province ("REGINA, SK"), then
+        the closest city by trigram similarity.
+
+        Args:
+            destination: Destination as typed or extracted from a document
+
+        Returns:
+            The best match, or None if nothing scores at least FUZZY_MIN_SCORE
+        """
+        if destination in self.cache:
+            return self.cache[destination]
+        match = self._resolve(destination)
+        if len(self.cache) >= RESOLVER_CACHE_SIZE:
+            self.cache.clear()
+        self.cache[destination] = match
+        return match
+
+    def _resolve(self, destination: str) -> Optional[DestinationMatch]:
+        key = match_key(destination)
+        if not key:
+            return None
+
+        rows = self.rows_by_key.get(key)
+        if rows:
+            return self._match(rows[0], 1.0)
+
+        city, province = self._split_province(key)
+        rows = self.rows_by_key.get(city)
+        if rows:
+            row, province_matched = self._pick_row(rows, province)
+            return self._match(row, 1.0 if province_matched else PROVINCE_MISMATCH_PENALTY)
+
+        # Trigram similarity (Jaccard) against every city sharing at least one trigram
+        grams = trigrams(city)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for key_id in self.postings.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+
+        best = None
+        best_score = 0.0
+        for key_id, count in shared.items():
+            score = count / (len(grams) + self.trigram_counts[key_id] - count)
+            row, province_matched = self._pick_row(self.rows_by_key[self.keys[key_id]], province)
+            if not province_matched:
+                score *= PROVINCE_MISMATCH_PENALTY
+            if score > best_score:
+                best, best_score = row, score
+
+        if best is None or best_score < FUZZY_MIN_SCORE:
+            return None
+        return self._match(best, best_score)
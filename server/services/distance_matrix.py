@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+# Origins processed per block when building large matrices, bounding the temporaries to a few MB each
+HAVERSINE_BLOCK_ROWS = 256
+
+Coordinates = Tuple[float, float]
+
+
+def haversine_matrix(origins: Sequence[Coordinates], destinations: Sequence[Coordinates]) -> np.ndarray:
+    """
+    Great-circle distances between every origin and every destination
+
+    Args:
+        origins: (lat, lon) pairs in degrees
+        destinations: (lat, lon) pairs in degrees
+
+    Returns:
+        Distances in km, shape (origins, destinations)
+    """
+    origins = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=np.float64).reshape(-1, 2))
+    lat2, lon2 = destinations[:, 0], destinations[:, 1]
+    cos_lat2 = np.cos(lat2)
+
+    matrix = np.empty((len(origins), len(destinations)))
+    for start in range(0, len(origins), HAVERSINE_BLOCK_ROWS):
+        block = origins[start:start + HAVERSINE_BLOCK_ROWS]
+        lat1, lon1 = block[:, 0:1], block[:, 1:2]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2
+        np.clip(a, 0.0, 1.0, out=a)  # Rounding can push a just past 1 for antipodal points
+        matrix[start:start + len(block)] = 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return matrix
+
+
+class DistanceMatrixCache:
+    """
+    Bounded cache of pairwise haversine distances between coordinates
+
+    Distances are kept for every pair of points seen so far, so any subset or ordering
+    of known points is served by indexing; only new points are computed, against all
+    cached points at once.
+    """
+
+    def __init__(self, max_points: int = 2048):
+        self.max_points = max(max_points, 0)
+        self.slots: Dict[Coordinates, int] = {}  # Coordinates -> row/column in matrix
+        self.points = np.empty((0, 2))
+        self.matrix = np.empty((0, 0))  # Capacity grows by doubling; only [:len(slots), :len(slots)] is filled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_matrix(self, coordinates: List[Coordinates]) -> np.ndarray:
+        """
+        Get the distance matrix between coordinates, in the order given
+
+        Args:
+            coordinates: (lat, lon) pairs in degrees, duplicates allowed
+
+        Returns:
+            Distances in km, shape (len(coordinates), len(coordinates))
+        """
+        coordinates = [(float(lat), float(lon)) for lat, lon in coordinates]
+        with self.lock:
+            new_points = list(dict.fromkeys(c for c in coordinates if c not in self.slots))
+            self.hits += len(coordinates) - len(new_points)
+            self.misses += len(new_points)
+
+            if len(self.slots) + len(new_points) > self.max_points:
+                requested = list(dict.fromkeys(coordinates))
+                if len(requested) > self.max_points:
+                    # Too many points to keep around; compute this matrix outright
+                    return haversine_matrix(coordinates, coordinates)
+                # Start over with just the points of this request
+                self._reset()
+                new_points = requested
+
+            if new_points:
+                self._add_points(new_points)
+
+            index = np.fromiter((self.slots[c] for c in coordinates), dtype=np.int64, count=len(coordinates))
+            return self.matrix[np.ix_(index, index)]
+
+    def _reset(self):
+        self.slots = {}
+        self.points = np.empty((0, 2))
+        self.matrix = np.empty((0, 0))
+
+    def _add_points(self, new_points: List[Coordinates]):
+        """Add points, computing only their distances to every cached point (caller holds the lock)"""
+        count = len(self.slots)
+        total = count + len(new_points)
+        if total > len(self.matrix):
+            capacity = min(max(total, 2 * len(self.matrix), 16), max(self.max_points, total))
+            matrix = np.empty((capacity, capacity))
+            matrix[:count, :count] = self.matrix[:count, :count]
+            self.matrix = matrix
+
+        self.points = np.vstack([self.points, np.asarray(new_points, dtype=np.float64)])
+        rows = haversine_matrix(new_points, self.points)
+        self.matrix[count:total, :total] = rows
+        self.matrix[:total, count:total] = rows.T
+        for slot, point in enumerate(new_points, start=count):
+            self.slots[point] = slot
+
+    def clear(self):
+        """Drop all cached points and reset the counters"""
+        with self.lock:
+            self._reset()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of cached points and point hit/miss counters"""
+        with self.lock:
+            return {
+                "points": len(self.slots),
+                "max_points": self.max_points,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
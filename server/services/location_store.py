@@ -0,0 +1,194 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..database.models import LocationModel
+from .rate_index import normalize_destination
+
+logger = logging.getLogger("LocationStore")
+
+# Country appended to geocoding queries that do not name one, so "Winkler" resolves to Winkler, MB
+GEOCODE_COUNTRY = os.getenv("GEOCODE_COUNTRY", "Canada")
+
+# Locations that failed to geocode are not retried before this
+GEOCODE_RETRY_INTERVAL = 3600  # seconds
+
+# Locations waiting to be geocoded; lookups of further unknown locations are not queued until it drains
+GEOCODE_QUEUE_SIZE = 1000
+
+# Failed locations remembered for GEOCODE_RETRY_INTERVAL, the oldest forgotten first beyond this
+FAILED_LOCATIONS_KEPT = 10000
+
+
+class LocationStore:
+    """
+    Location coordinates persisted in the database and served from memory
+
+    All rows are loaded into a dict up front, so lookups never touch the database.
+    Unknown locations from orders and rate sheets are queued (up to GEOCODE_QUEUE_SIZE)
+    and geocoded by a background thread, then stored for every later lookup (and every
+    later process).
+    """
+
+    def __init__(self, session_factory: Callable, geocoder_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            session_factory: SQLAlchemy session factory (e.g. SessionLocal)
+            geocoder_factory: Creates the geocoder (e.g. GoogleMapsService) in the background
+                thread; None disables geocoding
+        """
+        self.session_factory = session_factory
+        self.geocoder_factory = geocoder_factory
+        self.coordinates: Dict[str, Tuple[float, float]] = {}  # Normalized name -> (lat, lon)
+        self.pending = set()
+        self.failed: Dict[str, float] = {}  # Normalized name -> time of the failed attempt, oldest first
+        self.queue: "queue.Queue[str]" = queue.Queue(maxsize=GEOCODE_QUEUE_SIZE)
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def load(self, seed: Optional[Dict[str, Tuple[float, float]]] = None) -> int:
+        """
+        Load every stored location into memory, first storing any seed locations that are missing
+
+        Args:
+            seed: Known coordinates keyed by location name
+
+        Returns:
+            Number of locations loaded
+        """
+        session = self.session_factory()
+        try:
+            LocationModel.__table__.create(bind=session.get_bind(), checkfirst=True)
+            if seed:
+                stored = {name for (name,) in session.query(LocationModel.name)}
+                for location, (lat, lon) in seed.items():
+                    if normalize_destination(location) not in stored:
+                        session.add(LocationModel(
+                            name=normalize_destination(location), display_name=location, lat=lat, lon=lon, source="default"
+                        ))
+                session.commit()
+
+            rows = session.query(LocationModel.name, LocationModel.lat, LocationModel.lon).all()
+            self.coordinates = {name: (lat, lon) for name, lat, lon in rows}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error loading locations: {str(e)}")
+        finally:
+            session.close()
+        return len(self.coordinates)
+
+    def get(self, location: str, geocode: bool = True) -> Optional[Tuple[float, float]]:
+        """
+        Get coordinates for a location
+
+        Args:
+            location: Location name
+            geocode: Queue the location for geocoding if it is unknown; pass False for names
+                that come from request parameters rather than orders or rate sheets
+
+        Returns:
+            The coordinates, or None if the location is unknown
+        """
+        key = normalize_destination(location)
+        coords = self.coordinates.get(key)
+        if coords is None and key and geocode:
+            self._enqueue(location, key)
+        return coords
+
+    def _enqueue(self, location: str, key: str):
+        if self.thread is None or key in self.pending:
+            return
+        if time.time() - self.failed.get(key, float("-inf")) < GEOCODE_RETRY_INTERVAL:
+            return
+        self.pending.add(key)
+        try:
+            self.queue.put_nowait(location)
+        except queue.Full:
+            # Dropped; a later lookup queues it again once the queue has room
+            self.pending.discard(key)
+            logger.debug(f"Geocoding queue is full, not queueing {location}")
+
+    def add(self, location: str, lat: float, lon: float, source: str = "geocode"):
+        """Store coordinates for a location and make them available to lookups"""
+        key = normalize_destination(location)
+        session = self.session_factory()
+        try:
+            row = session.get(LocationModel, key)
+            if row is None:
+                session.add(LocationModel(name=key, display_name=location, lat=lat, lon=lon, source=source))
+            else:
+                row.lat, row.lon, row.source = lat, lon, source
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error storing location {location}: {str(e)}")
+        finally:
+            session.close()
+        self.coordinates[key] = (lat, lon)
+
+    def start(self):
+        """Start geocoding unknown locations in the background (no-op without a geocoder)"""
+        if self.geocoder_factory is None or self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="location-geocoder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background geocoder"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _run(self):
+        """Geocode queued locations one at a time on this thread's own event loop"""
+        loop = asyncio.new_event_loop()
+        geocoder = self.geocoder_factory()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    location = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    self._geocode(loop, geocoder, location)
+                finally:
+                    self.queue.task_done()
+        finally:
+            try:
+                loop.run_until_complete(geocoder.close())
+            except Exception:
+                pass
+            loop.close()
+
+    def _geocode(self, loop: asyncio.AbstractEventLoop, geocoder: Any, location: str):
+        key = normalize_destination(location)
+        query = location if GEOCODE_COUNTRY.lower() in location.lower() else f"{location}, {GEOCODE_COUNTRY}"
+        try:
+            result = loop.run_until_complete(geocoder.geocode_address(query))
+        except Exception as e:
+            logger.error(f"Error geocoding {location}: {str(e)}")
+            result = None
+
+        if result:
+            self.add(location, result["lat"], result["lng"])
+            logger.info(f"Geocoded {location}: {result['lat']}, {result['lng']}")
+        else:
+            self.failed.pop(key, None)  # Move to the end, as the newest failure
+            self.failed[key] = time.time()
+            while len(self.failed) > FAILED_LOCATIONS_KEPT:
+                del self.failed[next(iter(self.failed))]
+        self.pending.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of known, pending and recently failed locations"""
+        return {
+            "known": len(self.coordinates),
+            "pending": len(self.pending),
+            "failed": len(self.failed),
+        }
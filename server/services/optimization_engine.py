@@ -1,26 +1,68 @@
 import os
-from typing import List, Optional, Dict, Tuple, Any
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import FrozenSet, List, NamedTuple, Optional, Dict, Tuple, Any
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from ..models.order_models import Order, Truck, Trailer, OrderAssignment
 from ..services.samsara_service import SamsaraService
-from ..services.rate_service import RateService
+from ..services.rate_service import get_rate_service
 from ..services.google_maps_service import GoogleMapsService
 from ..services.weather_service import WeatherService
+from ..services.routing_model import (
+    PORTFOLIO_STRATEGIES, STOP_COMPLETED, UNREACHABLE_DISTANCE, UNREACHABLE_TIME, RoutingProblem, RoutingSolution,
+    SOLVER_WORKERS, get_solver_pool, insert_nodes, route_schedule, shutdown_solver_pool, solve_routing, to_int_matrix
+)
+from ..services.routing_decomposition import cluster_nodes, merge_solutions, route_cost, share_vehicles, split_problem
 import numpy as np
-from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
 load_dotenv()
 
+# Road distance per straight-line km, and average speed, for locations the fast path adds
+# to a plan when its known locations give no road distances to scale them by
+ROAD_DISTANCE_FACTOR = 1.3
+ESTIMATED_SPEED_KMH = 60.0
+
+class AssignmentPlan(NamedTuple):
+    """Assignments with the solve they came from, to record as the depot's plan once applied (see accept_plan)"""
+    assignments: List[OrderAssignment]
+    problem: RoutingProblem
+    solution: RoutingSolution
+    trucks: List[Truck]
+    trailers: List[Trailer]
+    kept_trucks: FrozenSet[str] = frozenset()  # Trucks of the applied plan an insertion extends (see insert_orders)
+
+class PlanContext(NamedTuple):
+    """What the fast path reuses of a depot's last applied plan"""
+    problem: RoutingProblem
+    trucks: List[Truck]
+    trailers: List[Trailer]  # With the weight of the plan's orders loaded
+    hitches: Dict[str, str]  # Truck id -> id of the trailer it pulls
+    recorded_at: float  # time.monotonic() when recorded
+
 class OptimizationEngine:
     def __init__(self):
         self.samsara = SamsaraService()
-        self.rate_service = RateService()
+        self.rate_service = get_rate_service()
         self.google_maps = GoogleMapsService()
         self.weather_service = WeatherService()
         
         # Load optimization settings from environment variables
         self.max_optimization_time = int(os.getenv("MAX_OPTIMIZATION_TIME", "30"))  # seconds
+        self.min_optimization_time = float(os.getenv("MIN_OPTIMIZATION_TIME", "2"))  # seconds
+        self.optimization_time_per_location = float(os.getenv("OPTIMIZATION_TIME_PER_LOCATION", "0.1"))  # seconds
+        self.plateau_improvement = float(os.getenv("PLATEAU_IMPROVEMENT", "0.001"))  # relative objective improvement that counts
+        self.plateau_time = float(os.getenv("PLATEAU_TIME", "10"))  # seconds without such an improvement before stopping (0: never)
+        self.warm_start_time_limit = int(os.getenv("WARM_START_TIME_LIMIT", "5"))  # seconds, for re-plans seeded from the last plan
+        self.decomposition_threshold = int(os.getenv("DECOMPOSITION_THRESHOLD", "400"))  # locations above which problems are split by region (0: never)
+        self.decomposition_cluster_size = int(os.getenv("DECOMPOSITION_CLUSTER_SIZE", "150"))  # target locations per region
+        self.decomposition_repair_share = 0.25  # Share of the time limit spent repairing region boundaries
+        self.fast_path_max_orders = int(os.getenv("FAST_PATH_MAX_ORDERS", "5"))  # orders placed by insertion into the current plan (0: never)
+        self.fast_path_max_age = float(os.getenv("FAST_PATH_MAX_AGE", "900"))  # seconds a plan's fleet and matrices are reused
+        self.portfolio = os.getenv("OPTIMIZATION_PORTFOLIO", "false").lower() in ("1", "true", "yes")  # solve with several strategies at once
         self.revenue_weight = float(os.getenv("REVENUE_WEIGHT", "0.5"))
         self.cost_weight = float(os.getenv("COST_WEIGHT", "0.3"))
         self.time_weight = float(os.getenv("TIME_WEIGHT", "0.2"))
@@ -29,131 +71,534 @@ class OptimizationEngine:
         self.fuel_cost_per_km = 0.35  # Cost in dollars per km
         self.driver_cost_per_hour = 25.0  # Cost in dollars per hour
         self.base_profit_margin = 0.15  # Base profit margin percentage
+        
+        # Last accepted routes per depot location: truck id -> locations visited in order
+        self.route_plans: Dict[str, Dict[str, List[str]]] = {}
+        
+        # Problem, fleet and trailer hitches of the last plan per depot; the fast path inserts
+        # orders into the plan without refetching them
+        self.plan_contexts: Dict[str, PlanContext] = {}
+        
+        # Portfolio results per strategy: {"runs": solves finished, "wins": best objective among them}
+        self.strategy_stats: Dict[str, Dict[str, int]] = {}
+
+    async def optimize_assignments(self, orders: List[Order], warm_start: bool = True,
+                                   fast_path: Optional[bool] = None) -> List[OrderAssignment]:
+        """
+        Optimize order assignments using vehicle routing problem solver
+        
+        Nothing is recorded as the depot's plan; callers applying the assignments use
+        plan_assignments and accept_plan instead.
+        """
+        plan = await self.plan_assignments(orders, warm_start, fast_path)
+        return plan.assignments if plan else []
 
-    async def optimize_assignments(self, orders: List[Order]) -> List[OrderAssignment]:
-        """Optimize order assignments using vehicle routing problem solver"""
+    async def plan_assignments(self, orders: List[Order], warm_start: bool = True,
+                               fast_path: Optional[bool] = None) -> Optional[AssignmentPlan]:
+        """
+        Optimize order assignments, keeping the solve they came from
+        
+        The solve runs in the solver process pool, so the event loop keeps serving
+        requests while it searches. With warm_start, it starts from the last accepted
+        plan for the depot (see prepare_problem).
+        
+        With fast_path (by default for up to fast_path_max_orders orders), the orders are
+        first inserted into the current plan (see insert_orders); the solver only runs when
+        that finds no feasible insertion.
+        
+        Returns:
+            The plan, to pass to accept_plan once its assignments are applied, or None
+            when no trucks or trailers are available or no routes were found
+        """
+        if fast_path is None:
+            fast_path = len(orders) <= self.fast_path_max_orders
+        if fast_path:
+            plan = await self.insert_orders(orders)
+            if plan is not None:
+                return plan
+            print("Orders could not be inserted into the current plan, running the full optimization")
+        
+        prepared = await self.prepare_problem(orders, warm_start)
+        if prepared is None:
+            return None
+        problem, trucks, trailers = prepared
+
+        # Solve the problem
+        solution = await self.solve(problem)
+
+        if solution:
+            return AssignmentPlan(
+                self.extract_assignments(solution, problem, orders, trucks, trailers), problem, solution, trucks, trailers
+            )
+        return None
+
+    def accept_plan(self, plan: AssignmentPlan) -> None:
+        """Record an applied plan as its depot's plan, for warm starts and the fast path"""
+        self.record_plan(plan.problem, plan.solution, plan.trucks, plan.trailers, plan.assignments, plan.kept_trucks)
+
+    async def insert_orders(self, orders: List[Order]) -> Optional[AssignmentPlan]:
+        """
+        Place orders into their depot's plan by cheapest feasible insertion, without solving
+        
+        The plan's trucks, trailers and matrices are reused; only locations the plan does
+        not have yet get distances, estimated from the rate service's straight-line
+        distances (see _extend_problem). Each location costs O(trucks x route length) array
+        work, so this answers in milliseconds where the full optimization fetches the fleet,
+        distance matrix and weather and then searches.
+        
+        An order goes on the trailer its truck already pulls when that one suits it, else on
+        a suitable trailer no other truck pulls. The plan's trailers are not changed until the
+        returned plan is accepted.
+        
+        Args:
+            orders: Orders to place
+            
+        Returns:
+            The plan with the orders inserted (see accept_plan), or None when the orders have
+            no recent plan or span several depots' plans, or an order does not fit anywhere
+            without breaking a time window or has no trailer
+        """
+        depot_location = self._orders_depot(orders)
+        if depot_location is None:
+            return None
+        context = self.plan_contexts[depot_location]
+        if time.monotonic() - context.recorded_at > self.fast_path_max_age:
+            return None
+        
+        start = time.perf_counter()
+        problem = await self._extend_problem(context.problem, orders)
+        trucks = context.trucks
+        nodes = {location: node for node, location in enumerate(problem.locations)}
+        plan = self.route_plans.get(depot_location, {})
+        routes = [[nodes[location] for location in plan.get(truck.id, []) if location in nodes] for truck in trucks]
+        
+        visited = {problem.depot}.union(*routes)
+        order_nodes = [nodes[location] for order in orders for location in (order.ship_from, order.ship_to)]
+        routes = insert_nodes(
+            routes, [node for node in dict.fromkeys(order_nodes) if node not in visited],
+            problem.distance_matrix, problem.time_matrix, problem.time_windows, problem.depot
+        )
+        # New orders can tighten the window of a location already on a route
+        if routes is None or any(
+            route_schedule(route, problem.time_matrix, problem.time_windows, problem.depot)[1][0] < 0 for route in routes
+        ):
+            return None
+        
+        trailers = [trailer.model_copy() for trailer in context.trailers]
+        hitches = dict(context.hitches)
+        assignments = []
+        for order in orders:
+            stops = [nodes[order.ship_from], nodes[order.ship_to]]
+            placed = next(
+                ((truck, route) for truck, route in zip(trucks, routes) if any(node in route for node in stops)), None
+            )
+            if placed is None:
+                return None
+            truck, route = placed
+            trailer = self._find_truck_trailer(order, truck, trailers, hitches)
+            if trailer is None:
+                return None
+            trailer.current_weight_kg += order.weight_kg
+            hitches[truck.id] = trailer.id
+            assignments.append(OrderAssignment(
+                order_id=order.id,
+                truck_id=truck.id,
+                trailer_id=trailer.id,
+                sequence=min(route.index(node) for node in stops if node in route),
+                assigned_by="OptimizationEngine",
+                assigned_at=datetime.utcnow()
+            ))
+        
+        solution = RoutingSolution(
+            routes=routes,
+            objective=route_cost(problem, routes),
+            solutions=0,
+            solve_time=time.perf_counter() - start,
+            cancelled=False,
+            strategy="INSERTION",
+            stop_reason=STOP_COMPLETED
+        )
+        return AssignmentPlan(assignments, problem, solution, trucks, trailers, frozenset(plan))
+
+    def _orders_depot(self, orders: List[Order]) -> Optional[str]:
+        """
+        Depot of the plan the orders belong to: the one whose locations include every order's
+        pickup (None when no plan or several plans do)
+        """
+        depots = [
+            depot_location for depot_location, context in self.plan_contexts.items()
+            if all(order.ship_from in context.problem.locations for order in orders)
+        ]
+        return depots[0] if len(depots) == 1 else None
+
+    def _find_truck_trailer(self, order: Order, truck: Truck, trailers: List[Trailer],
+                            hitches: Dict[str, str]) -> Optional[Trailer]:
+        """Trailer for an order on a truck: the one it pulls if suitable, else a suitable one no other truck pulls"""
+        with_room = [trailer for trailer in trailers if trailer.max_weight_kg - trailer.current_weight_kg >= order.weight_kg]
+        hitched = [trailer for trailer in with_room if trailer.id == hitches.get(truck.id)]
+        pulled = {trailer_id for truck_id, trailer_id in hitches.items() if truck_id != truck.id}
+        return (self._find_suitable_trailer(order, hitched)
+                or self._find_suitable_trailer(order, [trailer for trailer in with_room if trailer.id not in pulled]))
+
+    async def _extend_problem(self, problem: RoutingProblem, orders: List[Order]) -> RoutingProblem:
+        """
+        Add the orders' locations a plan's problem does not have yet, and tighten windows for their priorities
+        
+        The new locations' distances and travel times are straight-line distances scaled by
+        the median road distance and time per straight-line km between the plan's known
+        locations, so they are comparable to the plan's road matrices (ROAD_DISTANCE_FACTOR
+        at ESTIMATED_SPEED_KMH when there are none to scale by).
+        """
+        locations = list(problem.locations)
+        new_locations = [
+            location for location in dict.fromkeys(location for order in orders for location in (order.ship_from, order.ship_to))
+            if location not in locations
+        ]
+        distance_matrix, time_matrix = problem.distance_matrix, problem.time_matrix
+        if new_locations:
+            locations += new_locations
+            known = len(problem.locations)
+            distance_km = np.asarray(await self.rate_service.get_distance_matrix(locations), dtype=np.float64)
+            metres_per_km, minutes_per_km = self._road_scales(problem, distance_km[:known, :known])
+            distance = distance_km * metres_per_km
+            distance[:known, :known] = problem.distance_matrix
+            travel_time = distance_km * minutes_per_km
+            travel_time[:known, :known] = problem.time_matrix
+            distance_matrix = to_int_matrix(distance, UNREACHABLE_DISTANCE)
+            time_matrix = to_int_matrix(travel_time, UNREACHABLE_TIME)
+        
+        time_windows = list(problem.time_windows) + [(0, 1440)] * len(new_locations)
+        for node, (earliest, latest) in enumerate(self._get_time_windows(orders, locations)):
+            time_windows[node] = (max(time_windows[node][0], earliest), min(time_windows[node][1], latest))
+        return problem._replace(
+            distance_matrix=distance_matrix, time_matrix=time_matrix, time_windows=time_windows, locations=locations
+        )
+
+    @staticmethod
+    def _road_scales(problem: RoutingProblem, distance_km: np.ndarray) -> Tuple[float, float]:
+        """Median road metres and minutes per straight-line km between a problem's locations"""
+        measured = (
+            np.isfinite(distance_km) & (distance_km > 0)
+            & (problem.distance_matrix < UNREACHABLE_DISTANCE) & (problem.time_matrix < UNREACHABLE_TIME)
+        )
+        if not measured.any():
+            return ROAD_DISTANCE_FACTOR * 1000, ROAD_DISTANCE_FACTOR * 60 / ESTIMATED_SPEED_KMH
+        return (
+            float(np.median(problem.distance_matrix[measured] / distance_km[measured])),
+            float(np.median(problem.time_matrix[measured] / distance_km[measured]))
+        )
+
+    async def prepare_problem(self, orders: List[Order], warm_start: bool = True) -> Optional[Tuple[RoutingProblem, List[Truck], List[Trailer]]]:
+        """
+        Fetch the fleet and build the routing problem for a set of orders
+        
+        When a plan was accepted earlier for the same depot, the problem starts from its
+        routes: locations that are gone are dropped, new ones are inserted where they add
+        the least distance, and the search gets the shorter warm start time limit.
+        
+        The time limit grows with the number of locations (see get_time_limit), and the
+        search stops early once the objective stops improving (plateau_improvement and
+        plateau_time).
+        
+        Args:
+            orders: List of orders to optimize
+            warm_start: Start from the last accepted plan when there is one
+            
+        Returns:
+            Tuple of (problem, trucks, trailers), or None when no trucks or trailers are available
+        """
         # Get available resources
         trucks = await self.samsara.get_available_trucks()
         trailers = await self.samsara.get_available_trailers()
         
         if not trucks or not trailers:
-            return []
+            return None
 
-        # Create distance matrix and time windows
-        distance_matrix, time_windows = await self._create_distance_matrix(orders, trucks)
-        
-        # Create routing index manager
-        manager = pywrapcp.RoutingIndexManager(
-            len(distance_matrix),
-            len(trucks),
-            [0] * len(trucks),  # All trucks start at depot
-            [0] * len(trucks)   # All trucks end at depot
+        # Create integer distance and time matrices and time windows
+        distance_matrix, time_matrix, time_windows = await self._create_distance_matrix(orders, trucks)
+        problem = RoutingProblem(
+            distance_matrix=distance_matrix,
+            time_matrix=time_matrix,
+            time_windows=time_windows,
+            num_vehicles=len(trucks),
+            time_limit=self.get_time_limit(len(distance_matrix)),
+            locations=self._get_locations(orders, trucks),
+            plateau_improvement=self.plateau_improvement,
+            plateau_time=self.plateau_time
         )
+        
+        if warm_start:
+            initial_routes = self._warm_start_routes(problem, trucks)
+            if initial_routes is not None:
+                problem = problem._replace(
+                    initial_routes=initial_routes,
+                    time_limit=min(problem.time_limit, self.warm_start_time_limit)
+                )
+        return problem, trucks, trailers
 
-        # Create routing model
-        routing = pywrapcp.RoutingModel(manager)
+    def get_time_limit(self, locations: int) -> float:
+        """
+        Search time for a problem of a given size
+        
+        Args:
+            locations: Number of locations (nodes) in the problem
+            
+        Returns:
+            optimization_time_per_location per location, between min_optimization_time
+            and max_optimization_time seconds
+        """
+        time_limit = max(self.min_optimization_time, locations * self.optimization_time_per_location)
+        return min(time_limit, self.max_optimization_time)
 
-        # Define cost of each arc
-        def distance_callback(from_index, to_index):
-            return distance_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+    def _warm_start_routes(self, problem: RoutingProblem, trucks: List[Truck]) -> Optional[List[List[int]]]:
+        """
+        Routes of the last accepted plan for the problem's depot, mapped onto its nodes
+        
+        Returns:
+            Complete routes for every truck, or None without a plan (or if a new location
+            cannot be inserted without breaking a time window)
+        """
+        plan = self.route_plans.get(problem.locations[problem.depot])
+        if not plan:
+            return None
+        
+        nodes = {location: node for node, location in enumerate(problem.locations)}
+        routes = []
+        kept = {problem.depot}
+        for truck in trucks:
+            route = []
+            for location in plan.get(truck.id, []):
+                node = nodes.get(location)
+                if node is not None and node not in kept:
+                    route.append(node)
+                    kept.add(node)
+            routes.append(route)
+        
+        new_nodes = [node for node in range(len(problem.locations)) if node not in kept]
+        return insert_nodes(
+            routes, new_nodes, problem.distance_matrix, problem.time_matrix, problem.time_windows, problem.depot
+        )
 
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    def record_plan(self, problem: RoutingProblem, solution: RoutingSolution, trucks: List[Truck],
+                    trailers: Optional[List[Trailer]] = None,
+                    assignments: Optional[List[OrderAssignment]] = None,
+                    kept_trucks: FrozenSet[str] = frozenset()) -> None:
+        """
+        Keep a solution's routes as the accepted plan for its depot, to warm start the next
+        solve; with the trailers, also its fleet, matrices and trailer hitches for the fast
+        path. With the applied assignments, only the routes of trucks that were assigned
+        orders (or are in kept_trucks, for an insertion into the previous plan) are kept.
+        """
+        if not problem.locations or (assignments is not None and not assignments):
+            return
+        assigned = None if assignments is None else {assignment.truck_id for assignment in assignments} | kept_trucks
+        depot_location = problem.locations[problem.depot]
+        self.route_plans[depot_location] = {
+            truck.id: [problem.locations[node] for node in route]
+            for truck, route in zip(trucks, solution.routes) if assigned is None or truck.id in assigned
+        }
+        if trailers is not None:
+            previous = self.plan_contexts.get(depot_location)
+            hitches = {
+                truck_id: trailer_id for truck_id, trailer_id in (previous.hitches.items() if previous else ())
+                if truck_id in kept_trucks
+            }
+            hitches.update((assignment.truck_id, assignment.trailer_id) for assignment in assignments or ())
+            self.plan_contexts[depot_location] = PlanContext(
+                problem._replace(initial_routes=None), trucks, trailers, hitches, time.monotonic()
+            )
 
-        # Add time window constraints
-        def time_callback(from_index, to_index):
-            return time_windows[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+    def reset_plans(self) -> None:
+        """Forget the accepted plans, so the next solves start from scratch"""
+        self.route_plans.clear()
+        self.plan_contexts.clear()
 
-        time_callback_index = routing.RegisterTransitCallback(time_callback)
-        routing.AddDimension(
-            time_callback_index,
-            30,  # Allow waiting time
-            1440,  # Maximum time per vehicle (24 hours)
-            False,  # Don't force start cumul to zero
-            'Time'
-        )
-        time_dimension = routing.GetDimensionOrDie('Time')
+    async def solve(self, problem: RoutingProblem, cancel_event: Optional[Any] = None,
+                    progress: Optional[Any] = None, decompose: Optional[bool] = None,
+                    portfolio: Optional[bool] = None) -> Optional[RoutingSolution]:
+        """
+        Solve a routing problem in the solver process pool
+        
+        Args:
+            problem: Problem to solve
+            cancel_event: Event that stops the search when set
+            progress: Dict updated with the solver's progress
+            decompose: Split the problem by region and solve the regions in parallel;
+                by default when it has more than decomposition_threshold locations
+            portfolio: Solve with every strategy in PORTFOLIO_STRATEGIES at once and keep
+                the best routes (default: the engine's portfolio setting); not used
+                when the problem is split by region
+            
+        Returns:
+            The best solution found, or None if there is none
+        """
+        if decompose is None:
+            decompose = 0 < self.decomposition_threshold < len(problem.distance_matrix)
+        if decompose and not problem.initial_routes and problem.num_vehicles > 1:
+            return await self._solve_decomposed(problem, cancel_event, progress)
+        if self.portfolio if portfolio is None else portfolio:
+            return await self._solve_portfolio(problem, cancel_event, progress)
+        return await self._solve_in_pool(problem, cancel_event, progress)
 
-        # Add time window constraints for each location
-        for location_idx, time_window in enumerate(time_windows[0]):
-            index = manager.NodeToIndex(location_idx)
-            time_dimension.CumulVar(index).SetRange(time_window[0], time_window[1])
+    async def _solve_portfolio(self, problem: RoutingProblem, cancel_event: Optional[Any] = None,
+                               progress: Optional[Any] = None) -> Optional[RoutingSolution]:
+        """
+        Solve a routing problem with several search strategies at once, keeping the best routes
+        
+        Each strategy runs in its own solver process under the problem's time limit, shared
+        out when there are more strategies than processes. Progress follows the first
+        strategy. The winner is counted in strategy_stats.
+        """
+        rounds = math.ceil(len(PORTFOLIO_STRATEGIES) / max(SOLVER_WORKERS, 1))
+        members = [
+            problem._replace(first_solution_strategy=first_solution, local_search_metaheuristic=metaheuristic,
+                             time_limit=problem.time_limit / rounds)
+            for first_solution, metaheuristic in PORTFOLIO_STRATEGIES
+        ]
+        solutions = await asyncio.gather(*(
+            self._solve_in_pool(member, cancel_event, progress if i == 0 else None) for i, member in enumerate(members)
+        ))
+        
+        found = [solution for solution in solutions if solution is not None]
+        if not found:
+            return None
+        best = min(found, key=lambda solution: solution.objective)
+        for member, solution in zip(members, solutions):
+            stats = self.strategy_stats.setdefault(member.strategy, {"runs": 0, "wins": 0})
+            stats["runs"] += 1
+            stats["wins"] += solution is best
+        print("Portfolio objectives: " + ", ".join(
+            f"{member.strategy} {'-' if solution is None else solution.objective}" for member, solution in zip(members, solutions)
+        ) + f"; best {best.strategy}")
+        return best._replace(
+            solutions=sum(solution.solutions for solution in found),
+            cancelled=any(solution.cancelled for solution in found)
+        )
 
-        # Add time window constraints for each vehicle start node
-        for vehicle_id in range(len(trucks)):
-            index = routing.Start(vehicle_id)
-            time_dimension.CumulVar(index).SetRange(time_windows[0][0], time_windows[0][1])
+    async def _solve_in_pool(self, problem: RoutingProblem, cancel_event: Optional[Any] = None,
+                             progress: Optional[Any] = None) -> Optional[RoutingSolution]:
+        """Solve a routing problem in one solver process"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(get_solver_pool(), solve_routing, problem, cancel_event, progress)
+        except BrokenProcessPool:
+            # A solver process died; start a fresh pool for the next solve
+            shutdown_solver_pool(wait=False)
+            raise
 
-        # Setting first solution heuristic
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    async def _solve_decomposed(self, problem: RoutingProblem, cancel_event: Optional[Any] = None,
+                                progress: Optional[Any] = None) -> Optional[RoutingSolution]:
+        """
+        Solve a large routing problem region by region
+        
+        Locations are clustered into regions of about decomposition_cluster_size, each
+        region gets a share of the trucks in proportion to its size, and the regions are
+        solved at once across the solver processes. The merged routes then seed a short
+        solve of the whole problem, which moves stops across region boundaries.
+        """
+        nodes = [node for node in range(len(problem.distance_matrix)) if node != problem.depot]
+        count = min(math.ceil(len(nodes) / max(self.decomposition_cluster_size, 1)), problem.num_vehicles)
+        if count < 2:
+            return await self._solve_in_pool(problem, cancel_event, progress)
+        
+        clusters = cluster_nodes(problem.distance_matrix, nodes, count)
+        vehicles = share_vehicles([len(cluster) for cluster in clusters], problem.num_vehicles)
+        
+        # Regions beyond the number of solver processes wait for a free one
+        rounds = math.ceil(len(clusters) / max(SOLVER_WORKERS, 1))
+        region_time_limit = problem.time_limit * (1 - self.decomposition_repair_share) / rounds
+        subproblems = split_problem(problem, clusters, vehicles, region_time_limit)
+        print(f"Solving {len(nodes)} locations as {len(clusters)} regions "
+              f"({', '.join(str(len(cluster)) for cluster in clusters)} locations)")
+        
+        solutions = await asyncio.gather(*(self._solve_in_pool(subproblem, cancel_event) for subproblem, _ in subproblems))
+        if any(solution is None for solution in solutions):
+            print("A region has no feasible routes with its share of trucks, solving the whole problem")
+            return await self._solve_in_pool(problem, cancel_event, progress)
+        
+        merged = merge_solutions(problem, subproblems, solutions)
+        if merged.cancelled:
+            return merged
+        
+        # Repair the region boundaries from the merged routes
+        repaired = await self._solve_in_pool(
+            problem._replace(initial_routes=merged.routes, time_limit=problem.time_limit * self.decomposition_repair_share),
+            cancel_event,
+            progress
         )
-        search_parameters.time_limit.FromSeconds(self.max_optimization_time)
-
-        # Solve the problem
-        solution = routing.SolveWithParameters(search_parameters)
+        if repaired is None or repaired.objective > merged.objective:
+            return merged
+        return repaired._replace(solutions=repaired.solutions + merged.solutions)
 
-        if solution:
-            return self._extract_assignments(solution, routing, manager, orders, trucks, trailers)
-        return []
+    @staticmethod
+    def _get_locations(orders: List[Order], trucks: List[Truck]) -> List[str]:
+        """Locations of the routing problem's nodes: truck warehouses, then order pickup and delivery locations"""
+        locations = [truck.warehouse for truck in trucks] + [order.ship_from for order in orders] + [order.ship_to for order in orders]
+        return list(dict.fromkeys(locations))  # Preserve order while removing duplicates
 
-    async def _create_distance_matrix(self, orders: List[Order], trucks: List[Truck]) -> Tuple[List[List[float]], List[List[int]]]:
+    async def _create_distance_matrix(self, orders: List[Order], trucks: List[Truck]) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, int]]]:
         """
-        Create distance matrix and time windows for optimization using Google Maps API
+        Create distance and time matrices and time windows for optimization using Google Maps API
         
         Args:
             orders: List of orders to optimize
             trucks: List of available trucks
             
         Returns:
-            Tuple of (distance_matrix, time_windows)
+            Tuple of (distance_matrix, time_matrix, time_windows): integer matrices in metres
+            and minutes, and an (earliest, latest) window in minutes for each location
         """
-        # Get all locations (truck warehouses and order pickup/delivery locations)
-        locations = [truck.warehouse for truck in trucks] + [order.ship_from for order in orders] + [order.ship_to for order in orders]
-        unique_locations = list(dict.fromkeys(locations))  # Preserve order while removing duplicates
+        unique_locations = self._get_locations(orders, trucks)
         
-        # Get distance and time matrices from Google Maps API
+        # Get distance (metres) and time (minutes) matrices from Google Maps API
         try:
             distance_matrix, time_matrix = await self.google_maps.get_route_matrix(unique_locations)
+            distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+            time_matrix = np.asarray(time_matrix, dtype=np.float64) / 60  # Seconds to minutes
             print(f"Successfully retrieved distance matrix from Google Maps API for {len(unique_locations)} locations")
         except Exception as e:
             print(f"Error getting distance matrix from Google Maps API: {str(e)}")
             print("Falling back to rate service distance matrix")
-            # Fallback to rate service distance matrix
-            distance_matrix = await self.rate_service.get_distance_matrix(unique_locations)
-            # Create a simple time matrix (assuming 60 km/h average speed)
-            time_matrix = [[d / 1000 * 60 for d in row] for row in distance_matrix]
+            # Fallback to rate service distance matrix (km, inf for unknown locations)
+            distance_km = np.asarray(await self.rate_service.get_distance_matrix(unique_locations), dtype=np.float64)
+            distance_matrix = distance_km * 1000
+            # Create a simple time matrix (assuming 60 km/h average speed, i.e. one minute per km)
+            time_matrix = distance_km.copy()
         
         # Get weather data for each location to adjust travel times
         weather_adjustments = await self._get_weather_adjustments(unique_locations)
         
-        # Apply weather adjustments to travel times
-        for i in range(len(time_matrix)):
-            for j in range(len(time_matrix[i])):
-                if i != j:  # Skip self-loops
-                    # Increase travel time based on weather conditions
-                    time_matrix[i][j] *= (1 + weather_adjustments[j])
+        # Increase travel time into each location based on its weather conditions
+        time_matrix = time_matrix * (1 + np.asarray(weather_adjustments, dtype=np.float64))[np.newaxis, :]
         
-        # Create time windows based on order priorities
+        return (
+            to_int_matrix(distance_matrix, UNREACHABLE_DISTANCE),
+            to_int_matrix(time_matrix, UNREACHABLE_TIME),
+            self._get_time_windows(orders, unique_locations)
+        )
+
+    @staticmethod
+    def _get_time_windows(orders: List[Order], locations: List[str]) -> List[Tuple[int, int]]:
+        """Time windows (minutes) of locations, based on the priority of the first order shipping from each"""
+        first_pickups = {}
+        for order in orders:
+            first_pickups.setdefault(order.ship_from, order)
         time_windows = []
-        for location in unique_locations:
-            # Find if this location is an order's ship_from
-            order_idx = next((i for i, order in enumerate(orders) if order.ship_from == location), None)
+        for location in locations:
+            # Find the first order shipping from this location
+            order = first_pickups.get(location)
             
-            if order_idx is not None:
-                order = orders[order_idx]
+            if order is not None:
                 if order.priority == "high":
-                    time_windows.append([0, 240])  # 4 hours
+                    time_windows.append((0, 240))  # 4 hours
                 elif order.priority == "medium":
-                    time_windows.append([0, 480])  # 8 hours
+                    time_windows.append((0, 480))  # 8 hours
                 else:
-                    time_windows.append([0, 1440])  # 24 hours
+                    time_windows.append((0, 1440))  # 24 hours
             else:
                 # For truck warehouses and other locations
-                time_windows.append([0, 1440])  # 24 hours
-        
-        return distance_matrix, time_windows
+                time_windows.append((0, 1440))  # 24 hours
+        return time_windows
     
     async def _get_weather_adjustments(self, locations: List[str]) -> List[float]:
         """
@@ -196,14 +641,14 @@ class OptimizationEngine:
         
         return adjustments
 
-    def _extract_assignments(self, solution, routing, manager, orders, trucks, trailers) -> List[OrderAssignment]:
+    def extract_assignments(self, solution: RoutingSolution, problem: RoutingProblem, orders: List[Order],
+                             trucks: List[Truck], trailers: List[Trailer]) -> List[OrderAssignment]:
         """
         Extract assignments from the solution with cost/revenue optimization
         
         Args:
-            solution: OR-Tools solution
-            routing: OR-Tools routing model
-            manager: OR-Tools routing index manager
+            solution: Routes found by the solver
+            problem: The routing problem that was solved
             orders: List of orders
             trucks: List of trucks
             trailers: List of trailers
@@ -217,14 +662,13 @@ class OptimizationEngine:
         # Extract routes and calculate metrics for each vehicle
         for vehicle_id in range(len(trucks)):
             truck = trucks[vehicle_id]
-            route = []
+            route = [problem.depot]
             route_orders = []
             total_distance = 0
             total_time = 0
             
-            index = routing.Start(vehicle_id)
-            while not routing.IsEnd(index):
-                node_index = manager.IndexToNode(index)
+            previous_node = problem.depot
+            for node_index in solution.routes[vehicle_id]:
                 route.append(node_index)
                 
                 if node_index >= len(trucks):  # Skip depot nodes
@@ -232,13 +676,10 @@ class OptimizationEngine:
                     if order_index < len(orders):
                         route_orders.append(orders[order_index])
                 
-                previous_index = index
-                index = solution.Value(routing.NextVar(index))
-                
-                # Add distance and time between nodes
-                if not routing.IsEnd(index):
-                    total_distance += routing.GetArcCostForVehicle(previous_index, index, vehicle_id)
-                    total_time += routing.GetArcCostForVehicle(previous_index, index, vehicle_id) / 60  # Convert to minutes
+                # Add distance (metres) and travel time (minutes) between nodes
+                total_distance += int(problem.distance_matrix[previous_node, node_index])
+                total_time += int(problem.time_matrix[previous_node, node_index])
+                previous_node = node_index
             
             # Calculate revenue, cost, and profit for this route
             revenue = self._calculate_route_revenue(route_orders)
@@ -309,8 +750,12 @@ class OptimizationEngine:
         total_revenue = 0.0
         
         for order in orders:
-            # Estimate revenue based on weight and distance
-            # In a real system, this would come from the rate tables or pricing API
+            # Use the rate sheet quote stored when the order was ingested
+            if order.quoted_rate is not None:
+                total_revenue += order.quoted_rate
+                continue
+            
+            # Otherwise estimate revenue based on weight and distance
             base_rate = 100.0  # Base rate in dollars
             weight_factor = order.weight_kg / 1000.0  # Convert to tons
             distance_factor = 1.0  # Default distance factor
@@ -411,3 +856,17 @@ class OptimizationEngine:
                 (not order.special_requirements.get("requires_heating") or trailer.has_pallet_jack)):
                 return trailer
         return None
+
+
+# Process-wide OptimizationEngine shared by the API routers, the optimization jobs and main
+_shared_optimization_engine: Optional[OptimizationEngine] = None
+_shared_optimization_engine_lock = threading.Lock()
+
+def get_optimization_engine() -> OptimizationEngine:
+    """Get the OptimizationEngine shared by everything in this process"""
+    global _shared_optimization_engine
+    if _shared_optimization_engine is None:
+        with _shared_optimization_engine_lock:
+            if _shared_optimization_engine is None:
+                _shared_optimization_engine = OptimizationEngine()
+    return _shared_optimization_engine
@@ -0,0 +1,249 @@
+import os
+import uuid
+import asyncio
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from ..models.order_models import Order, OrderAssignment
+from ..models.optimization_models import OptimizationJob, OptimizationJobStatus, OptimizationProgress
+from .optimization_engine import AssignmentPlan, OptimizationEngine, get_optimization_engine
+
+logger = logging.getLogger("OptimizationJobs")
+
+# Finished jobs kept for status and result queries; the oldest are dropped first
+OPTIMIZATION_JOBS_KEPT = int(os.getenv("OPTIMIZATION_JOBS_KEPT", "100"))
+
+FINISHED_STATUSES = (OptimizationJobStatus.COMPLETED, OptimizationJobStatus.FAILED, OptimizationJobStatus.CANCELLED)
+
+# Applies a job's assignments (e.g. in Samsara and the database) and returns how many were applied
+ApplyAssignments = Callable[[List[OrderAssignment]], Awaitable[int]]
+
+
+class OptimizationJobRecord:
+    """In-memory state of one optimization job"""
+
+    def __init__(self, job_id: str, orders: List[Order], apply: Optional[ApplyAssignments], warm_start: bool = True,
+                 decompose: Optional[bool] = None, portfolio: Optional[bool] = None):
+        self.job_id = job_id
+        self.orders = orders
+        self.apply = apply
+        self.warm_start = warm_start
+        self.decompose = decompose
+        self.portfolio = portfolio
+        self.strategy: Optional[str] = None  # Search strategy of the routes found
+        self.stop_reason: Optional[str] = None  # Why the search stopped
+        self.improvements: List[Tuple[float, int]] = []  # (elapsed seconds, objective) at each new best objective
+        self.status = OptimizationJobStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.assignments: List[OrderAssignment] = []
+        self.assigned_count = 0
+        self.cancel_requested = False
+        self.cancel_event: Optional[Any] = None  # Managed event shared with the solver process
+        self.progress: Optional[Any] = None  # Managed dict the solver process publishes its progress to
+        self.last_progress: dict = {}  # Progress read when the solve finished
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+class OptimizationJobService:
+    """
+    Runs order optimizations as background jobs
+
+    A job fetches the fleet and builds the distance and time matrices on the event loop,
+    then solves in the shared solver process pool. Solver progress and cancel requests
+    go through a multiprocessing manager, so status queries and cancellation work while
+    the search runs in another process, and several jobs solve at once across cores.
+    """
+
+    def __init__(self, engine: OptimizationEngine, max_jobs: int = OPTIMIZATION_JOBS_KEPT):
+        self.engine = engine
+        self.max_jobs = max(max_jobs, 1)
+        self.jobs: "OrderedDict[str, OptimizationJobRecord]" = OrderedDict()
+        self.manager = None
+        self.lock = threading.Lock()
+
+    def _get_manager(self):
+        """Get the multiprocessing manager holding the jobs' events and progress, starting it on first use"""
+        with self.lock:
+            if self.manager is None:
+                self.manager = multiprocessing.get_context("spawn").Manager()
+            return self.manager
+
+    def _attach_channels(self, job: OptimizationJobRecord):
+        """Create the job's cancel event and progress dict (blocking: talks to the manager process)"""
+        manager = self._get_manager()
+        job.cancel_event = manager.Event()
+        job.progress = manager.dict()
+
+    def submit(self, orders: List[Order], apply: Optional[ApplyAssignments] = None,
+               warm_start: bool = True, decompose: Optional[bool] = None,
+               portfolio: Optional[bool] = None) -> OptimizationJobRecord:
+        """
+        Start optimizing orders in the background (call from the event loop)
+
+        Args:
+            orders: Orders to optimize
+            apply: Coroutine function applying the assignments once the job completes
+            warm_start: Start from the engine's last accepted plan for the depot
+            decompose: Solve by region (by default when the problem is large)
+            portfolio: Solve with several strategies at once (default: the engine's setting)
+
+        Returns:
+            The queued job
+        """
+        job = OptimizationJobRecord(uuid.uuid4().hex, orders, apply, warm_start, decompose, portfolio)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self._trim()
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def _trim(self):
+        """Drop the oldest finished jobs beyond max_jobs (caller holds the lock)"""
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:max(excess, 0)]:
+            del self.jobs[job_id]
+
+    async def _run(self, job: OptimizationJobRecord):
+        """Prepare, solve and apply a job, recording its status"""
+        job.status = OptimizationJobStatus.PREPARING
+        job.started_at = datetime.utcnow()
+        plan: Optional[AssignmentPlan] = None
+        try:
+            await asyncio.to_thread(self._attach_channels, job)
+            prepared = await self.engine.prepare_problem(job.orders, job.warm_start)
+            if prepared is not None and not job.cancel_requested:
+                problem, trucks, trailers = prepared
+                job.status = OptimizationJobStatus.SOLVING
+                solution = await self.engine.solve(problem, job.cancel_event, job.progress, job.decompose, job.portfolio)
+                job.last_progress = await asyncio.to_thread(dict, job.progress)
+                if solution:
+                    job.stop_reason = solution.stop_reason
+                    job.improvements = list(solution.improvements)
+                if solution and not job.cancel_requested:
+                    job.strategy = solution.strategy
+                    job.assignments = self.engine.extract_assignments(solution, problem, job.orders, trucks, trailers)
+                    plan = AssignmentPlan(job.assignments, problem, solution, trucks, trailers)
+
+            if job.cancel_requested:
+                job.status = OptimizationJobStatus.CANCELLED
+            else:
+                if job.apply and job.assignments:
+                    job.assigned_count = await job.apply(job.assignments)
+                    if job.assigned_count:
+                        # Only applied assignments become the plan the next re-plan starts from
+                        self.engine.accept_plan(plan)
+                job.status = OptimizationJobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = OptimizationJobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Optimization job {job.job_id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = OptimizationJobStatus.FAILED
+        finally:
+            job.finished_at = datetime.utcnow()
+            job.cancel_event = job.progress = None  # Release the managed objects
+
+    def get(self, job_id: str) -> Optional[OptimizationJobRecord]:
+        """Get a job by id"""
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[OptimizationJobRecord]:
+        """Get every job still kept, oldest first"""
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[OptimizationJobRecord]:
+        """
+        Cancel a job: a preparing job stops right away, a solving job at the solver's next
+        cancel check; no assignments are applied. Finished jobs are left as they are.
+
+        Returns:
+            The job, or None if there is no such job
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        if job.status == OptimizationJobStatus.SOLVING and job.cancel_event is not None:
+            self._set_cancel_event(job.job_id, job.cancel_event)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def cancel_async(self, job_id: str) -> Optional[OptimizationJobRecord]:
+        """cancel for the event loop: a solving job's cancel event is set on a worker thread"""
+        job = self.jobs.get(job_id)
+        cancel_event = job.cancel_event if job is not None else None
+        if job is None or job.finished or job.status != OptimizationJobStatus.SOLVING or cancel_event is None:
+            return self.cancel(job_id)
+        job.cancel_requested = True
+        await asyncio.to_thread(self._set_cancel_event, job_id, cancel_event)
+        return job
+
+    def _set_cancel_event(self, job_id: str, cancel_event: Any):
+        """Signal the solver process to stop (blocking: talks to the manager process)"""
+        try:
+            cancel_event.set()
+        except Exception as e:
+            logger.error(f"Error cancelling optimization job {job_id}: {str(e)}")
+
+    async def wait(self, job: OptimizationJobRecord) -> OptimizationJobRecord:
+        """Wait for a job to finish"""
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job
+
+    def describe(self, job: OptimizationJobRecord) -> OptimizationJob:
+        """Get a job's status and solver progress (blocking while the job solves: reads the manager's dict)"""
+        progress = job.last_progress
+        if job.status == OptimizationJobStatus.SOLVING and job.progress is not None:
+            try:
+                progress = dict(job.progress)
+            except Exception as e:
+                logger.warning(f"Error reading progress of optimization job {job.job_id}: {str(e)}")
+        return OptimizationJob(
+            job_id=job.job_id,
+            status=job.status,
+            order_ids=[order.id for order in job.orders],
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            progress=OptimizationProgress(**progress),
+            strategy=job.strategy,
+            stop_reason=job.stop_reason,
+            error=job.error
+        )
+
+    def shutdown(self):
+        """Cancel unfinished jobs and stop the manager process"""
+        for job in self.list_jobs():
+            self.cancel(job.job_id)
+        with self.lock:
+            manager, self.manager = self.manager, None
+        if manager is not None:
+            manager.shutdown()
+
+
+# Process-wide OptimizationJobService shared by the API routers and main
+_shared_optimization_jobs: Optional[OptimizationJobService] = None
+_shared_optimization_jobs_lock = threading.Lock()
+
+def get_optimization_jobs() -> OptimizationJobService:
+    """Get the OptimizationJobService shared by everything in this process"""
+    global _shared_optimization_jobs
+    if _shared_optimization_jobs is None:
+        with _shared_optimization_jobs_lock:
+            if _shared_optimization_jobs is None:
+                _shared_optimization_jobs = OptimizationJobService(get_optimization_engine())
+    return _shared_optimization_jobs
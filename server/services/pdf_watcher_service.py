@@ -12,6 +12,8 @@ from server.core.pdf_processor.enhanced_pdf_extractor import EnhancedPDFExtracto
 from server.models.order_models import Order, OrderStatus, OrderPriority
 from server.database import SessionLocal
 from server.database.models import OrderModel
+from server.services.rate_service import LBS_PER_KG, get_rate_service
+from server.crud.order_crud import apply_quote
 
 # Configure logging
 logging.basicConfig(
@@ -153,6 +155,7 @@ class PDFHandler(FileSystemEventHandler):
         notes += f"Enhanced Data: {json.dumps(enhanced_data, indent=2)}"
         
         # Create Order object
+        manufacturer = order_data.get("manufacturer")
         order = Order(
             id=order_data["id"],
             customer_id=order_data["customer_id"],
@@ -163,11 +166,13 @@ class PDFHandler(FileSystemEventHandler):
             weight_kg=order_data["weight_kg"],
             special_requirements=order_data.get("special_requirements", {}),
             notes=notes,
+            manufacturer=manufacturer if manufacturer and manufacturer != "UNKNOWN" else None,
             status=OrderStatus.PENDING,
             priority=OrderPriority.MEDIUM,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
+        order = self._quote_order(order, order_data)
         
         # Create database model
         db_order = OrderModel(
@@ -182,6 +187,12 @@ class PDFHandler(FileSystemEventHandler):
             weight_kg=order.weight_kg,
             special_requirements=order.special_requirements,
             notes=order.notes,
+            manufacturer=order.manufacturer,
+            quoted_rate=order.quoted_rate,
+            quote_warehouse=order.quote_warehouse,
+            quote_destination=order.quote_destination,
+            rate_sheet_version=order.rate_sheet_version,
+            quoted_at=order.quoted_at,
             created_at=order.created_at,
             updated_at=order.updated_at
         )
@@ -198,6 +209,29 @@ class PDFHandler(FileSystemEventHandler):
         finally:
             db.close()
 
+    def _quote_order(self, order: Order, order_data: Dict[str, Any]) -> Order:
+        """Price the order from the rate sheets, preferring the cleaner enhanced fields of the PDF"""
+        if not order.manufacturer:
+            return order
+        
+        weight_lbs = order_data.get("gross_weight_lbs") or order.weight_kg * LBS_PER_KG
+        try:
+            quote = get_rate_service().quote_shipments([(
+                order.manufacturer,
+                order_data.get("ship_from_location") or order.ship_from,
+                order_data.get("ship_to_city") or order.ship_to,
+                weight_lbs
+            )], [order.pickup_date])[0]
+        except Exception as e:
+            logger.warning(f"Error quoting order {order.id}: {str(e)}")
+            return order
+        
+        if quote is None:
+            logger.info(f"No rate sheet quote for order {order.id}")
+            return order
+        
+        return apply_quote(order, quote)
+
 class PDFWatcherService:
     """Service for watching and processing PDF files"""
     
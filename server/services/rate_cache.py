@@ -0,0 +1,75 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# (manufacturer, warehouse, normalized destination)
+LaneKey = Tuple[str, str, str]
+
+
+class LaneCache:
+    """Bounded LRU cache of resolved rate rows keyed by lane, with hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max(max_size, 0)
+        self.entries: "OrderedDict[LaneKey, Tuple[np.ndarray, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: LaneKey, mtime: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Get the rate row cached for a lane
+
+        Args:
+            key: Lane key
+            mtime: Workbook mtime the row must have been compiled from (None to accept any)
+
+        Returns:
+            The rate row, or None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (mtime is not None and entry[1] != mtime):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: LaneKey, row: np.ndarray, mtime: float):
+        """Cache the rate row for a lane, evicting the least recently used lane if full"""
+        if self.max_size == 0:
+            return
+        with self.lock:
+            self.entries[key] = (row, mtime)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, manufacturer: str, warehouse: str):
+        """Drop all lanes of a manufacturer's warehouse sheet"""
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == manufacturer and k[1] == warehouse]:
+                del self.entries[key]
+
+    def clear(self):
+        """Drop all lanes and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss/eviction counters"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .rate_index import CompiledRateSheet, RATE_COLUMN_COUNT, workbook_version
+
+logger = logging.getLogger("RateHistory")
+
+# Bump when the history file layout changes
+HISTORY_FORMAT = 1
+
+# Older versions materialized as compiled sheets, per sheet
+HISTORY_SHEETS_CACHED = 4
+
+# History files written by other processes are picked up at most this long after they change
+HISTORY_CHECK_INTERVAL = 1.0  # seconds
+
+# One effective-dated version of a sheet: its rows as indices into the sheet's row pool
+SheetVersion = namedtuple("SheetVersion", ["effective_from", "mtime", "row_ids"])
+
+
+def to_timestamp(when: Union[datetime, float]) -> float:
+    """Epoch seconds of a datetime (naive datetimes are UTC, as stored throughout) or a timestamp"""
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return when.timestamp()
+    return float(when)
+
+
+class RateSheetHistory:
+    """
+    Effective-dated versions of one rate sheet
+
+    Every distinct row (destination, province and rates) is stored once in a row pool and
+    each version is an index array into the pool, so a new version only adds the rows
+    that changed. Versions are materialized as compiled sheets on demand.
+    """
+
+    def __init__(self):
+        self.cities: List[Optional[str]] = []
+        self.provinces: List[Optional[str]] = []
+        self.rates = np.empty((0, RATE_COLUMN_COUNT))  # Capacity grows by doubling; only [:len(cities)] is filled
+        self.row_keys: Dict[Tuple[Optional[str], Optional[str], bytes], int] = {}
+        self.versions: List[SheetVersion] = []  # Sorted by effective_from; replaced, never mutated
+        self.effective_dates: List[float] = []
+        self.sheets: "OrderedDict[int, CompiledRateSheet]" = OrderedDict()  # Version index -> materialized sheet
+        self.lock = threading.Lock()
+
+    def add_version(self, compiled: CompiledRateSheet, effective_from: float) -> bool:
+        """
+        Add a version of the sheet effective from the given time
+
+        A version effective no later than the latest one (e.g. an old workbook copied back
+        with its mtime) takes effect now instead, so versions stay in load order.
+
+        Returns:
+            True if a version was added, False if the sheet is unchanged
+        """
+        with self.lock:
+            row_ids = self._pool_rows(compiled)
+            if self.versions:
+                latest = self.versions[-1]
+                if np.array_equal(latest.row_ids, row_ids):
+                    return False
+                if effective_from <= latest.effective_from:
+                    effective_from = max(time.time(), latest.effective_from + 1e-6)
+
+            self.versions = [*self.versions, SheetVersion(effective_from, compiled.mtime, row_ids)]
+            self.effective_dates = [*self.effective_dates, effective_from]
+            return True
+
+    def _pool_rows(self, compiled: CompiledRateSheet) -> np.ndarray:
+        """Map the sheet's rows to pool rows, adding rows the pool does not have yet (caller holds the lock)"""
+        row_ids = np.empty(len(compiled.cities), dtype=np.int32)
+        new_rows = []
+        for row, (city, province) in enumerate(zip(compiled.cities, compiled.provinces)):
+            key = (city, province, compiled.rates[row].tobytes())
+            pool_row = self.row_keys.get(key)
+            if pool_row is None:
+                pool_row = len(self.cities) + len(new_rows)
+                self.row_keys[key] = pool_row
+                new_rows.append(row)
+            row_ids[row] = pool_row
+
+        if new_rows:
+            count = len(self.cities)
+            total = count + len(new_rows)
+            if total > len(self.rates):
+                rates = np.empty((max(total, 2 * len(self.rates)), RATE_COLUMN_COUNT))
+                rates[:count] = self.rates[:count]
+                self.rates = rates
+            self.rates[count:total] = compiled.rates[new_rows]
+            self.cities.extend(compiled.cities[row] for row in new_rows)
+            self.provinces.extend(compiled.provinces[row] for row in new_rows)
+        return row_ids
+
+    def version_at(self, when: float) -> Optional[int]:
+        """Index of the version in effect at a time (the earliest version for earlier times)"""
+        if not self.versions:
+            return None
+        return max(bisect.bisect_right(self.effective_dates, when) - 1, 0)
+
+    def get_sheet(self, index: int) -> CompiledRateSheet:
+        """Get a version as a compiled sheet"""
+        with self.lock:
+            compiled = self.sheets.get(index)
+            if compiled is not None:
+                self.sheets.move_to_end(index)
+                return compiled
+
+            version = self.versions[index]
+            compiled = CompiledRateSheet.from_rows(
+                [self.cities[row] for row in version.row_ids],
+                self.rates[version.row_ids],
+                version.mtime,
+                [self.provinces[row] for row in version.row_ids]
+            )
+            self.sheets[index] = compiled
+            if len(self.sheets) > HISTORY_SHEETS_CACHED:
+                self.sheets.popitem(last=False)
+            return compiled
+
+
+class RateHistory:
+    """
+    Effective-dated versions of every rate sheet, persisted per manufacturer
+
+    Each workbook load is recorded as a new version of the sheets that changed, effective
+    from the workbook's modification time. With no history directory, versions are only
+    kept in memory.
+    """
+
+    def __init__(self, history_dir: Optional[str] = None):
+        self.history_dir = history_dir
+        self.histories: Dict[str, Dict[str, RateSheetHistory]] = {}
+        self.file_mtimes: Dict[str, Optional[float]] = {}  # History file mtime each manufacturer was loaded at
+        self.checked_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, manufacturer: str) -> str:
+        return os.path.join(self.history_dir, f"{manufacturer}.npz")
+
+    def _get_manufacturer(self, manufacturer: str) -> Dict[str, RateSheetHistory]:
+        """Get a manufacturer's sheet histories, (re)loading the history file if it changed"""
+        if not self.history_dir:
+            return self.histories.setdefault(manufacturer, {})
+
+        now = time.monotonic()
+        if manufacturer in self.histories and now - self.checked_at.get(manufacturer, float("-inf")) < HISTORY_CHECK_INTERVAL:
+            return self.histories[manufacturer]
+
+        with self.lock:
+            self.checked_at[manufacturer] = now
+            try:
+                file_mtime = os.path.getmtime(self._path(manufacturer))
+            except OSError:
+                file_mtime = None
+            if manufacturer not in self.histories or file_mtime != self.file_mtimes.get(manufacturer):
+                self.histories[manufacturer] = self._load(manufacturer) if file_mtime is not None else {}
+                self.file_mtimes[manufacturer] = file_mtime
+            return self.histories[manufacturer]
+
+    def _load(self, manufacturer: str) -> Dict[str, RateSheetHistory]:
+        """Read a manufacturer's history file"""
+        histories = {}
+        try:
+            with np.load(self._path(manufacturer), allow_pickle=False) as data:
+                manifest = json.loads(str(data["manifest"]))
+                if manifest.get("format") != HISTORY_FORMAT:
+                    logger.warning(f"Ignoring rate history of {manufacturer}: format {manifest.get('format')} is not supported")
+                    return {}
+                for index, (warehouse, sheet) in enumerate(manifest["sheets"].items()):
+                    history = RateSheetHistory()
+                    history.cities = sheet["cities"]
+                    history.provinces = sheet["provinces"]
+                    history.rates = data[f"rates_{index}"]
+                    history.row_keys = {
+                        (city, province, history.rates[row].tobytes()): row
+                        for row, (city, province) in enumerate(zip(history.cities, history.provinces))
+                    }
+                    row_ids = data[f"row_ids_{index}"]
+                    offset = 0
+                    for effective_from, mtime, count in sheet["versions"]:
+                        history.versions.append(SheetVersion(effective_from, mtime, row_ids[offset:offset + count]))
+                        history.effective_dates.append(effective_from)
+                        offset += count
+                    histories[warehouse] = history
+        except Exception as e:
+            logger.error(f"Error loading rate history of {manufacturer}: {str(e)}")
+        return histories
+
+    def _save(self, manufacturer: str):
+        """Write a manufacturer's history file, replacing it atomically"""
+        sheets = {}
+        arrays = {}
+        for index, (warehouse, history) in enumerate(self.histories.get(manufacturer, {}).items()):
+            sheets[warehouse] = {
+                "cities": history.cities,
+                "provinces": history.provinces,
+                "versions": [[v.effective_from, v.mtime, len(v.row_ids)] for v in history.versions],
+            }
+            arrays[f"rates_{index}"] = history.rates[:len(history.cities)]
+            arrays[f"row_ids_{index}"] = (
+                np.concatenate([v.row_ids for v in history.versions]) if history.versions else np.empty(0, dtype=np.int32)
+            )
+        manifest = {"format": HISTORY_FORMAT, "manufacturer": manufacturer, "sheets": sheets}
+
+        os.makedirs(self.history_dir, exist_ok=True)
+        path = self._path(manufacturer)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, manifest=np.array(json.dumps(manifest)), **arrays)
+        os.replace(tmp_path, path)
+        self.file_mtimes[manufacturer] = os.path.getmtime(path)
+
+    def record(self, manufacturer: str, mtime: float, sheets: Dict[str, CompiledRateSheet]) -> int:
+        """
+        Record a loaded workbook as new versions of the sheets that changed
+
+        Args:
+            manufacturer: Workbook name
+            mtime: Workbook modification time, the new versions' effective date
+            sheets: Compiled sheets keyed by warehouse
+
+        Returns:
+            Number of sheets that got a new version
+        """
+        histories = self._get_manufacturer(manufacturer)
+        changed = 0
+        for warehouse, compiled in sheets.items():
+            history = histories.get(warehouse)
+            if history is None:
+                history = histories[warehouse] = RateSheetHistory()
+            if history.add_version(compiled, mtime):
+                changed += 1
+
+        if changed and self.history_dir:
+            try:
+                with self.lock:
+                    self._save(manufacturer)
+            except Exception as e:
+                logger.error(f"Error saving rate history of {manufacturer}: {str(e)}")
+        return changed
+
+    def version_at(self, manufacturer: str, warehouse: str, when: Union[datetime, float]) -> Optional[int]:
+        """
+        Index of the sheet version in effect at a time
+
+        Returns:
+            The version index, or None when the latest version applies (or the sheet has no
+            history), i.e. when the current sheet should be used
+        """
+        history = self._get_manufacturer(manufacturer).get(warehouse)
+        if history is None:
+            return None
+        index = history.version_at(to_timestamp(when))
+        if index is None or index == len(history.versions) - 1:
+            return None
+        return index
+
+    def get_sheet(self, manufacturer: str, warehouse: str, index: int) -> Optional[CompiledRateSheet]:
+        """Get a version of a sheet as a compiled sheet"""
+        history = self._get_manufacturer(manufacturer).get(warehouse)
+        if history is None or not 0 <= index < len(history.versions):
+            return None
+        return history.get_sheet(index)
+
+    def get_versions(self, manufacturer: str, warehouse: str) -> List[Dict[str, Any]]:
+        """List the versions of a sheet with their effective dates and how many rows each changed"""
+        history = self._get_manufacturer(manufacturer).get(warehouse)
+        if history is None:
+            return []
+        versions = []
+        previous = np.empty(0, dtype=np.int32)
+        for version in history.versions:
+            versions.append({
+                "version": workbook_version(version.mtime),
+                "effective_from": datetime.utcfromtimestamp(version.effective_from),
+                "rows": len(version.row_ids),
+                "changed_rows": int(np.count_nonzero(~np.isin(version.row_ids, previous))),
+            })
+            previous = version.row_ids
+        return versions
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .destination_resolver import DestinationMatch, DestinationResolver
+
+# Rate sheet layout: destination city in the first column, province in the
+# second and the bracket rates in columns 3-9 (Minimum through 40000+ lbs)
+DESTINATION_COLUMN = 0
+PROVINCE_COLUMN = 1
+RATE_COLUMN_START = 3
+RATE_COLUMN_COUNT = 7
+
+# Inclusive upper weight (lbs) of each bracket; heavier shipments fall in the last bracket
+WEIGHT_BREAKPOINTS = np.array([1999.99, 4999.99, 9999.99, 19999.99])
+
+# Per bracket: multiplier applied to the capping column (bracket + 2) of the rate row
+BRACKET_CAP_MULTIPLIERS = np.array([20.0, 50.0, 100.0, 200.0, 1.0])
+
+
+def clean_rate_sheet(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the empty rows and columns that pad the Excel rate sheets"""
+    return df.dropna(how="all").dropna(axis=1, how="all")
+
+
+def normalize_destination(destination: str) -> str:
+    """Normalize a destination name for lookups (case and whitespace insensitive)"""
+    return " ".join(str(destination).split()).lower()
+
+
+def workbook_version(mtime: float) -> str:
+    """Version label of a rate workbook revision (its modification time, UTC)"""
+    return datetime.utcfromtimestamp(mtime).strftime("%Y%m%d%H%M%S%f")
+
+
+def calculate_bracket_rate(rate_brackets: np.ndarray, weight: float) -> float:
+    """
+    Apply the weight bracket ladder to one compiled rate row
+
+    Args:
+        rate_brackets: Bracket rates for the destination (columns 3-9 of the sheet)
+        weight: Shipment weight in lbs
+
+    Returns:
+        Freight rate rounded to cents, or 0.0 if the row has no usable rates
+    """
+    min_rate = rate_brackets[0]
+
+    if weight <= 1999.99:
+        rate = max(min_rate, min(weight / 100 * rate_brackets[0], 20 * rate_brackets[2]))
+    elif weight <= 4999.99:
+        rate = max(min_rate, min(weight / 100 * rate_brackets[1], 50 * rate_brackets[3]))
+    elif weight <= 9999.99:
+        rate = max(min_rate, min(weight / 100 * rate_brackets[2], 100 * rate_brackets[4]))
+    elif weight <= 19999.99:
+        rate = max(min_rate, min(weight / 100 * rate_brackets[3], 200 * rate_brackets[5]))
+    else:
+        rate = min(weight / 100 * rate_brackets[4], rate_brackets[6])
+
+    if rate != rate:  # NaN from blank cells in the sheet
+        return 0.0
+    return float(round(rate, 2))
+
+
+def calculate_bracket_rates(rates: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Vectorized form of calculate_bracket_rate
+
+    Args:
+        rates: Rate rows, one per shipment, shape (n, RATE_COLUMN_COUNT)
+        weights: Shipment weights in lbs, shape (n,)
+
+    Returns:
+        Freight rates rounded to cents, identical to calling calculate_bracket_rate per row
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    brackets = np.searchsorted(WEIGHT_BREAKPOINTS, weights, side="left")
+    shipments = np.arange(len(weights))
+
+    # min()/max() below mirror Python's builtins exactly, including how NaN cells propagate
+    linehaul = weights / 100 * rates[shipments, brackets]
+    cap = BRACKET_CAP_MULTIPLIERS[brackets] * rates[shipments, brackets + 2]
+    rate = np.where(cap < linehaul, cap, linehaul)
+
+    min_rate = rates[:, 0]
+    apply_minimum = brackets < len(WEIGHT_BREAKPOINTS)
+    rate = np.where(apply_minimum & ~(rate > min_rate), min_rate, rate)
+
+    rate = np.round(rate, 2)
+    rate[np.isnan(rate)] = 0.0
+    return rate
+
+
+class CompiledRateSheet:
+    """Rate sheet compiled into a destination lookup and a NumPy rate matrix"""
+
+    def __init__(self, cities: List[Optional[str]], provinces: List[Optional[str]], destinations: List[str],
+                 lookup: Dict[str, int], rates: np.ndarray, mtime: float):
+        self.cities = cities  # Destination cell of each row (None where blank)
+        self.provinces = provinces  # Province cell of each row (None where blank)
+        self.destinations = destinations  # Unique destination names in sheet order
+        self.lookup = lookup  # Normalized destination -> row in rates
+        self.rates = rates  # Shape (rows, RATE_COLUMN_COUNT), NaN where the sheet is blank
+        self.mtime = mtime  # Modification time of the workbook this was compiled from
+        self._resolver: Optional[DestinationResolver] = None
+
+    @classmethod
+    def from_rows(cls, cities: List[Optional[str]], rates: np.ndarray, mtime: float,
+                  provinces: Optional[List[Optional[str]]] = None) -> "CompiledRateSheet":
+        """Compile from the destination (and province) cell of each row and the matching rate matrix"""
+        destinations = list(dict.fromkeys(city for city in cities if city is not None))
+
+        # First matching row wins, as with the previous DataFrame scan
+        lookup = {}
+        for row, city in enumerate(cities):
+            if city is None or np.isnan(rates[row]).all():
+                continue
+            lookup.setdefault(normalize_destination(city), row)
+
+        return cls(cities, provinces or [None] * len(cities), destinations, lookup, rates, mtime)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, mtime: float) -> "CompiledRateSheet":
+        """Compile a cleaned rate sheet DataFrame (as returned by RateService.get_rates)"""
+        cities, provinces = (
+            [None if pd.isna(value) else str(value) for value in df.iloc[:, column].tolist()]
+            if df.shape[1] > column else [None] * len(df)
+            for column in (DESTINATION_COLUMN, PROVINCE_COLUMN)
+        )
+
+        rate_columns = df.iloc[:, RATE_COLUMN_START:RATE_COLUMN_START + RATE_COLUMN_COUNT]
+        values = rate_columns.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        rates = np.full((len(df), RATE_COLUMN_COUNT), np.nan)
+        rates[:, :values.shape[1]] = values
+
+        return cls.from_rows(cities, rates, mtime, provinces)
+
+    @property
+    def resolver(self) -> DestinationResolver:
+        """Fuzzy destination resolver for this sheet, built on first use"""
+        if self._resolver is None:
+            self._resolver = DestinationResolver(self.cities, self.provinces, sorted(self.lookup.values()))
+        return self._resolver
+
+    def resolve(self, destination: str) -> Optional[DestinationMatch]:
+        """Match a destination to a row: exact name first, then province-aware and fuzzy matching"""
+        row = self.lookup.get(normalize_destination(destination))
+        if row is not None:
+            return DestinationMatch(row, self.cities[row], 1.0)
+        return self.resolver.resolve(destination)
+
+    def get_row(self, destination: str) -> Optional[np.ndarray]:
+        """Get the bracket rates for a destination, or None if the sheet has no such destination"""
+        match = self.resolve(destination)
+        if match is None:
+            return None
+        return self.rates[match.row]
+
+    def find_rows(self, destinations: List[str], fuzzy: bool = True) -> np.ndarray:
+        """Get the row index for each destination (-1 where the sheet has no such destination)"""
+        rows = {}
+        for destination in destinations:
+            if destination not in rows:
+                if fuzzy:
+                    match = self.resolve(destination)
+                    rows[destination] = -1 if match is None else match.row
+                else:
+                    rows[destination] = self.lookup.get(normalize_destination(destination), -1)
+        return np.fromiter((rows[destination] for destination in destinations), dtype=np.int64, count=len(destinations))
+
+    def quote_many(self, destinations: List[str], weights: np.ndarray) -> np.ndarray:
+        """Calculate rates for many shipments on this sheet (0.0 where the destination is not found)"""
+        weights = np.asarray(weights, dtype=np.float64)
+        rows = self.find_rows(destinations)
+        found = rows >= 0
+        result = np.zeros(len(rows))
+        if found.any():
+            result[found] = calculate_bracket_rates(self.rates[rows[found]], weights[found])
+        return result
+
+    def tariff_matrix(self, destinations: List[str], weights: np.ndarray) -> np.ndarray:
+        """Calculate rates for every destination at every weight, shape (destinations, weights)"""
+        weights = np.asarray(weights, dtype=np.float64)
+        rows = self.find_rows(destinations, fuzzy=False)
+        matrix = np.zeros((len(rows), len(weights)))
+        found = rows >= 0
+        if found.any() and len(weights):
+            # One flattened pass over every (destination, weight) pair
+            rates = np.repeat(self.rates[rows[found]], len(weights), axis=0)
+            grid = np.tile(weights, int(found.sum()))
+            matrix[found] = calculate_bracket_rates(rates, grid).reshape(-1, len(weights))
+        return matrix
+
+    def quote(self, destination: str, weight: float) -> float:
+        """Calculate the rate for a destination and weight (0.0 if not found)"""
+        row = self.get_row(destination)
+        if row is None:
+            return 0.0
+        return calculate_bracket_rate(row, weight)
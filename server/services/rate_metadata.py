@@ -0,0 +1,41 @@
+import json
+import hashlib
+from collections import namedtuple
+from typing import Any, Dict, Optional, Tuple
+
+# A metadata list with its HTTP validators: strong ETag over the content and Last-Modified (epoch seconds)
+MetadataEntry = namedtuple("MetadataEntry", ["data", "etag", "last_modified"])
+
+
+def make_entry(data: Any, last_modified: float) -> MetadataEntry:
+    """Build an entry whose ETag is a hash of its content, so every worker process agrees on it"""
+    digest = hashlib.sha1(json.dumps(data, separators=(",", ":")).encode("utf-8")).hexdigest()
+    return MetadataEntry(data, f'"{digest[:20]}"', last_modified)
+
+
+class RateMetadata:
+    """
+    Manufacturer, warehouse and destination lists of one version of the rate workbooks
+
+    Built from the workbook names and mtimes; warehouse and destination lists and the
+    destination index are added as they are first asked for. A change to any workbook means a new
+    RateMetadata, so entries never need invalidating.
+    """
+
+    def __init__(self, workbooks: Dict[str, float], directory_mtime: float = 0.0):
+        """
+        Args:
+            workbooks: Workbook mtime keyed by manufacturer
+            directory_mtime: Rate sheets directory mtime (changes when a workbook is added or removed)
+        """
+        self.workbooks = workbooks
+        self.manufacturers = make_entry(
+            sorted(workbooks), max([directory_mtime, *workbooks.values()])
+        )
+        self.warehouses: Dict[str, MetadataEntry] = {}
+        self.destinations: Dict[Tuple[str, str], MetadataEntry] = {}
+        self.destination_index = None  # DestinationIndex over every sheet, built on first autocomplete
+
+    def get_mtime(self, manufacturer: str) -> Optional[float]:
+        """Get the mtime of a manufacturer's workbook (None if there is no such workbook)"""
+        return self.workbooks.get(manufacturer)
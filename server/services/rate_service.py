@@ -1,26 +1,105 @@
 import os
+import time
+import asyncio
+import threading
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
-from collections import OrderedDict
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple, Any
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from ..models.rate_models import RateRequest, RateResponse, LocationCoordinates
+from ..models.order_models import Order
+from .rate_index import (
+    CompiledRateSheet, calculate_bracket_rate, calculate_bracket_rates, clean_rate_sheet, normalize_destination,
+    workbook_version
+)
+from .rate_cache import LaneCache
+from .destination_resolver import DestinationMatch, match_key
+from .distance_matrix import DistanceMatrixCache, haversine_matrix
+from .rate_metadata import MetadataEntry, RateMetadata, make_entry
+from .rate_snapshot import RateSnapshot, compile_rate_sheets, compile_workbook, get_manifest_mtime, is_compiling
+from .rate_history import RateHistory
+from .destination_index import DestinationIndex
+
+LBS_PER_KG = 2.20462262
+
+# Number of tariff matrices kept in memory
+TARIFF_CACHE_SIZE = 32
+
+# How often a process checks whether another process published a new rate snapshot
+SNAPSHOT_CHECK_INTERVAL = 1.0  # seconds
+
+# How long a reload waits for another process compiling the snapshot before compiling the workbook itself
+SNAPSHOT_WAIT_TIMEOUT = 60.0  # seconds
+SNAPSHOT_WAIT_INTERVAL = 0.2  # seconds
+
+# Number of workbook reload events kept for /rates/reload-events
+RELOAD_EVENTS_KEPT = 100
+
+# How often metadata requests re-check the workbooks when no watcher is running
+METADATA_CHECK_INTERVAL = 1.0  # seconds
+
+# Threads that load rate sheets for the async API, off the event loop
+RATE_LOADER_WORKERS = int(os.getenv("RATE_LOADER_WORKERS", "4"))
 
 class RateService:
     def __init__(self):
         # Directory where Excel rate sheets are stored
         self.rate_sheets_dir = "./rate_sheets/"
         
-        # In-memory cache for fast retrieval (storing recent calculations)
-        self.cache = OrderedDict()
-        self.cache_size = 100  # Store last 100 calculations
+        # LRU cache of resolved rate rows per lane (manufacturer, warehouse, destination); any weight is priced from it
+        self.lane_cache = LaneCache(int(os.getenv("RATE_CACHE_SIZE", "10000")))
+        
+        # Recently built tariff matrices keyed by (manufacturer, warehouse, workbook mtime, weight grid)
+        self.tariff_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.tariff_lock = threading.Lock()  # Sync endpoints share the cache across threadpool threads
+        
+        # Compiled rate sheets keyed by (manufacturer, warehouse), rebuilt when the workbook's mtime changes
+        self.compiled_sheets: Dict[Tuple[str, str], CompiledRateSheet] = {}
+        
+        # Binary snapshot of all compiled sheets (see compile_rate_sheets.py), used for workbooks it is current for.
+        # Its rate matrix is memory-mapped, so all workers on a host share one copy
+        self.snapshot_dir = os.getenv("RATE_SNAPSHOT_DIR", "./rate_snapshots/")
+        self.snapshot: Optional[RateSnapshot] = None
+        self.snapshot_checked_at = float("-inf")
         
-        # Cache for distance calculations
-        self.distance_cache = {}
+        # Set while a RateSheetWatcher runs: it recompiles changed workbooks and swaps them in, so
+        # requests use the compiled sheets as they are instead of checking the workbook's mtime
+        self.watcher_active = False
+        
+        # Snapshot version each loaded workbook's sheets come from (None: compiled in this process)
+        self.workbook_sources: Dict[str, Optional[str]] = {}
+        
+        # Recent workbook reloads (manufacturer, version, load time), oldest first
+        self.reload_events: Deque[Dict[str, Any]] = deque(maxlen=RELOAD_EVENTS_KEPT)
+        
+        # Manufacturer/warehouse/destination lists with ETags for the metadata endpoints
+        self.metadata: Optional[RateMetadata] = None
+        self.metadata_checked_at = float("-inf")
+        self.index_lock = threading.Lock()  # One destination index build at a time
+        
+        # Sheet loads for async callers run on this pool; concurrent misses on the same sheet
+        # share one in-flight load keyed by (manufacturer, warehouse)
+        self.loader = ThreadPoolExecutor(max_workers=RATE_LOADER_WORKERS, thread_name_prefix="rate-loader")
+        self.loads_in_flight: Dict[Tuple[str, str], Future] = {}
+        self.loads_lock = threading.Lock()
+        
+        # Effective-dated versions of every sheet, recorded as workbooks are (re)loaded, so dated
+        # requests are priced with the rates in effect at pickup; None keeps them in memory only
+        self.history_dir = os.getenv("RATE_HISTORY_DIR", "./rate_history/")
+        self._rate_history: Optional[RateHistory] = None
+        
+        # Pairwise distances between known coordinates; any subset or ordering is served by indexing
+        self.distance_cache = DistanceMatrixCache(int(os.getenv("DISTANCE_CACHE_SIZE", "2048")))
         
         # Cache for coordinates
         self.coordinates_cache = {}
         
+        # Persistent LocationStore attached at startup; looks up and geocodes locations beyond the defaults
+        self.location_store = None
+        
         # Default coordinates for major cities (fallback if not found in rate sheets)
         self.default_coordinates = {
             "Winnipeg": (49.8951, -97.1384),
@@ -32,6 +111,13 @@ class RateService:
             "Regina": (50.4452, -104.6189)
         }
 
+    @property
+    def rate_history(self) -> RateHistory:
+        """Sheet version history, opened on first use from history_dir"""
+        if self._rate_history is None or self._rate_history.history_dir != self.history_dir:
+            self._rate_history = RateHistory(self.history_dir)
+        return self._rate_history
+
     def get_rates(self, manufacturer: str, warehouse: str) -> Optional[pd.DataFrame]:
         """
         Loads the latest rate sheet for the given manufacturer and warehouse dynamically from the Excel files.
@@ -42,7 +128,7 @@ class RateService:
         
         try:
             df = pd.read_excel(file_path, sheet_name=warehouse)
-            df = df.dropna(how="all").dropna(axis=1, how="all")  # Clean empty rows and columns
+            df = clean_rate_sheet(df)  # Clean empty rows and columns
             return df
         except Exception as e:
             print(f"Error loading {file_path}: {str(e)}")
@@ -52,12 +138,120 @@ class RateService:
         """Get list of available manufacturers based on Excel files"""
         return [f.replace(".xlsx", "") for f in os.listdir(self.rate_sheets_dir) if f.endswith(".xlsx")]
 
+    def get_metadata(self) -> RateMetadata:
+        """Get the metadata of the current workbooks, rebuilding it when a workbook was added, removed or changed"""
+        metadata = self.metadata
+        now = time.monotonic()
+        if metadata is not None and (self.watcher_active or now - self.metadata_checked_at < METADATA_CHECK_INTERVAL):
+            return metadata
+        
+        self.metadata_checked_at = now
+        workbooks = {}
+        try:
+            directory_mtime = os.path.getmtime(self.rate_sheets_dir)
+            for filename in os.listdir(self.rate_sheets_dir):
+                if filename.endswith(".xlsx") and not filename.startswith("~$"):
+                    workbooks[filename[:-len(".xlsx")]] = os.path.getmtime(os.path.join(self.rate_sheets_dir, filename))
+        except OSError as e:
+            print(f"Error listing rate sheets: {str(e)}")
+            directory_mtime = 0.0
+        
+        if metadata is None or workbooks != metadata.workbooks:
+            metadata = RateMetadata(workbooks, directory_mtime)
+            self.metadata = metadata
+        return metadata
+
+    def get_manufacturers_metadata(self) -> MetadataEntry:
+        """Get the manufacturer list with its ETag and Last-Modified"""
+        return self.get_metadata().manufacturers
+
+    def get_warehouses_metadata(self, manufacturer: str) -> Optional[MetadataEntry]:
+        """Get a manufacturer's warehouse list with its ETag and Last-Modified (None if there are none)"""
+        metadata = self.get_metadata()
+        entry = metadata.warehouses.get(manufacturer)
+        if entry is None:
+            mtime = metadata.get_mtime(manufacturer)
+            if mtime is None:
+                return None
+            warehouses = self.get_warehouses(manufacturer)
+            if not warehouses:
+                return None
+            entry = make_entry(warehouses, mtime)
+            metadata.warehouses[manufacturer] = entry
+        return entry
+
+    def get_destinations_metadata(self, manufacturer: str, warehouse: str) -> Optional[MetadataEntry]:
+        """Get a sheet's destination list with its ETag and Last-Modified (None if there are none)"""
+        metadata = self.get_metadata()
+        key = (manufacturer, warehouse)
+        entry = metadata.destinations.get(key)
+        if entry is None:
+            mtime = metadata.get_mtime(manufacturer)
+            if mtime is None:
+                return None
+            destinations = self.get_destinations(manufacturer, warehouse)
+            if not destinations:
+                return None
+            entry = make_entry(destinations, mtime)
+            metadata.destinations[key] = entry
+        return entry
+
+    def get_destination_index(self) -> DestinationIndex:
+        """Get the prefix index over every sheet's destinations, rebuilt after any workbook changes"""
+        metadata = self.get_metadata()
+        if metadata.destination_index is None:
+            with self.index_lock:
+                if metadata.destination_index is None:
+                    sheets = {}
+                    for manufacturer in metadata.workbooks:
+                        entry = self.get_warehouses_metadata(manufacturer)
+                        for warehouse in (entry.data if entry else []):
+                            compiled = self.get_compiled_sheet(manufacturer, warehouse)
+                            if compiled is not None:
+                                sheets[(manufacturer, warehouse)] = compiled
+                    metadata.destination_index = DestinationIndex(sheets)
+        return metadata.destination_index
+
+    def get_snapshot(self, force: bool = False) -> Optional[RateSnapshot]:
+        """Get the compiled rate snapshot, reloading it when a new version has been published (checked at most every SNAPSHOT_CHECK_INTERVAL unless forced)"""
+        if not self.snapshot_dir:
+            return None
+        
+        now = time.monotonic()
+        if force or now - self.snapshot_checked_at >= SNAPSHOT_CHECK_INTERVAL:
+            self.snapshot_checked_at = now
+            manifest_mtime = get_manifest_mtime(self.snapshot_dir)
+            current_mtime = self.snapshot.manifest_mtime if self.snapshot is not None else None
+            if manifest_mtime != current_mtime:
+                self.snapshot = RateSnapshot.load(self.snapshot_dir)
+        return self.snapshot
+
+    def refresh_snapshot(self, max_workers: Optional[int] = None, force: bool = False) -> Optional[RateSnapshot]:
+        """Recompile the snapshot for any workbooks that changed and start using it"""
+        if not self.snapshot_dir:
+            return None
+        self.snapshot = compile_rate_sheets(
+            self.rate_sheets_dir, self.snapshot_dir, max_workers=max_workers, force=force, history_dir=self.history_dir
+        )
+        self.snapshot_checked_at = time.monotonic()
+        return self.snapshot
+
     def get_warehouses(self, manufacturer: str) -> List[str]:
         """Get list of warehouses for a manufacturer"""
         file_path = os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx")
         if not os.path.exists(file_path):
             return []
         
+        if self.watcher_active:
+            # Every workbook is loaded by the watcher; answer from the compiled sheets
+            warehouses = [key[1] for key in self.compiled_sheets if key[0] == manufacturer]
+            if warehouses:
+                return warehouses
+        
+        snapshot = self.get_snapshot()
+        if snapshot is not None and snapshot.is_fresh(manufacturer, os.path.getmtime(file_path)):
+            return snapshot.get_warehouses(manufacturer)
+        
         try:
             xls = pd.ExcelFile(file_path)
             return xls.sheet_names
@@ -65,62 +259,535 @@ class RateService:
             print(f"Error reading sheets: {str(e)}")
             return []
 
+    def get_compiled_sheet(self, manufacturer: str, warehouse: str) -> Optional[CompiledRateSheet]:
+        """Get the compiled rate sheet for a manufacturer and warehouse, recompiling if the workbook changed"""
+        key = (manufacturer, warehouse)
+        if self.watcher_active:
+            compiled = self.compiled_sheets.get(key)
+            if compiled is not None:
+                return compiled
+        
+        file_path = os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx")
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            return None
+        
+        compiled = self.compiled_sheets.get(key)
+        if compiled is not None and compiled.mtime == mtime:
+            return compiled
+        
+        snapshot = self.get_snapshot()
+        if snapshot is not None and snapshot.is_fresh(manufacturer, mtime):
+            compiled = snapshot.get_sheet(manufacturer, warehouse)
+            if compiled is None:
+                return None
+        else:
+            # No current snapshot for this workbook, fall back to parsing the Excel sheet
+            df = self.get_rates(manufacturer, warehouse)
+            if df is None or not isinstance(df, pd.DataFrame):
+                return None
+            compiled = CompiledRateSheet.from_dataframe(df, mtime)
+            
+            # Without the watcher this is where a new workbook version is first seen. Snapshot
+            # sheets are recorded by the process that compiled the snapshot
+            self.rate_history.record(manufacturer, mtime, {warehouse: compiled})
+        
+        self.compiled_sheets[key] = compiled
+        
+        # Drop lanes resolved against the previous version of the sheet
+        self.lane_cache.invalidate(manufacturer, warehouse)
+        
+        return compiled
+
+    def _get_loaded_sheet(self, manufacturer: str, warehouse: str) -> Optional[CompiledRateSheet]:
+        """Get a compiled sheet if it is loaded and current, without parsing anything"""
+        compiled = self.compiled_sheets.get((manufacturer, warehouse))
+        if compiled is None or self.watcher_active:
+            return compiled
+        try:
+            mtime = os.path.getmtime(os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx"))
+        except OSError:
+            return None
+        return compiled if compiled.mtime == mtime else None
+
+    def load_sheet(self, manufacturer: str, warehouse: str) -> Future:
+        """
+        Load a compiled sheet on the loader pool, joining the load already in flight for it if any
+
+        Returns:
+            Future resolving to the compiled sheet (None if there is no such sheet)
+        """
+        key = (manufacturer, warehouse)
+        with self.loads_lock:
+            future = self.loads_in_flight.get(key)
+            if future is None:
+                future = self.loader.submit(self.get_compiled_sheet, manufacturer, warehouse)
+                self.loads_in_flight[key] = future
+                future.add_done_callback(lambda done: self._finish_load(key, done))
+            return future
+
+    def _finish_load(self, key: Tuple[str, str], future: Future):
+        with self.loads_lock:
+            if self.loads_in_flight.get(key) is future:
+                del self.loads_in_flight[key]
+
+    async def get_compiled_sheet_async(self, manufacturer: str, warehouse: str) -> Optional[CompiledRateSheet]:
+        """Get a compiled sheet without blocking the event loop; a sheet that needs parsing is loaded once for all awaiters"""
+        compiled = self._get_loaded_sheet(manufacturer, warehouse)
+        if compiled is not None:
+            return compiled
+        return await asyncio.wrap_future(self.load_sheet(manufacturer, warehouse))
+
+    def reload_workbook(self, manufacturer: str) -> Dict[str, Any]:
+        """
+        Recompile a manufacturer's workbook and swap all of its sheets in at once
+
+        Runs off the request path (see RateSheetWatcher). Requests keep using the previous
+        sheets until the new ones are complete, then see only the new ones. When another
+        process is compiling the snapshot, this waits for it and uses the published sheets,
+        so every worker maps the same rates; it only compiles the workbook itself when no
+        snapshot for it appears (adopt_snapshot switches over once one does).
+
+        Returns:
+            Reload event with the manufacturer, version, number of sheets and load time
+            (or the error if the workbook could not be compiled)
+        """
+        started = time.perf_counter()
+        event: Dict[str, Any] = {"manufacturer": manufacturer, "loaded_at": datetime.utcnow().isoformat()}
+        file_path = os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx")
+        try:
+            if not os.path.exists(file_path):
+                # Workbook removed: drop its sheets
+                mtime, sheets, source, changed = None, {}, None, 0
+            else:
+                mtime = os.path.getmtime(file_path)
+                snapshot = self.refresh_snapshot()
+                if snapshot is None or not snapshot.is_fresh(manufacturer, mtime):
+                    snapshot = self._wait_for_snapshot(manufacturer, mtime)
+                if snapshot is not None:
+                    (mtime, sheets), source = snapshot.get_workbook(manufacturer), snapshot.version
+                    changed = snapshot.get_changed_sheets(manufacturer)
+                else:
+                    # No snapshot directory, or the snapshot could not be compiled
+                    mtime, sheets = compile_workbook(file_path)
+                    source, changed = None, None
+        except Exception as e:
+            print(f"Error reloading {file_path}: {str(e)}")
+            event.update(error=str(e), load_time_ms=round((time.perf_counter() - started) * 1000, 1))
+            self.reload_events.append(event)
+            return event
+        
+        recorded = self._install_workbook(manufacturer, mtime, sheets, source)
+        event.update(
+            version=workbook_version(mtime) if mtime is not None else None,
+            mtime=mtime,
+            sheets=len(sheets),
+            changed_sheets=recorded if changed is None else changed,
+            load_time_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        self.reload_events.append(event)
+        return event
+
+    def _wait_for_snapshot(self, manufacturer: str, mtime: float) -> Optional[RateSnapshot]:
+        """
+        Wait for another process compiling the snapshot to publish this workbook version
+
+        Returns:
+            The snapshot once it is current for the workbook, or None if it does not become
+            current (no snapshot directory, the compile failed or took too long)
+        """
+        if not self.snapshot_dir:
+            return None
+        deadline = time.monotonic() + SNAPSHOT_WAIT_TIMEOUT
+        waited = False
+        while is_compiling(self.snapshot_dir) and time.monotonic() < deadline:
+            waited = True
+            time.sleep(SNAPSHOT_WAIT_INTERVAL)
+        
+        snapshot = self.get_snapshot(force=True)
+        if waited and (snapshot is None or not snapshot.is_fresh(manufacturer, mtime)):
+            # The other process compiled before this version was saved; compile it now
+            snapshot = self.refresh_snapshot()
+        if snapshot is not None and snapshot.is_fresh(manufacturer, mtime):
+            return snapshot
+        return None
+
+    def adopt_snapshot(self) -> List[str]:
+        """
+        Switch to the sheets of a newly published snapshot (run by the watcher)
+
+        Workbooks loaded from an older snapshot, or compiled in this process, are replaced
+        with the snapshot's memory-mapped sheets when it is current for them.
+
+        Returns:
+            Manufacturers whose sheets were replaced
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return []
+        adopted = []
+        for manufacturer in snapshot.get_manufacturers():
+            if self.workbook_sources.get(manufacturer) == snapshot.version:
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx"))
+            except OSError:
+                continue
+            if snapshot.is_fresh(manufacturer, mtime):
+                self._install_workbook(manufacturer, *snapshot.get_workbook(manufacturer), snapshot.version)
+                adopted.append(manufacturer)
+        return adopted
+
+    def _install_workbook(self, manufacturer: str, mtime: Optional[float], sheets: Dict[str, CompiledRateSheet],
+                          source: Optional[str]) -> int:
+        """
+        Swap in a workbook's sheets, recording them in the rate history if they were compiled here
+
+        Snapshot sheets were recorded by the process that compiled the snapshot; recording
+        them again would copy the shared, memory-mapped rates into this process's history.
+
+        Returns:
+            Number of sheets that got a new version in the history (0 for snapshot sheets)
+        """
+        self._swap_workbook(manufacturer, sheets)
+        self.workbook_sources[manufacturer] = source
+        self.metadata = None  # Rebuilt on the next metadata request
+        if source is not None or not sheets:
+            return 0
+        return self.rate_history.record(manufacturer, mtime, sheets)
+
+    def _swap_workbook(self, manufacturer: str, sheets: Dict[str, CompiledRateSheet]):
+        """Replace every compiled sheet of a manufacturer with one assignment"""
+        compiled_sheets = {key: sheet for key, sheet in self.compiled_sheets.items() if key[0] != manufacturer}
+        compiled_sheets.update({(manufacturer, warehouse): sheet for warehouse, sheet in sheets.items()})
+        previous = self.compiled_sheets
+        self.compiled_sheets = compiled_sheets
+        
+        # Lanes and tariffs of the old version no longer match any sheet's mtime; free them
+        warehouses = {key[1] for key in previous if key[0] == manufacturer} | set(sheets)
+        for warehouse in warehouses:
+            self.lane_cache.invalidate(manufacturer, warehouse)
+        with self.tariff_lock:
+            for key in [key for key in self.tariff_cache if key[0] == manufacturer]:
+                del self.tariff_cache[key]
+
     def get_destinations(self, manufacturer: str, warehouse: str) -> List[str]:
         """Get list of destinations for a manufacturer and warehouse"""
-        df = self.get_rates(manufacturer, warehouse)
-        if df is None or not isinstance(df, pd.DataFrame):
+        compiled = self.get_compiled_sheet(manufacturer, warehouse)
+        if compiled is None:
             return []
-        return df.iloc[:, 0].dropna().unique().tolist()  # Assume first column is 'City'
+        return list(compiled.destinations)
+
+    def resolve_destination(self, manufacturer: str, warehouse: str, destination: str) -> Optional[DestinationMatch]:
+        """
+        Match a destination as typed or extracted from a document to a destination in the rate sheet
+
+        Returns:
+            The matched row, canonical destination name and score (1.0 for an exact match),
+            or None if nothing in the sheet is close enough
+        """
+        compiled = self.get_compiled_sheet(manufacturer, warehouse)
+        if compiled is None:
+            return None
+        return compiled.resolve(destination)
+
+    def get_sheet_version(self, manufacturer: str, warehouse: str, version: Optional[int]) -> Optional[CompiledRateSheet]:
+        """Get a sheet version from the history (None for the current sheet)"""
+        if version is None:
+            return self.get_compiled_sheet(manufacturer, warehouse)
+        return self.rate_history.get_sheet(manufacturer, warehouse, version)
+
+    async def get_sheet_version_async(self, manufacturer: str, warehouse: str, version: Optional[int]) -> Optional[CompiledRateSheet]:
+        """get_sheet_version for async endpoints: the current sheet and history versions are loaded on the loader pool"""
+        if version is None:
+            return await self.get_compiled_sheet_async(manufacturer, warehouse)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.loader, self.rate_history.get_sheet, manufacturer, warehouse, version)
+
+    def version_at(self, manufacturer: str, warehouse: str, pickup_date: Optional[datetime]) -> Optional[int]:
+        """Sheet version in effect at a pickup date (None for undated requests or the current version)"""
+        if pickup_date is None:
+            return None
+        return self.rate_history.version_at(manufacturer, warehouse, pickup_date)
 
     def calculate_rate(self, request: RateRequest) -> float:
         """Calculate freight rate based on manufacturer, warehouse, destination, and weight"""
-        key = (request.manufacturer, request.warehouse, request.destination, request.weight)
+        version = self.version_at(request.manufacturer, request.warehouse, request.pickup_date)
+        if version is not None:
+            compiled = self.rate_history.get_sheet(request.manufacturer, request.warehouse, version)
+            return compiled.quote(request.destination, request.weight) if compiled is not None else 0.0
         
-        # Check cache first
-        if key in self.cache:
-            return self.cache[key]
+        compiled = self.get_compiled_sheet(request.manufacturer, request.warehouse)
+        return self._quote_lane(compiled, request)
+
+    async def calculate_rate_async(self, request: RateRequest) -> float:
+        """calculate_rate for async endpoints: sheet loading runs on the loader pool"""
+        rate, _ = await self.quote_rate_async(request)
+        return rate
+
+    async def quote_rate_async(self, request: RateRequest) -> Tuple[float, Optional[CompiledRateSheet]]:
+        """
+        Quote a request without blocking the event loop
+
+        Returns:
+            The rate (0.0 where no rate data was found) and the sheet version that priced it
+        """
+        if request.pickup_date is not None:
+            # The history lookup may read version files, so it runs on the loader pool too
+            loop = asyncio.get_running_loop()
+            version = await loop.run_in_executor(
+                self.loader, self.version_at, request.manufacturer, request.warehouse, request.pickup_date
+            )
+            if version is not None:
+                compiled = await loop.run_in_executor(
+                    self.loader, self.rate_history.get_sheet, request.manufacturer, request.warehouse, version
+                )
+                rate = compiled.quote(request.destination, request.weight) if compiled is not None else 0.0
+                return rate, compiled
         
-        df = self.get_rates(request.manufacturer, request.warehouse)
-        if df is None or not isinstance(df, pd.DataFrame):
+        compiled = await self.get_compiled_sheet_async(request.manufacturer, request.warehouse)
+        return self._quote_lane(compiled, request), compiled
+
+    def _quote_lane(self, compiled: Optional[CompiledRateSheet], request: RateRequest) -> float:
+        if compiled is None:
             return 0.0
         
-        matching_row = df[df.iloc[:, 0].str.lower() == request.destination.lower()]  # First column assumed as 'City'
-        if matching_row.empty:
-            return 0.0
+        # Check the lane cache first (after the sheet check so edits to the workbook are picked up)
+        key = (request.manufacturer, request.warehouse, normalize_destination(request.destination))
+        row = self.lane_cache.get(key, compiled.mtime)
+        if row is None:
+            row = compiled.get_row(request.destination)
+            if row is None:
+                return 0.0
+            self.lane_cache.put(key, row, compiled.mtime)
         
-        min_rate = matching_row.iloc[0, 3]  # 0-1999 lbs column
-        rate_brackets = matching_row.iloc[0, 3:10].values  # Extract rate columns (0-1999 to 40000+ lbs)
-        
-        if request.weight <= 1999.99:
-            rate = max(min_rate, min(request.weight / 100 * rate_brackets[0], 20 * rate_brackets[2]))
-        elif request.weight <= 4999.99:
-            rate = max(min_rate, min(request.weight / 100 * rate_brackets[1], 50 * rate_brackets[3]))
-        elif request.weight <= 9999.99:
-            rate = max(min_rate, min(request.weight / 100 * rate_brackets[2], 100 * rate_brackets[4]))
-        elif request.weight <= 19999.99:
-            rate = max(min_rate, min(request.weight / 100 * rate_brackets[3], 200 * rate_brackets[5]))
+        return calculate_bracket_rate(row, request.weight)
+
+    def calculate_rates(self, requests: List[RateRequest]) -> List[float]:
+        """
+        Calculate freight rates for many requests in one pass
+
+        Requests are grouped by sheet version (manufacturer, warehouse and, for dated
+        requests, the version in effect at pickup) and each group is priced with array
+        operations over the compiled sheet. Results match calculate_rate.
+
+        Args:
+            requests: Rate requests to price
+
+        Returns:
+            Rates in request order (0.0 where no rate data was found)
+        """
+        groups = self._group_by_sheet(requests)
+        sheets = {key: self.get_sheet_version(*key) for key in groups}
+        return self._quote_groups(requests, groups, sheets)
+
+    async def calculate_rates_async(self, requests: List[RateRequest]) -> List[float]:
+        """calculate_rates for async endpoints: the sheets are loaded concurrently on the loader pool"""
+        if any(request.pickup_date is not None for request in requests):
+            # The history lookups of dated requests may read version files
+            loop = asyncio.get_running_loop()
+            groups = await loop.run_in_executor(self.loader, self._group_by_sheet, requests)
         else:
-            rate = min(request.weight / 100 * rate_brackets[4], rate_brackets[6])
+            groups = self._group_by_sheet(requests)
+        keys = list(groups)
+        loaded = await asyncio.gather(*(self.get_sheet_version_async(*key) for key in keys))
+        return self._quote_groups(requests, groups, dict(zip(keys, loaded)))
+
+    def _group_by_sheet(self, requests: List[RateRequest]) -> Dict[Tuple[str, str, Optional[int]], List[int]]:
+        """Group request indices by (manufacturer, warehouse, sheet version)"""
+        groups: Dict[Tuple[str, str, Optional[int]], List[int]] = {}
+        for i, request in enumerate(requests):
+            version = self.version_at(request.manufacturer, request.warehouse, request.pickup_date)
+            groups.setdefault((request.manufacturer, request.warehouse, version), []).append(i)
+        return groups
+
+    def _quote_groups(self, requests: List[RateRequest], groups: Dict[Tuple[str, str, Optional[int]], List[int]],
+                      sheets: Dict[Tuple[str, str, Optional[int]], Optional[CompiledRateSheet]]) -> List[float]:
+        """Price each group of requests against its compiled sheet"""
+        rates = np.zeros(len(requests))
+        for key, indices in groups.items():
+            compiled = sheets[key]
+            if compiled is None:
+                continue
+            destinations = [requests[i].destination for i in indices]
+            weights = np.fromiter((requests[i].weight for i in indices), dtype=np.float64, count=len(indices))
+            rates[indices] = compiled.quote_many(destinations, weights)
         
-        final_rate = round(rate, 2)
+        return rates.tolist()
+
+    def resolve_warehouse(self, manufacturer: str, origin: str) -> Optional[str]:
+        """
+        Match an order's origin (e.g. "CWS Regina") to one of the manufacturer's warehouse sheets
+
+        A sheet matches when all of its words appear in the origin ("Regina (CWS)"), preferring
+        the most specific sheet; failing that, the smallest sheet containing every word of the
+        origin ("Winnipeg" -> "Winnipeg (CWS)").
+        """
+        entry = self.get_warehouses_metadata(manufacturer)
+        if entry is None or not origin:
+            return None
+        if origin in entry.data:
+            return origin
         
-        # Store in cache
-        if len(self.cache) >= self.cache_size:
-            self.cache.popitem(last=False)  # Remove oldest entry
-        self.cache[key] = final_rate
+        origin_words = set(match_key(origin).split())
+        sheets = [(warehouse, set(match_key(warehouse).split())) for warehouse in entry.data]
+        contained = [(len(words), warehouse) for warehouse, words in sheets if words and words <= origin_words]
+        if contained:
+            return max(contained, key=lambda c: c[0])[1]
+        containing = [(len(words), warehouse) for warehouse, words in sheets if origin_words and origin_words <= words]
+        if containing:
+            return min(containing, key=lambda c: c[0])[1]
+        return None
+
+    def _match_order_destination(self, compiled: CompiledRateSheet, destination: str) -> Optional[DestinationMatch]:
+        """Match a destination that may be a full address ("123 Main St, Regina, SK") to a sheet row"""
+        best = compiled.resolve(destination)
+        if best is not None and best.score == 1.0:
+            return best
+        parts = [part.strip() for part in destination.split(",") if part.strip()]
+        if len(parts) > 1:
+            for i in range(len(parts)):
+                match = compiled.resolve(", ".join(parts[i:i + 2]))
+                if match is not None and (best is None or match.score > best.score):
+                    best = match
+                    if best.score == 1.0:
+                        break
+        return best
+
+    def quote_shipments(self, shipments: List[Tuple[str, str, str, float]],
+                        pickup_dates: Optional[List[Optional[datetime]]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Price shipments against the rate sheets, in one vectorized pass per sheet version
+
+        Args:
+            shipments: (manufacturer, origin, destination, weight in lbs) of each shipment;
+                the origin is matched to a warehouse sheet and the destination to a sheet row
+            pickup_dates: Pickup date of each shipment, to price it with the sheet version in
+                effect then (None prices with the current sheets)
+
+        Returns:
+            Per shipment the quote (rate, warehouse, destination, match_score, version of the
+            rate workbook), or None where no rate could be found
+        """
+        quotes: List[Optional[Dict[str, Any]]] = [None] * len(shipments)
+        warehouses: Dict[Tuple[str, str], Optional[str]] = {}
+        sheets: Dict[Tuple[str, str, Optional[int]], Optional[CompiledRateSheet]] = {}
+        matches: Dict[Tuple[str, str, Optional[int], str], Optional[DestinationMatch]] = {}
+        groups: Dict[Tuple[str, str, Optional[int]], List[Tuple[int, DestinationMatch]]] = {}
         
-        return final_rate
+        for i, (manufacturer, origin, destination, weight) in enumerate(shipments):
+            if not manufacturer or not destination or not weight:
+                continue
+            if (manufacturer, origin) not in warehouses:
+                warehouses[(manufacturer, origin)] = self.resolve_warehouse(manufacturer, origin)
+            warehouse = warehouses[(manufacturer, origin)]
+            if warehouse is None:
+                continue
+            
+            version = self.version_at(manufacturer, warehouse, pickup_dates[i] if pickup_dates else None)
+            sheet_key = (manufacturer, warehouse, version)
+            if sheet_key not in sheets:
+                sheets[sheet_key] = self.get_sheet_version(*sheet_key)
+            compiled = sheets[sheet_key]
+            if compiled is None:
+                continue
+            
+            lookup = (*sheet_key, destination)
+            if lookup not in matches:
+                matches[lookup] = self._match_order_destination(compiled, destination)
+            match = matches[lookup]
+            if match is not None:
+                groups.setdefault(sheet_key, []).append((i, match))
+        
+        for (manufacturer, warehouse, version), entries in groups.items():
+            compiled = sheets[(manufacturer, warehouse, version)]
+            rows = np.fromiter((match.row for _, match in entries), dtype=np.int64, count=len(entries))
+            weights = np.fromiter((shipments[i][3] for i, _ in entries), dtype=np.float64, count=len(entries))
+            rates = calculate_bracket_rates(compiled.rates[rows], weights)
+            sheet_version = workbook_version(compiled.mtime)
+            for (i, match), rate in zip(entries, rates.tolist()):
+                if rate > 0:
+                    quotes[i] = {
+                        "rate": rate,
+                        "warehouse": warehouse,
+                        "destination": match.destination,
+                        "match_score": match.score,
+                        "version": sheet_version,
+                    }
+        
+        return quotes
+
+    def quote_orders(self, orders: List[Order]) -> List[Optional[Dict[str, Any]]]:
+        """Price orders from their manufacturer, origin, destination, weight and pickup date (see quote_shipments)"""
+        return self.quote_shipments(
+            [(order.manufacturer, order.ship_from, order.ship_to, order.weight_kg * LBS_PER_KG) for order in orders],
+            [order.pickup_date for order in orders]
+        )
+
+    async def quote_orders_async(self, orders: List[Order]) -> List[Optional[Dict[str, Any]]]:
+        """quote_orders for async endpoints: the orders are priced on the loader pool"""
+        return await asyncio.wrap_future(self.loader.submit(self.quote_orders, orders))
+
+    def get_tariff_matrix(self, manufacturer: str, warehouse: str, weights: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Get rates for every destination of a warehouse at every weight in a grid
+
+        Args:
+            manufacturer: Manufacturer name
+            warehouse: Warehouse (sheet) name
+            weights: Weight grid in lbs
+
+        Returns:
+            Dictionary with destinations, weights and a destinations x weights rate matrix,
+            or None if there is no rate sheet
+        """
+        compiled = self.get_compiled_sheet(manufacturer, warehouse)
+        if compiled is None:
+            return None
+        
+        key = (manufacturer, warehouse, compiled.mtime, tuple(weights))
+        with self.tariff_lock:
+            tariff = self.tariff_cache.get(key)
+            if tariff is not None:
+                self.tariff_cache.move_to_end(key)
+                return tariff
+        
+        destinations = list(compiled.destinations)
+        matrix = compiled.tariff_matrix(destinations, np.asarray(weights, dtype=np.float64))
+        tariff = {
+            "manufacturer": manufacturer,
+            "warehouse": warehouse,
+            "destinations": destinations,
+            "weights": list(weights),
+            "rates": matrix.tolist(),
+        }
+        
+        with self.tariff_lock:
+            self.tariff_cache[key] = tariff
+            if len(self.tariff_cache) > TARIFF_CACHE_SIZE:
+                self.tariff_cache.popitem(last=False)  # Remove oldest entry
+        return tariff
 
     def get_cached_rate(self, manufacturer: str, warehouse: str, destination: str, weight: float) -> Optional[float]:
-        """Get cached rate if available"""
-        key = (manufacturer, warehouse, destination, weight)
-        if key in self.cache:
-            return self.cache[key]
-        return None
+        """Get the rate for any weight if the lane is cached and its workbook is unchanged"""
+        try:
+            mtime = os.path.getmtime(os.path.join(self.rate_sheets_dir, f"{manufacturer}.xlsx"))
+        except OSError:
+            return None
+        
+        row = self.lane_cache.get((manufacturer, warehouse, normalize_destination(destination)), mtime)
+        if row is None:
+            return None
+        return calculate_bracket_rate(row, weight)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get lane cache size and hit/miss/eviction counters"""
+        return self.lane_cache.stats()
 
     # Methods for compatibility with optimization engine
-    def _get_location_coordinates(self, location: str) -> Optional[Tuple[float, float]]:
-        """Get coordinates for a location"""
+    def _get_location_coordinates(self, location: str, geocode: bool = True) -> Optional[Tuple[float, float]]:
+        """Get coordinates for a location (unknown ones are geocoded in the background unless geocode is False)"""
         # Check cache first
         if location in self.coordinates_cache:
             return self.coordinates_cache[location]
@@ -130,44 +797,49 @@ class RateService:
             coords = self.default_coordinates[location]
             self.coordinates_cache[location] = coords
             return coords
+        
+        # Check the location store (unknown locations are geocoded in the background)
+        if self.location_store is not None:
+            coords = self.location_store.get(location, geocode)
+            if coords:
+                self.coordinates_cache[location] = coords
+                return coords
             
         # If not found, return None
         return None
 
-    def _calculate_distance(self, loc1: str, loc2: str) -> float:
+    def _calculate_distance(self, loc1: str, loc2: str, geocode: bool = True) -> float:
         """Calculate distance between two locations using Haversine formula"""
         # Get coordinates
-        coord1 = self._get_location_coordinates(loc1)
-        coord2 = self._get_location_coordinates(loc2)
+        coord1 = self._get_location_coordinates(loc1, geocode)
+        coord2 = self._get_location_coordinates(loc2, geocode)
         
         if not coord1 or not coord2:
             return float("inf")
             
-        # Haversine formula implementation
-        lat1, lon1 = coord1
-        lat2, lon2 = coord2
-        
-        R = 6371  # Earth radius in km
-        dlat = np.radians(lat2 - lat1)
-        dlon = np.radians(lon2 - lon1)
-        a = np.sin(dlat/2) * np.sin(dlat/2) + np.cos(np.radians(lat1)) * \
-            np.cos(np.radians(lat2)) * np.sin(dlon/2) * np.sin(dlon/2)
-        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-        return R * c
+        return float(haversine_matrix([coord1], [coord2])[0, 0])
 
     async def get_distance_matrix(self, locations: List[str]) -> np.ndarray:
         """Get distance matrix between locations (for optimization engine)"""
-        if tuple(locations) in self.distance_cache:
-            return self.distance_cache[tuple(locations)]
-            
-        # Calculate distances using Haversine formula
-        matrix = np.zeros((len(locations), len(locations)))
-        for i, loc1 in enumerate(locations):
-            for j, loc2 in enumerate(locations):
-                if i == j:
-                    matrix[i][j] = 0
-                else:
-                    matrix[i][j] = self._calculate_distance(loc1, loc2)
-                    
-        self.distance_cache[tuple(locations)] = matrix
+        # inf wherever either location has no coordinates, 0 on the diagonal
+        coordinates = [self._get_location_coordinates(location) for location in locations]
+        known = [i for i, coords in enumerate(coordinates) if coords]
+        matrix = np.full((len(locations), len(locations)), np.inf)
+        if known:
+            matrix[np.ix_(known, known)] = self.distance_cache.get_matrix([coordinates[i] for i in known])
+        np.fill_diagonal(matrix, 0)
         return matrix
+
+
+# Process-wide RateService shared by the API routers, main and the optimization engine
+_shared_rate_service: Optional[RateService] = None
+_shared_rate_service_lock = threading.Lock()
+
+def get_rate_service() -> RateService:
+    """Get the RateService shared by everything in this process"""
+    global _shared_rate_service
+    if _shared_rate_service is None:
+        with _shared_rate_service_lock:
+            if _shared_rate_service is None:
+                _shared_rate_service = RateService()
+    return _shared_rate_service
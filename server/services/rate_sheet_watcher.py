@@ -0,0 +1,152 @@
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+logger = logging.getLogger("RateSheetWatcher")
+
+# Quiet period after the last change to a workbook before it is reloaded (Excel saves in several writes)
+RELOAD_DEBOUNCE = 1.0  # seconds
+
+# How often the watcher checks for a snapshot published by another process
+SNAPSHOT_POLL_INTERVAL = 1.0  # seconds
+
+# File system events that can change a workbook
+WORKBOOK_EVENTS = ("created", "modified", "moved", "deleted")
+
+
+def workbook_manufacturer(path: Optional[str]) -> Optional[str]:
+    """Get the manufacturer a rate workbook path belongs to (None for other files and Excel lock files)"""
+    if not path:
+        return None
+    filename = os.path.basename(path)
+    if not filename.endswith(".xlsx") or filename.startswith("~$"):
+        return None
+    return filename[:-len(".xlsx")]
+
+
+class RateSheetHandler(FileSystemEventHandler):
+    """Handler for rate workbook events"""
+
+    def __init__(self, watcher: "RateSheetWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        """Schedule a reload of every workbook the event touches"""
+        if event.is_directory or event.event_type not in WORKBOOK_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            manufacturer = workbook_manufacturer(path)
+            if manufacturer:
+                self.watcher.schedule_reload(manufacturer)
+
+
+class RateSheetWatcher:
+    """
+    Watches the rate sheets directory and hot-swaps recompiled workbooks into a RateService
+
+    Workbooks are recompiled on timer threads, never on the request path; each reload
+    emits an event with the workbook version and load time to the registered listeners.
+    """
+
+    def __init__(self, rate_service, debounce: float = RELOAD_DEBOUNCE):
+        self.rate_service = rate_service
+        self.debounce = debounce
+        self.observer = None
+        self.timers: Dict[str, threading.Timer] = {}
+        self.timers_lock = threading.Lock()
+        self.reload_lock = threading.Lock()  # One reload at a time
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.stopped = threading.Event()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Register a callback that receives every reload event"""
+        self.listeners.append(listener)
+
+    def start(self):
+        """Load every workbook in the background and start watching for changes"""
+        rate_sheets_dir = self.rate_service.rate_sheets_dir
+        self.observer = Observer()
+        self.observer.schedule(RateSheetHandler(self), rate_sheets_dir, recursive=False)
+        self.observer.start()
+        self.rate_service.watcher_active = True
+        self.stopped.clear()
+        logger.info(f"Watching rate sheets in {rate_sheets_dir}")
+
+        initial_load = threading.Thread(target=self._reload_all, name="rate-sheet-initial-load", daemon=True)
+        initial_load.start()
+        snapshot_poll = threading.Thread(target=self._poll_snapshot, name="rate-snapshot-poll", daemon=True)
+        snapshot_poll.start()
+
+    def stop(self):
+        """Stop watching and cancel pending reloads"""
+        self.rate_service.watcher_active = False
+        self.stopped.set()
+        with self.timers_lock:
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        logger.info("Rate sheet watcher stopped")
+
+    def schedule_reload(self, manufacturer: str):
+        """Reload a workbook once it has been quiet for the debounce period"""
+        with self.timers_lock:
+            timer = self.timers.get(manufacturer)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.debounce, self._run_reload, args=(manufacturer,))
+            timer.daemon = True
+            self.timers[manufacturer] = timer
+            timer.start()
+
+    def _run_reload(self, manufacturer: str):
+        with self.timers_lock:
+            self.timers.pop(manufacturer, None)
+        self.reload(manufacturer)
+
+    def reload(self, manufacturer: str) -> Dict[str, Any]:
+        """Recompile and swap in one workbook now, then notify the listeners"""
+        with self.reload_lock:
+            event = self.rate_service.reload_workbook(manufacturer)
+
+        if "error" in event:
+            logger.error(f"Rate sheet {manufacturer} failed to reload: {event['error']}")
+        else:
+            logger.info(
+                f"Rate sheet {manufacturer} version {event['version']} loaded "
+                f"({event['sheets']} sheets in {event['load_time_ms']} ms)"
+            )
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error in rate sheet reload listener: {str(e)}")
+        return event
+
+    def _reload_all(self):
+        """Load every workbook, so requests never compile a sheet themselves"""
+        try:
+            manufacturers = self.rate_service.get_available_manufacturers()
+        except OSError as e:
+            logger.error(f"Error listing rate sheets: {str(e)}")
+            return
+        for manufacturer in manufacturers:
+            if workbook_manufacturer(f"{manufacturer}.xlsx"):
+                self.reload(manufacturer)
+
+    def _poll_snapshot(self):
+        """Switch to snapshots other processes publish, so every worker maps the same rates"""
+        while not self.stopped.wait(SNAPSHOT_POLL_INTERVAL):
+            try:
+                with self.reload_lock:
+                    adopted = self.rate_service.adopt_snapshot()
+                if adopted:
+                    logger.info(f"Switched to the published rate snapshot for {', '.join(adopted)}")
+            except Exception as e:
+                logger.error(f"Error checking for a new rate snapshot: {str(e)}")
@@ -0,0 +1,321 @@
+import os
+import time
+import json
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .rate_index import CompiledRateSheet, RATE_COLUMN_COUNT, clean_rate_sheet
+from .rate_history import RateHistory
+
+logger = logging.getLogger("RateSnapshot")
+
+# Bump when the snapshot layout changes so older snapshots are recompiled
+SNAPSHOT_FORMAT = 2
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "compile.lock"
+
+# Rate files kept on disk, so workers still mapping the previous snapshot are not cut off
+RATE_FILES_KEPT = 2
+
+# A compile lock older than this is assumed to be left over from a crashed process
+LOCK_TIMEOUT = 600  # seconds
+
+# Compiled sheets of one workbook: (workbook mtime, {warehouse: compiled sheet})
+CompiledWorkbook = Tuple[float, Dict[str, CompiledRateSheet]]
+
+
+def compile_workbook(file_path: str) -> CompiledWorkbook:
+    """
+    Parse every sheet of a rate workbook and compile it
+
+    Runs in worker processes, so it only takes and returns picklable values.
+
+    Args:
+        file_path: Path to the manufacturer's .xlsx rate workbook
+
+    Returns:
+        Tuple of (workbook mtime, compiled sheets keyed by warehouse)
+    """
+    # Read the mtime first so an edit made while parsing leaves the snapshot stale
+    mtime = os.path.getmtime(file_path)
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    return mtime, {
+        warehouse: CompiledRateSheet.from_dataframe(clean_rate_sheet(df), mtime)
+        for warehouse, df in sheets.items()
+    }
+
+
+class RateSnapshot:
+    """Compiled rate tables for every manufacturer, loaded from a snapshot directory"""
+
+    def __init__(self, snapshot_dir: str, manifest: Dict, rates: np.ndarray, manifest_mtime: float = 0.0):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = manifest
+        self.rates = rates  # All sheets' rate rows stacked, shape (rows, RATE_COLUMN_COUNT), read-only memory map
+        self.manifest_mtime = manifest_mtime
+        self.version = manifest["version"]
+        self.sheets: Dict[Tuple[str, str], CompiledRateSheet] = {}
+
+    @classmethod
+    def load(cls, snapshot_dir: str) -> Optional["RateSnapshot"]:
+        """
+        Load a snapshot, or return None if there is no usable snapshot in the directory
+
+        The rate matrix is memory-mapped read-only, so every process that loads the same
+        snapshot shares one copy of the rates through the page cache.
+        """
+        manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest_mtime = os.fstat(f.fileno()).st_mtime
+                manifest = json.load(f)
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                logger.info(f"Ignoring rate snapshot in {snapshot_dir}: format {manifest.get('format')} is outdated")
+                return None
+            rates = np.load(os.path.join(snapshot_dir, manifest["rates_file"]), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error loading rate snapshot from {snapshot_dir}: {str(e)}")
+            return None
+        return cls(snapshot_dir, manifest, rates, manifest_mtime)
+
+    def get_manufacturers(self) -> List[str]:
+        """Get manufacturers included in the snapshot"""
+        return list(self.manifest["manufacturers"])
+
+    def is_fresh(self, manufacturer: str, mtime: float) -> bool:
+        """Check whether the snapshot was compiled from the workbook's current version"""
+        workbook = self.manifest["manufacturers"].get(manufacturer)
+        return workbook is not None and workbook["mtime"] == mtime
+
+    def get_warehouses(self, manufacturer: str) -> List[str]:
+        """Get sheet names of a manufacturer's workbook"""
+        workbook = self.manifest["manufacturers"].get(manufacturer)
+        if workbook is None:
+            return []
+        return list(workbook["sheets"])
+
+    def get_sheet(self, manufacturer: str, warehouse: str) -> Optional[CompiledRateSheet]:
+        """Get a compiled sheet (built from the snapshot on first use)"""
+        key = (manufacturer, warehouse)
+        if key in self.sheets:
+            return self.sheets[key]
+
+        workbook = self.manifest["manufacturers"].get(manufacturer)
+        if workbook is None or warehouse not in workbook["sheets"]:
+            return None
+
+        sheet = workbook["sheets"][warehouse]
+        rates = self.rates[sheet["offset"]:sheet["offset"] + len(sheet["cities"])]
+        compiled = CompiledRateSheet.from_rows(sheet["cities"], rates, workbook["mtime"], sheet["provinces"])
+        self.sheets[key] = compiled
+        return compiled
+
+    def get_changed_sheets(self, manufacturer: str) -> int:
+        """Get how many of a workbook's sheets got a new history version when it was compiled into this snapshot"""
+        workbook = self.manifest["manufacturers"].get(manufacturer)
+        return workbook.get("changed_sheets", 0) if workbook is not None else 0
+
+    def get_workbook(self, manufacturer: str) -> Optional[CompiledWorkbook]:
+        """Get all compiled sheets of a manufacturer's workbook"""
+        workbook = self.manifest["manufacturers"].get(manufacturer)
+        if workbook is None:
+            return None
+        return workbook["mtime"], {
+            warehouse: self.get_sheet(manufacturer, warehouse)
+            for warehouse in workbook["sheets"]
+        }
+
+
+def write_snapshot(snapshot_dir: str, workbooks: Dict[str, CompiledWorkbook],
+                   changed_sheets: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Write compiled workbooks to a snapshot directory
+
+    Rates are stacked into one versioned .npy file and the manifest is replaced last
+    with an atomic rename, so readers always see a complete snapshot and pick up the
+    new version the next time they check the manifest.
+
+    Args:
+        snapshot_dir: Directory to write the snapshot to
+        workbooks: Compiled workbooks keyed by manufacturer
+        changed_sheets: Sheets of each recompiled workbook that got a new version in the rate history
+
+    Returns:
+        The manifest that was written
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+    rates_file = f"rates-{version}.npy"
+
+    blocks = []
+    offset = 0
+    manufacturers = {}
+    for manufacturer, (mtime, sheets) in sorted(workbooks.items()):
+        sheet_entries = {}
+        for warehouse, compiled in sheets.items():
+            sheet_entries[warehouse] = {"offset": offset, "cities": compiled.cities, "provinces": compiled.provinces}
+            blocks.append(compiled.rates)
+            offset += len(compiled.rates)
+        manufacturers[manufacturer] = {
+            "mtime": mtime,
+            "sheets": sheet_entries,
+            "changed_sheets": (changed_sheets or {}).get(manufacturer, 0),
+        }
+
+    rates = np.vstack(blocks) if blocks else np.empty((0, RATE_COLUMN_COUNT))
+    tmp_rates_path = os.path.join(snapshot_dir, f"{rates_file}.{os.getpid()}.tmp")
+    with open(tmp_rates_path, "wb") as f:
+        np.save(f, rates)
+    os.replace(tmp_rates_path, os.path.join(snapshot_dir, rates_file))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "rates_file": rates_file,
+        "manufacturers": manufacturers,
+    }
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+    # Remove rate files from older snapshots (names sort by version). Files still mapped
+    # elsewhere stay readable on POSIX; on Windows removal fails and is retried next time
+    rate_files = sorted(f for f in os.listdir(snapshot_dir) if f.startswith("rates-") and f.endswith(".npy"))
+    for filename in rate_files[:-RATE_FILES_KEPT]:
+        try:
+            os.remove(os.path.join(snapshot_dir, filename))
+        except OSError:
+            pass
+
+    return manifest
+
+
+def get_manifest_mtime(snapshot_dir: str) -> Optional[float]:
+    """Get the modification time of a snapshot's manifest (None if there is no snapshot)"""
+    try:
+        return os.path.getmtime(os.path.join(snapshot_dir, MANIFEST_FILE))
+    except OSError:
+        return None
+
+
+def _acquire_compile_lock(snapshot_dir: str) -> bool:
+    """Take the snapshot directory's compile lock, so concurrent workers do not all compile"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    lock_path = os.path.join(snapshot_dir, LOCK_FILE)
+    try:
+        if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def is_compiling(snapshot_dir: str) -> bool:
+    """Check whether a process holds the snapshot directory's compile lock"""
+    try:
+        return time.time() - os.path.getmtime(os.path.join(snapshot_dir, LOCK_FILE)) <= LOCK_TIMEOUT
+    except OSError:
+        return False
+
+
+def _release_compile_lock(snapshot_dir: str):
+    """Release the snapshot directory's compile lock"""
+    try:
+        os.remove(os.path.join(snapshot_dir, LOCK_FILE))
+    except OSError:
+        pass
+
+
+def compile_rate_sheets(rate_sheets_dir: str, snapshot_dir: str, max_workers: Optional[int] = None, force: bool = False,
+                        history_dir: Optional[str] = None) -> Optional[RateSnapshot]:
+    """
+    Compile all rate workbooks into a snapshot, reparsing only workbooks that changed
+
+    Workbooks are parsed in parallel across processes. The recompiled workbooks are
+    recorded in the rate history here, by the one process holding the compile lock, so
+    workers serving the snapshot do not each copy its rates into a history of their own.
+
+    Args:
+        rate_sheets_dir: Directory containing the manufacturer .xlsx workbooks
+        snapshot_dir: Directory to write the snapshot to
+        max_workers: Maximum number of parser processes (defaults to the CPU count)
+        force: Reparse every workbook even if the snapshot is current
+        history_dir: Rate history directory to record new sheet versions in (None: not recorded)
+
+    Returns:
+        The current snapshot, or None if there are no workbooks
+    """
+    if not _acquire_compile_lock(snapshot_dir):
+        # Another process (e.g. a sibling uvicorn worker) is compiling; use what it publishes
+        logger.info(f"Rate snapshot in {snapshot_dir} is being compiled by another process")
+        return RateSnapshot.load(snapshot_dir)
+    try:
+        return _compile_rate_sheets(rate_sheets_dir, snapshot_dir, max_workers, force, history_dir)
+    finally:
+        _release_compile_lock(snapshot_dir)
+
+
+def _compile_rate_sheets(rate_sheets_dir: str, snapshot_dir: str, max_workers: Optional[int], force: bool,
+                         history_dir: Optional[str]) -> Optional[RateSnapshot]:
+    """Compile stale workbooks into a new snapshot (caller holds the compile lock)"""
+    existing = None if force else RateSnapshot.load(snapshot_dir)
+
+    workbooks: Dict[str, CompiledWorkbook] = {}
+    stale: Dict[str, str] = {}
+    for filename in sorted(os.listdir(rate_sheets_dir)):
+        if not filename.endswith(".xlsx") or filename.startswith("~$"):
+            continue
+        manufacturer = filename[:-len(".xlsx")]
+        file_path = os.path.join(rate_sheets_dir, filename)
+        if existing is not None and existing.is_fresh(manufacturer, os.path.getmtime(file_path)):
+            workbooks[manufacturer] = existing.get_workbook(manufacturer)
+        else:
+            stale[manufacturer] = file_path
+
+    removed = existing is not None and set(existing.get_manufacturers()) - set(workbooks) - set(stale)
+    if not stale and not removed:
+        return existing
+    if not stale and not workbooks:
+        return None
+
+    logger.info(f"Compiling rate sheets: {', '.join(sorted(stale)) or 'none changed'}")
+    if len(stale) > 1:
+        workers = min(len(stale), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {manufacturer: executor.submit(compile_workbook, path) for manufacturer, path in stale.items()}
+            for manufacturer, future in futures.items():
+                try:
+                    workbooks[manufacturer] = future.result()
+                except Exception as e:
+                    logger.error(f"Error compiling {stale[manufacturer]}: {str(e)}")
+    else:
+        for manufacturer, path in stale.items():
+            try:
+                workbooks[manufacturer] = compile_workbook(path)
+            except Exception as e:
+                logger.error(f"Error compiling {path}: {str(e)}")
+
+    changed_sheets = {}
+    if history_dir:
+        history = RateHistory(history_dir)
+        for manufacturer in stale:
+            if manufacturer in workbooks:
+                changed_sheets[manufacturer] = history.record(manufacturer, *workbooks[manufacturer])
+
+    manifest = write_snapshot(snapshot_dir, workbooks, changed_sheets)
+    logger.info(f"Rate snapshot {manifest['version']} written to {snapshot_dir}")
+    return RateSnapshot.load(snapshot_dir)
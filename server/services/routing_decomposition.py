@@ -0,0 +1,128 @@
+import numpy as np
+from typing import List, Sequence, Tuple
+
+from .routing_model import STOP_CANCELLED, RoutingProblem, RoutingSolution
+
+# Medoid refinement passes when clustering nodes
+CLUSTER_ITERATIONS = 10
+
+
+def cluster_nodes(distance_matrix: np.ndarray, nodes: Sequence[int], count: int, seed: int = 0) -> List[List[int]]:
+    """
+    Group nodes into regions by k-medoids on the distance matrix
+
+    Medoids are seeded by farthest-point sampling, then each node joins its nearest
+    medoid and each medoid moves to the member closest to the rest of its region.
+
+    Args:
+        distance_matrix: Arc costs between all nodes of the problem
+        nodes: Nodes to cluster
+        count: Number of clusters
+        seed: Seed picking the first medoid
+
+    Returns:
+        Non-empty clusters of nodes, largest first
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    count = max(1, min(count, len(nodes)))
+    if count == 1:
+        return [nodes.tolist()] if len(nodes) else []
+
+    # Symmetric distances between the nodes being clustered
+    distances = distance_matrix[np.ix_(nodes, nodes)].astype(np.float64)
+    distances = (distances + distances.T) / 2
+
+    rng = np.random.default_rng(seed)
+    medoids = [int(rng.integers(len(nodes)))]
+    nearest = distances[medoids[0]].copy()
+    for _ in range(1, count):
+        medoids.append(int(np.argmax(nearest)))
+        np.minimum(nearest, distances[medoids[-1]], out=nearest)
+    medoids = np.array(medoids)
+
+    for _ in range(CLUSTER_ITERATIONS):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        labels[medoids] = np.arange(count)
+        updated = medoids.copy()
+        for cluster in range(count):
+            members = np.flatnonzero(labels == cluster)
+            updated[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+
+    labels = np.argmin(distances[:, medoids], axis=1)
+    labels[medoids] = np.arange(count)
+    clusters = [nodes[labels == cluster].tolist() for cluster in range(count)]
+    return sorted((cluster for cluster in clusters if cluster), key=len, reverse=True)
+
+
+def share_vehicles(cluster_sizes: Sequence[int], num_vehicles: int) -> List[int]:
+    """Split vehicles between clusters in proportion to their size, at least one each (D'Hondt)"""
+    sizes = np.asarray(cluster_sizes, dtype=np.float64)
+    if num_vehicles < len(sizes):
+        raise ValueError(f"{len(sizes)} clusters need at least as many vehicles, got {num_vehicles}")
+    shares = np.ones(len(sizes), dtype=np.int64)
+    for _ in range(num_vehicles - len(sizes)):
+        shares[np.argmax(sizes / shares)] += 1
+    return shares.tolist()
+
+
+def split_problem(problem: RoutingProblem, clusters: List[List[int]], vehicles: List[int],
+                  time_limit: float) -> List[Tuple[RoutingProblem, List[int]]]:
+    """
+    Build one routing problem per cluster: the depot, the cluster's nodes and its vehicles
+
+    Returns:
+        Sub-problems, each with its nodes' indices in the full problem (the depot first)
+    """
+    subproblems = []
+    for cluster, cluster_vehicles in zip(clusters, vehicles):
+        nodes = [problem.depot, *cluster]
+        index = np.ix_(nodes, nodes)
+        subproblems.append((
+            problem._replace(
+                distance_matrix=problem.distance_matrix[index],
+                time_matrix=problem.time_matrix[index],
+                time_windows=[problem.time_windows[node] for node in nodes],
+                num_vehicles=cluster_vehicles,
+                time_limit=time_limit,
+                depot=0,
+                initial_routes=None,
+                locations=[problem.locations[node] for node in nodes] if problem.locations else None
+            ),
+            nodes
+        ))
+    return subproblems
+
+
+def merge_solutions(problem: RoutingProblem, subproblems: List[Tuple[RoutingProblem, List[int]]],
+                    solutions: List[RoutingSolution]) -> RoutingSolution:
+    """
+    Combine the clusters' routes into one solution of the full problem
+
+    Vehicles are numbered cluster by cluster, in the order vehicles were shared out.
+    """
+    routes = []
+    for (_, nodes), solution in zip(subproblems, solutions):
+        routes.extend([nodes[node] for node in route] for route in solution.routes)
+    routes.extend([] for _ in range(problem.num_vehicles - len(routes)))
+    cancelled = any(solution.cancelled for solution in solutions)
+    return RoutingSolution(
+        routes=routes,
+        objective=route_cost(problem, routes),
+        solutions=sum(solution.solutions for solution in solutions),
+        solve_time=max((solution.solve_time for solution in solutions), default=0.0),
+        cancelled=cancelled,
+        stop_reason=STOP_CANCELLED if cancelled else None
+    )
+
+
+def route_cost(problem: RoutingProblem, routes: List[List[int]]) -> int:
+    """Total arc cost of routes from and back to the depot"""
+    total = 0
+    for route in routes:
+        if route:
+            stops = [problem.depot, *route, problem.depot]
+            total += int(problem.distance_matrix[stops[:-1], stops[1:]].sum())
+    return total
@@ -0,0 +1,370 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+logger = logging.getLogger("RoutingModel")
+
+# Planning horizon of the Time dimension (minutes)
+TIME_HORIZON = 1440
+
+# Waiting allowed at a location before its time window opens (minutes)
+MAX_WAITING_TIME = 30
+
+# Arc values used where a matrix has no value (unknown location), kept finite so OR-Tools can use them
+UNREACHABLE_DISTANCE = 10_000_000  # metres
+UNREACHABLE_TIME = TIME_HORIZON  # minutes
+
+# Processes solving routing problems, shared by every optimization in this process
+SOLVER_WORKERS = int(os.getenv("OPTIMIZATION_WORKERS", str(os.cpu_count() or 1)))
+
+# Solver progress is published at most this often (seconds)
+PROGRESS_INTERVAL = 0.5
+
+# Search limit checks between looks at the cancel flag: a check is a cheap Python call, a
+# look at a managed event is a round trip to the manager process
+CANCEL_CHECK_CALLS = 10000
+
+# Why a search stopped
+STOP_CANCELLED = "cancelled"  # A cancel request
+STOP_PLATEAU = "plateau"  # The objective stopped improving
+STOP_TIME_LIMIT = "time_limit"
+STOP_COMPLETED = "completed"  # The search finished before the time limit (e.g. at a local optimum)
+
+# (first solution strategy, local search metaheuristic) pairs solved side by side in portfolio mode
+PORTFOLIO_STRATEGIES = [
+    ("PATH_CHEAPEST_ARC", "GUIDED_LOCAL_SEARCH"),
+    ("SAVINGS", "GUIDED_LOCAL_SEARCH"),
+    ("PARALLEL_CHEAPEST_INSERTION", "SIMULATED_ANNEALING"),
+    ("PATH_CHEAPEST_ARC", "TABU_SEARCH"),
+]
+
+
+class RoutingProblem(NamedTuple):
+    """A routing problem as the solver processes receive it (picklable)"""
+    distance_matrix: np.ndarray  # Integer arc costs (metres)
+    time_matrix: np.ndarray  # Integer travel times (minutes)
+    time_windows: List[Tuple[int, int]]  # (earliest, latest) arrival per node (minutes)
+    num_vehicles: int
+    time_limit: float  # Seconds
+    first_solution_strategy: str = "PATH_CHEAPEST_ARC"
+    local_search_metaheuristic: str = "AUTOMATIC"
+    depot: int = 0
+    initial_routes: Optional[List[List[int]]] = None  # Complete routes to start the search from (warm start)
+    locations: Optional[List[str]] = None  # Location of each node
+    plateau_improvement: float = 0.0  # Smallest relative objective improvement that counts (e.g. 0.005 for 0.5%)
+    plateau_time: float = 0.0  # Stop after this many seconds without such an improvement (0: never)
+
+    @property
+    def strategy(self) -> str:
+        """Search strategy, as first solution strategy/local search metaheuristic"""
+        return f"{self.first_solution_strategy}/{self.local_search_metaheuristic}"
+
+
+class RoutingSolution(NamedTuple):
+    """Best routes found for a routing problem"""
+    routes: List[List[int]]  # Nodes visited by each vehicle in order, depot excluded
+    objective: int
+    solutions: int  # Solutions found during the search
+    solve_time: float  # Seconds
+    cancelled: bool  # The search was stopped by a cancel request
+    strategy: Optional[str] = None  # Search strategy that found the routes
+    stop_reason: Optional[str] = None  # One of the STOP_ values
+    improvements: Sequence[Tuple[float, int]] = ()  # (elapsed seconds, objective) at each new best objective
+
+
+def to_int_matrix(matrix: Sequence[Sequence[float]], unreachable: int) -> np.ndarray:
+    """
+    Round a distance or time matrix to the integer arc values OR-Tools works with
+
+    Args:
+        matrix: Square matrix (nested lists or array), inf/NaN where there is no value
+        unreachable: Value for missing arcs; larger values are capped to it
+
+    Returns:
+        int64 array of the same shape with a zero diagonal
+    """
+    values = np.array(matrix, dtype=np.float64)
+    if values.ndim != 2 or values.shape[0] != values.shape[1]:
+        raise ValueError(f"Expected a square matrix, got shape {values.shape}")
+    values[~np.isfinite(values)] = unreachable
+    result = np.rint(np.clip(values, 0, unreachable)).astype(np.int64)
+    np.fill_diagonal(result, 0)
+    return result
+
+
+def build_routing_model(distance_matrix: np.ndarray, time_matrix: np.ndarray, time_windows: List[Tuple[int, int]],
+                        num_vehicles: int, depot: int = 0) -> Tuple[pywrapcp.RoutingIndexManager, pywrapcp.RoutingModel]:
+    """
+    Build the vehicle routing model over integer distance and time matrices
+
+    Both matrices are registered with RegisterTransitMatrix, so OR-Tools evaluates arcs
+    natively and the search never calls back into Python.
+
+    Args:
+        distance_matrix: Integer arc costs (metres) between nodes
+        time_matrix: Integer travel times (minutes) between nodes
+        time_windows: (earliest, latest) arrival in minutes for each node
+        num_vehicles: Number of vehicles, all starting and ending at the depot
+        depot: Depot node
+
+    Returns:
+        Tuple of (manager, routing)
+    """
+    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, depot)
+    routing = pywrapcp.RoutingModel(manager)
+
+    distance_index = routing.RegisterTransitMatrix(np.asarray(distance_matrix, dtype=np.int64).tolist())
+    routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+
+    time_index = routing.RegisterTransitMatrix(np.asarray(time_matrix, dtype=np.int64).tolist())
+    routing.AddDimension(
+        time_index,
+        MAX_WAITING_TIME,
+        TIME_HORIZON,
+        False,  # Don't force start cumul to zero
+        'Time'
+    )
+    time_dimension = routing.GetDimensionOrDie('Time')
+
+    # Time window constraints for each location, then for each vehicle start at the depot
+    for node, (earliest, latest) in enumerate(time_windows):
+        if node == depot:
+            continue
+        time_dimension.CumulVar(manager.NodeToIndex(node)).SetRange(int(earliest), int(latest))
+    earliest, latest = time_windows[depot]
+    for vehicle_id in range(num_vehicles):
+        time_dimension.CumulVar(routing.Start(vehicle_id)).SetRange(int(earliest), int(latest))
+
+    return manager, routing
+
+
+def solve_routing(problem: RoutingProblem, cancel_event: Optional[Any] = None,
+                  progress: Optional[Any] = None) -> Optional[RoutingSolution]:
+    """
+    Solve a routing problem; runs in the solver processes
+
+    Args:
+        problem: Problem to solve
+        cancel_event: Event (e.g. a managed one) that stops the search when set; the best
+            solution found so far is returned
+        progress: Dict (e.g. a managed one) updated with solutions, objective and elapsed
+            seconds as the search goes
+
+    With the problem's plateau_time set, the search also stops at the first solution found
+    once the best objective has not improved by more than plateau_improvement (relative)
+    for plateau_time seconds. The plateau is checked as solutions come in, so only a
+    cancel_event adds a search limit that calls back into Python.
+
+    Returns:
+        The best solution found, or None if there is none
+    """
+    manager, routing = build_routing_model(
+        problem.distance_matrix, problem.time_matrix, problem.time_windows, problem.num_vehicles, problem.depot
+    )
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, problem.first_solution_strategy
+    )
+    search_parameters.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, problem.local_search_metaheuristic
+    )
+    search_parameters.time_limit.FromMilliseconds(int(problem.time_limit * 1000))
+
+    start = time.monotonic()
+    state = {"solutions": 0, "objective": None, "published": float("-inf"), "checks": 0, "cancelled": False,
+             "best": None, "reference": None, "improved": start, "plateau": False}
+    improvements = []
+
+    def publish(force: bool = False):
+        now = time.monotonic()
+        if progress is None or (not force and now - state["published"] < PROGRESS_INTERVAL):
+            return
+        state["published"] = now
+        try:
+            progress.update({
+                "solutions": state["solutions"],
+                "objective": state["objective"],
+                "elapsed": round(now - start, 3),
+                "time_limit": problem.time_limit,
+            })
+        except Exception as e:
+            logger.warning(f"Error publishing solver progress: {str(e)}")
+
+    def on_solution():
+        now = time.monotonic()
+        objective = routing.CostVar().Value()
+        state["solutions"] += 1
+        state["objective"] = objective
+        if state["best"] is None or objective < state["best"]:
+            improvements.append((round(now - start, 3), objective))
+            state["best"] = objective
+            # Small improvements add up until they beat the objective of the last real one
+            if state["reference"] is None or objective < state["reference"] * (1 - problem.plateau_improvement):
+                state["reference"] = objective
+                state["improved"] = now
+        if problem.plateau_time > 0 and now - state["improved"] > problem.plateau_time:
+            state["plateau"] = True
+            routing.solver().FinishCurrentSearch()
+        publish()
+
+    def should_stop() -> bool:
+        state["checks"] += 1
+        if state["checks"] % CANCEL_CHECK_CALLS:
+            return False
+        try:
+            state["cancelled"] = state["cancelled"] or cancel_event.is_set()
+        except Exception as e:
+            logger.warning(f"Error checking for cancellation, stopping the search: {str(e)}")
+            state["cancelled"] = True
+        return state["cancelled"]
+
+    routing.AddAtSolutionCallback(on_solution)
+    if cancel_event is not None:
+        routing.AddSearchMonitor(routing.solver().CustomLimit(should_stop))
+
+    initial = None
+    if problem.initial_routes:
+        routing.CloseModelWithParameters(search_parameters)
+        initial = routing.ReadAssignmentFromRoutes(problem.initial_routes, True)
+        if initial is None:
+            logger.info("Initial routes are not a feasible solution, solving from scratch")
+    if initial is not None:
+        solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+    else:
+        solution = routing.SolveWithParameters(search_parameters)
+    solve_time = time.monotonic() - start
+    publish(force=True)
+    if not solution:
+        return None
+
+    if state["cancelled"]:
+        stop_reason = STOP_CANCELLED
+    elif state["plateau"]:
+        stop_reason = STOP_PLATEAU
+    elif solve_time >= problem.time_limit * 0.99:  # The solver stops a few milliseconds short of the limit
+        stop_reason = STOP_TIME_LIMIT
+    else:
+        stop_reason = STOP_COMPLETED
+
+    routes = []
+    for vehicle_id in range(problem.num_vehicles):
+        route = []
+        index = solution.Value(routing.NextVar(routing.Start(vehicle_id)))
+        while not routing.IsEnd(index):
+            route.append(manager.IndexToNode(index))
+            index = solution.Value(routing.NextVar(index))
+        routes.append(route)
+
+    return RoutingSolution(
+        routes=routes,
+        objective=solution.ObjectiveValue(),
+        solutions=state["solutions"],
+        solve_time=solve_time,
+        cancelled=state["cancelled"],
+        strategy=problem.strategy,
+        stop_reason=stop_reason,
+        improvements=improvements
+    )
+
+
+def route_schedule(route: Sequence[int], time_matrix: np.ndarray, time_windows: List[Tuple[int, int]],
+                   depot: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Earliest arrival times along a route and how late each stop could be reached
+
+    Args:
+        route: Nodes visited in order, depot excluded
+        time_matrix: Integer travel times (minutes) between nodes
+        time_windows: (earliest, latest) arrival per node (minutes)
+        depot: Depot node the route starts and ends at
+
+    Returns:
+        Tuple of (arrivals, slack) for depot, stops and return to depot: slack[i] is the
+        delay at stop i that every later stop still absorbs within its window
+    """
+    stops = [depot, *route, depot]
+    latest = np.array([time_windows[node][1] for node in stops[:-1]] + [TIME_HORIZON], dtype=np.int64)
+    earliest = np.array([time_windows[node][0] for node in stops], dtype=np.int64)
+    travel = time_matrix[stops[:-1], stops[1:]]
+    arrivals = np.empty(len(stops), dtype=np.int64)
+    arrivals[0] = earliest[0]
+    for i in range(1, len(stops)):
+        arrivals[i] = max(arrivals[i - 1] + travel[i - 1], earliest[i])
+    slack = np.minimum.accumulate((latest - arrivals)[::-1])[::-1]
+    return arrivals, slack
+
+
+def insert_nodes(routes: List[List[int]], nodes: Sequence[int], distance_matrix: np.ndarray, time_matrix: np.ndarray,
+                 time_windows: List[Tuple[int, int]], depot: int = 0) -> Optional[List[List[int]]]:
+    """
+    Add nodes to routes one at a time, each where it adds the least distance without
+    breaking a time window
+
+    Every position of every route is tried at once, so each insertion takes
+    O(routes x route length) array work.
+
+    Args:
+        routes: Nodes visited by each vehicle in order, depot excluded (not modified)
+        nodes: Nodes to insert
+        distance_matrix: Integer arc costs (metres) between nodes
+        time_matrix: Integer travel times (minutes) between nodes
+        time_windows: (earliest, latest) arrival per node (minutes)
+        depot: Depot node the routes start and end at
+
+    Returns:
+        The routes with every node inserted, or None if a node fits nowhere
+    """
+    routes = [list(route) for route in routes]
+    schedules = [route_schedule(route, time_matrix, time_windows, depot) for route in routes]
+    for node in nodes:
+        earliest, latest = time_windows[node]
+        best = None  # (added distance, vehicle, position)
+        for vehicle, route in enumerate(routes):
+            arrivals, slack = schedules[vehicle]
+            stops = np.array([depot, *route, depot])
+            before, after = stops[:-1], stops[1:]
+            added = distance_matrix[before, node] + distance_matrix[node, after] - distance_matrix[before, after]
+            arrival = np.maximum(arrivals[:-1] + time_matrix[before, node], earliest)
+            delay = np.maximum(arrival + time_matrix[node, after], arrivals[1:]) - arrivals[1:]
+            feasible = (arrival <= latest) & (delay <= slack[1:])
+            if not feasible.any():
+                continue
+            position = int(np.argmin(np.where(feasible, added, np.iinfo(np.int64).max)))
+            if best is None or added[position] < best[0]:
+                best = (added[position], vehicle, position)
+        if best is None:
+            return None
+        _, vehicle, position = best
+        routes[vehicle].insert(position, node)
+        schedules[vehicle] = route_schedule(routes[vehicle], time_matrix, time_windows, depot)
+    return routes
+
+
+# Process pool shared by every optimization in this process
+_solver_pool: Optional[ProcessPoolExecutor] = None
+_solver_pool_lock = threading.Lock()
+
+def get_solver_pool() -> ProcessPoolExecutor:
+    """Get the process pool routing problems are solved in, starting it on first use"""
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is None:
+            _solver_pool = ProcessPoolExecutor(
+                max_workers=max(SOLVER_WORKERS, 1), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _solver_pool
+
+def shutdown_solver_pool(wait: bool = True):
+    """Stop the solver processes; the next solve starts a new pool"""
+    global _solver_pool
+    with _solver_pool_lock:
+        pool, _solver_pool = _solver_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def rate_history_dir(tmp_path, monkeypatch):
+    """Keep the sheet versions recorded by tests out of the working directory"""
+    monkeypatch.setenv("RATE_HISTORY_DIR", str(tmp_path / "rate_history"))
@@ -0,0 +1,26 @@
+from server.benchmarks.rate_sheet_generator import generate_workbook
+from server.benchmarks.bench_rate_service import run_benchmarks, compare_results, make_service
+from server.models.rate_models import RateRequest
+
+def test_generated_workbook_is_quotable(tmp_path):
+    sheets = generate_workbook(str(tmp_path / "Bench.xlsx"), warehouses=2, destinations=120)
+    service = make_service(str(tmp_path))
+    
+    assert service.get_warehouses("Bench") == ["Warehouse 1", "Warehouse 2"]
+    assert service.get_destinations("Bench", "Warehouse 2") == sheets["Warehouse 2"]
+    request = RateRequest(manufacturer="Bench", warehouse="Warehouse 1", destination=sheets["Warehouse 1"][7], weight=3000)
+    assert service.calculate_rate(request) > 0
+
+def test_run_benchmarks_reports_every_measurement(tmp_path):
+    sheets = generate_workbook(str(tmp_path / "Bench.xlsx"), warehouses=2, destinations=50)
+    results = run_benchmarks(str(tmp_path), "Bench", sheets, bulk_sizes=[100], repeat=1)
+    
+    assert set(results) == {
+        "get_rates", "compile_workbook", "calculate_rate_cold", "calculate_rate_warm",
+        "get_destinations_warm", "calculate_rates_100"
+    }
+    assert results["calculate_rates_100"]["ops_per_run"] == 100
+    
+    slower = {name: dict(timing, median_ms=timing["median_ms"] * 2) for name, timing in results.items()}
+    assert compare_results(slower, results) == list(results)
+    assert compare_results(results, slower) == []
@@ -0,0 +1,52 @@
+import io
+import csv
+import json
+import pytest
+from server.benchmarks.rate_sheet_generator import generate_workbook
+from server.models.rate_models import RateRequest
+from server.services.bulk_quoting import quote_csv, quote_ndjson
+from server.services.rate_service import RateService
+
+@pytest.fixture
+def service(tmp_path):
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.sheets = generate_workbook(str(tmp_path / "Bench.xlsx"), warehouses=2, destinations=40)
+    return service
+
+def test_quote_csv_in_chunks(service):
+    destinations = service.sheets["Warehouse 2"]
+    source = io.StringIO()
+    writer = csv.writer(source)
+    writer.writerow(["order", "manufacturer", "warehouse", "destination", "weight"])
+    for i in range(7):
+        writer.writerow([f"O{i}", "Bench", "Warehouse 2", destinations[i], 1500 * (i + 1)])
+    writer.writerow(["O7", "Bench", "Warehouse 2", "Nowhere At All", 1000])
+    writer.writerow(["O8", "Bench", "Warehouse 2", destinations[0], "heavy"])
+    source.seek(0)
+
+    target = io.StringIO()
+    counts = quote_csv(service, source, target, chunk_size=3)
+    assert counts == {"rows": 9, "quoted": 7, "unquoted": 1, "invalid": 1}
+
+    rows = list(csv.DictReader(io.StringIO(target.getvalue())))
+    assert [row["order"] for row in rows] == [f"O{i}" for i in range(9)]
+    expected = service.calculate_rates([
+        RateRequest(manufacturer="Bench", warehouse="Warehouse 2", destination=destinations[i], weight=1500 * (i + 1))
+        for i in range(7)
+    ])
+    assert [float(row["rate"]) for row in rows[:7]] == expected
+    assert float(rows[7]["rate"]) == 0.0
+    assert rows[8]["rate"] == "" and rows[8]["error"].startswith("weight")
+
+def test_quote_csv_requires_request_columns(service):
+    with pytest.raises(ValueError, match="destination, weight"):
+        quote_csv(service, io.StringIO("manufacturer,warehouse\nBench,Warehouse 1\n"), io.StringIO())
+
+def test_quote_ndjson_emits_one_block_per_chunk(service):
+    destination = service.sheets["Warehouse 1"][0]
+    line = json.dumps({"manufacturer": "Bench", "warehouse": "Warehouse 1", "destination": destination, "weight": 5000})
+    blocks = list(quote_ndjson(service, [line.encode()] * 5, chunk_size=2))
+    assert [block.count("\n") for block in blocks] == [2, 2, 1]
+    assert [json.loads(result)["line"] for block in blocks for result in block.splitlines()] == [1, 2, 3, 4, 5]
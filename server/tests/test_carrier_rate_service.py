@@ -0,0 +1,74 @@
+import json
+import pytest
+from server.services.carrier_rate_service import CarrierRateService, LBS_PER_KG
+from server.models.rate_models import RateRequest
+
+weight_table = {
+    "carrier": "Bracket",
+    "rates": [
+        {"weight_range": [0, 2500], "rate_per_100kg": 50.0, "minimum_charge": 200.0},
+        {"weight_range": [2501, 8000], "rate_per_100kg": 40.0, "minimum_charge": 250.0}
+    ],
+    "fuel_surcharge": 0.1,
+    "hazardous_material_fee": 25.0,
+    "loading_fee": 10.0
+}
+
+lane_table = {
+    "carrier": "Lane",
+    "rates": [
+        {
+            "origin": "Winnipeg", "destination": "Regina",
+            "origin_lat": 49.8951, "origin_lon": -97.1384,
+            "destination_lat": 50.4452, "destination_lon": -104.6189,
+            "rate_per_km": 1.0, "min_charge": 100.0,
+            "special_requirements": ["refrigerated"]
+        }
+    ]
+}
+
+def shipment(weight_kg, destination="Regina", special_requirements=None):
+    return RateRequest(manufacturer="IPCO", warehouse="Winnipeg", destination=destination,
+                       weight=weight_kg * LBS_PER_KG, special_requirements=special_requirements)
+
+class TestCarrierRateService:
+    @pytest.fixture
+    def carrier_service(self, tmp_path):
+        (tmp_path / "Bracket_rates.json").write_text(json.dumps(weight_table))
+        (tmp_path / "Lane_rates.json").write_text(json.dumps(lane_table))
+        return CarrierRateService(str(tmp_path))
+    
+    def test_get_carriers(self, carrier_service):
+        assert carrier_service.get_carriers() == ["Bracket", "Lane"]
+        assert carrier_service.get_carrier_rates("Lane") == lane_table
+        assert carrier_service.get_carrier_rates("Unknown") is None
+    
+    def test_quote_carriers(self, carrier_service):
+        carriers, costs = carrier_service.quote_carriers([
+            shipment(100),                                    # Bracket minimum charge
+            shipment(3000, special_requirements=["hazmat"]),  # Second bracket plus hazardous fee
+            shipment(2500.5),                                 # Between ranges: first bracket
+            shipment(9000),                                   # Too heavy for the bracket table
+            shipment(1000, destination="Calgary"),            # No lane
+            shipment(1000, special_requirements=["hazardous_materials"])  # Lane cannot carry hazmat
+        ])
+        
+        bracket = costs[:, carriers.index("Bracket")]
+        assert bracket[0] == pytest.approx(200.0 * 1.1 + 10.0, abs=0.01)
+        assert bracket[1] == pytest.approx(3000 / 100 * 40.0 * 1.1 + 25.0 + 10.0, abs=0.01)
+        assert bracket[2] == pytest.approx(2500.5 / 100 * 50.0 * 1.1 + 10.0, abs=0.01)
+        assert bracket[3] == float("inf")
+        
+        lane = costs[:, carriers.index("Lane")]
+        assert 500 < lane[0] < 600  # ~540 km at $1/km
+        assert lane[4] == float("inf")
+        assert lane[5] == float("inf")
+    
+    def test_find_cheapest(self, carrier_service):
+        results = carrier_service.find_cheapest([shipment(100), shipment(5000), shipment(9000, destination="Calgary")])
+        
+        assert results[0]["carrier"] == "Bracket"
+        assert results[1]["carrier"] == "Lane"
+        assert results[1]["cost"] == results[1]["quotes"]["Lane"]
+        assert results[2]["carrier"] is None
+        assert results[2]["quotes"] == {"Bracket": None, "Lane": None}
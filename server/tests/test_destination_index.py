@@ -0,0 +1,43 @@
+import numpy as np
+from server.services.destination_index import DestinationIndex
+from server.services.rate_index import CompiledRateSheet
+
+def compiled_sheet(cities, provinces):
+    return CompiledRateSheet.from_rows(cities, np.ones((len(cities), 7)), 0.0, provinces)
+
+def test_prefix_search_ranks_and_filters():
+    index = DestinationIndex({
+        ('BASF', 'Regina'): compiled_sheet(['Regina', 'Regina Beach', 'Fort St. John', 'Winnipeg'], ['SK', 'SK', 'BC', 'MB']),
+        ('BASF', 'Calgary'): compiled_sheet(['Regina Beach', 'Winnipeg', 'Winkler'], ['SK', 'MB', 'MB']),
+        ('FCL', 'Regina'): compiled_sheet(['REGINA BEACH', 'Saint John'], ['SK', 'NB']),
+    })
+    
+    def names(*args, **kwargs):
+        return [s['destination'] for s in index.search(*args, **kwargs)]
+    
+    assert len(index) == 6  # Same name and province in several sheets is one destination
+    assert names('reg') == ['Regina Beach', 'Regina']  # Carried by more sheets first
+    assert names('Regina') == ['Regina', 'Regina Beach']  # An exact name always first
+    assert names('regina', limit=1) == ['Regina']
+    assert names('win', limit=1) == ['Winnipeg']
+    assert names('john') == ['Fort St. John', 'Saint John']  # Later words match too
+    assert names('st john') == ['Fort St. John']
+    assert names('reg', manufacturer='FCL') == ['Regina Beach']
+    assert names('w', manufacturer='BASF', warehouse='Calgary') == ['Winnipeg', 'Winkler']
+    assert names('reg', warehouse='Regina') == ['Regina Beach', 'Regina']  # Warehouse alone: every manufacturer's sheet
+    assert names('win', warehouse='Calgary') == ['Winnipeg', 'Winkler']
+    
+    # Unknown filters match nothing and leave no mask behind
+    assert names('reg', manufacturer='Nobody') == []
+    assert names('reg', manufacturer='FCL', warehouse='Calgary') == []
+    assert names('reg', warehouse='Nowhere') == []
+    assert set(index.masks) == {('FCL', None), ('BASF', 'Calgary'), (None, 'Regina'), (None, 'Calgary')}
+    assert names('x') == [] and names('') == []
+    
+    beach = index.search('regina beach')[0]
+    assert beach['province'] == 'SK'
+    assert beach['sheets'] == [
+        {'manufacturer': 'BASF', 'warehouse': 'Calgary'},
+        {'manufacturer': 'BASF', 'warehouse': 'Regina'},
+        {'manufacturer': 'FCL', 'warehouse': 'Regina'},
+    ]
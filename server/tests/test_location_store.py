@@ -0,0 +1,106 @@
+import queue
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from server.services.location_store import LocationStore
+from server.services.rate_service import RateService
+
+class FakeGeocoder:
+    """Stands in for GoogleMapsService.geocode_address"""
+    known = {"Winkler, Canada": {"lat": 49.1817, "lng": -97.9411}}
+    queries = []
+    
+    async def geocode_address(self, address):
+        self.queries.append(address)
+        return self.known.get(address)
+    
+    async def close(self):
+        pass
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'locations.db'}")
+    return sessionmaker(bind=engine)
+
+def test_load_seeds_and_preloads(session_factory):
+    store = LocationStore(session_factory)
+    assert store.load({"Winnipeg": (49.8951, -97.1384)}) == 1
+    assert store.get("  WINNIPEG ") == (49.8951, -97.1384)
+    
+    # Without a geocoder, unknown locations are simply not found
+    assert store.get("Winkler") is None
+    assert store.stats()["pending"] == 0
+
+def test_unknown_locations_geocoded_in_background(session_factory):
+    FakeGeocoder.queries = []
+    store = LocationStore(session_factory, FakeGeocoder)
+    store.load()
+    store.start()
+    try:
+        # Lookups never block; repeated misses are queued once
+        assert store.get("Winkler") is None
+        assert store.get("winkler") is None
+        assert store.get("Nowhere") is None
+        store.queue.join()
+    finally:
+        store.stop()
+    
+    assert FakeGeocoder.queries == ["Winkler, Canada", "Nowhere, Canada"]
+    assert store.get("Winkler") == (49.1817, -97.9411)
+    assert store.stats() == {"known": 1, "pending": 0, "failed": 1}
+    
+    # Stored for the next process
+    reloaded = LocationStore(session_factory)
+    reloaded.load()
+    assert reloaded.get("WINKLER") == (49.1817, -97.9411)
+
+def test_rate_service_uses_location_store(session_factory):
+    store = LocationStore(session_factory)
+    store.load({"Winkler": (49.1817, -97.9411)})
+    service = RateService()
+    service.location_store = store
+    
+    assert service._get_location_coordinates("Winkler") == (49.1817, -97.9411)
+    assert 0 < service._calculate_distance("Winnipeg", "Winkler") < 200
+    assert service._get_location_coordinates("Unknown") is None
+
+def test_geocoding_queue_and_failures_are_bounded(session_factory, monkeypatch):
+    monkeypatch.setattr("server.services.location_store.FAILED_LOCATIONS_KEPT", 2)
+    FakeGeocoder.queries = []
+    store = LocationStore(session_factory, FakeGeocoder)
+    store.load()
+    store.queue = queue.Queue(maxsize=2)
+    store.thread = object()  # Queue without a worker draining it
+    
+    # Beyond the queue size, unknown locations are dropped rather than queued
+    for location in ["A", "B", "C"]:
+        assert store.get(location) is None
+    assert store.queue.qsize() == 2 and store.pending == {"a", "b"}
+    
+    # Names from request parameters are looked up without being queued
+    store.queue = queue.Queue()
+    assert store.get("D", geocode=False) is None
+    assert store.queue.empty()
+    
+    # Only the most recent failures are remembered
+    loop = asyncio.new_event_loop()
+    try:
+        for location in ["X", "Y", "Z"]:
+            store._geocode(loop, FakeGeocoder(), location)
+    finally:
+        loop.close()
+    assert list(store.failed) == ["y", "z"]
+
+def test_rate_service_geocodes_only_when_asked(session_factory):
+    store = LocationStore(session_factory)
+    store.load()
+    store.thread = object()
+    service = RateService()
+    service.location_store = store
+    
+    assert service._get_location_coordinates("Atlantis", geocode=False) is None
+    assert service._calculate_distance("Winnipeg", "Atlantis", geocode=False) == float("inf")
+    assert store.queue.empty()
+    assert service._get_location_coordinates("Atlantis") is None
+    assert store.queue.qsize() == 1
@@ -0,0 +1,149 @@
+import time
+import asyncio
+import threading
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server.api import optimization
+from server.benchmarks.bench_optimization import make_instance
+from server.models.order_models import Order, OrderAssignment, Trailer, Truck
+from server.models.optimization_models import OptimizationJobStatus
+from server.services.optimization_engine import OptimizationEngine
+from server.services.optimization_jobs import OptimizationJobService
+from server.services.routing_model import PORTFOLIO_STRATEGIES, RoutingProblem, shutdown_solver_pool, solve_routing
+
+ORDERS = [
+    Order(id=f"O{i}", customer_id="C", customer_name="C", ship_from="Winnipeg", ship_to="Regina",
+          pickup_date=datetime(2025, 1, 1), weight_kg=1000)
+    for i in range(3)
+]
+
+def make_problem(size=40, time_limit=1.0, metaheuristic="AUTOMATIC"):
+    distance, time_matrix, windows = make_instance(size, seed=size)
+    return RoutingProblem(distance, time_matrix, windows, num_vehicles=3, time_limit=time_limit,
+                          local_search_metaheuristic=metaheuristic)
+
+def make_engine(problem):
+    engine = OptimizationEngine()
+    trucks = [Truck(id=f"T{i}", name="Truck", driver="D", current_hours=0, max_hours=11, warehouse="Winnipeg") for i in range(3)]
+    trailers = [Trailer(id="TR1", name="Trailer", max_weight_kg=20000, has_pallet_jack=True, warehouse="Winnipeg")]
+    engine.prepare_problem = AsyncMock(return_value=(problem, trucks, trailers))
+    engine.extract_assignments = MagicMock(return_value=[
+        OrderAssignment(order_id="O1", truck_id="T1", trailer_id="TR1", sequence=0, assigned_by="OptimizationEngine", assigned_at=datetime.utcnow())
+    ])
+    return engine
+
+@pytest.fixture(scope="module", autouse=True)
+def solver_pool():
+    yield
+    shutdown_solver_pool()
+
+def test_solve_routing_reports_progress_and_stops_when_cancelled():
+    progress = {}
+    solution = solve_routing(make_problem(), progress=progress)
+    assert len(solution.routes) == 3 and sorted(node for route in solution.routes for node in route) == list(range(1, 40))
+    assert progress["solutions"] == solution.solutions > 0 and progress["objective"] == solution.objective
+    assert not solution.cancelled
+
+    cancel_event = threading.Event()
+    cancel_event.set()
+    start = time.monotonic()
+    solution = solve_routing(make_problem(100, time_limit=30, metaheuristic="GUIDED_LOCAL_SEARCH"), cancel_event)
+    assert solution is None or solution.cancelled
+    assert time.monotonic() - start < 10
+
+def test_jobs_solve_in_the_process_pool_and_apply_assignments():
+    async def run():
+        service = OptimizationJobService(make_engine(make_problem()._replace(locations=[f"L{i}" for i in range(40)])))
+        apply = AsyncMock(return_value=1)
+        job = service.submit(ORDERS, apply)
+        assert service.describe(job).status in (OptimizationJobStatus.QUEUED, OptimizationJobStatus.PREPARING)
+        await service.wait(job)
+        service.shutdown()
+        return service, service.describe(job), apply
+
+    service, described, apply = asyncio.run(run())
+    assert described.status == OptimizationJobStatus.COMPLETED
+    assert described.order_ids == ["O0", "O1", "O2"]
+    assert described.progress.solutions > 0 and described.progress.objective > 0
+    apply.assert_awaited_once()
+    # The applied plan is kept for the next re-plan, with only the route of the assigned truck
+    assert list(service.engine.route_plans["L0"]) == ["T1"]
+
+def test_portfolio_keeps_the_best_strategy():
+    async def run():
+        service = OptimizationJobService(make_engine(make_problem(time_limit=2)))
+        job = service.submit(ORDERS, portfolio=True)
+        await service.wait(job)
+        service.shutdown()
+        return service, service.describe(job)
+
+    service, described = asyncio.run(run())
+    strategies = {f"{first_solution}/{metaheuristic}" for first_solution, metaheuristic in PORTFOLIO_STRATEGIES}
+    assert described.status == OptimizationJobStatus.COMPLETED and described.strategy in strategies
+    assert set(service.engine.strategy_stats) == strategies
+    assert all(stats["runs"] == 1 for stats in service.engine.strategy_stats.values())
+    assert service.engine.strategy_stats[described.strategy]["wins"] == 1
+    assert sum(stats["wins"] for stats in service.engine.strategy_stats.values()) == 1
+    assert not service.engine.route_plans  # Nothing was applied
+
+def test_cancelled_job_stops_solving_and_assigns_nothing():
+    async def run():
+        service = OptimizationJobService(make_engine(make_problem(150, time_limit=60, metaheuristic="GUIDED_LOCAL_SEARCH")))
+        apply = AsyncMock(return_value=1)
+        job = service.submit(ORDERS, apply)
+
+        # Wait for the solver to report a solution, then cancel
+        for _ in range(600):
+            await asyncio.sleep(0.1)
+            if service.describe(job).progress.solutions:
+                break
+        assert service.describe(job).status == OptimizationJobStatus.SOLVING
+        start = time.monotonic()
+        await service.cancel_async(job.job_id)
+        await service.wait(job)
+        elapsed = time.monotonic() - start
+        service.shutdown()
+        return service.describe(job), apply, elapsed
+
+    described, apply, elapsed = asyncio.run(run())
+    assert described.status == OptimizationJobStatus.CANCELLED
+    assert elapsed < 10
+    apply.assert_not_awaited()
+
+def test_job_endpoints(monkeypatch):
+    service = OptimizationJobService(make_engine(make_problem()))
+    monkeypatch.setattr(optimization, "optimization_jobs", service)
+    monkeypatch.setattr(optimization, "get_order", lambda db, order_id: next((o for o in ORDERS if o.id == order_id), None))
+    app = FastAPI()
+    app.include_router(optimization.router, prefix="/api")
+    app.dependency_overrides[optimization.get_db] = lambda: None
+
+    with TestClient(app) as client:
+        assert client.post("/api/optimization/jobs", json={"order_ids": ["O1", "O9"]}).status_code == 404
+
+        response = client.post("/api/optimization/jobs", json={"order_ids": ["O0", "O1"], "assign": False})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        for _ in range(600):
+            job = client.get(f"/api/optimization/jobs/{job_id}").json()
+            if job["status"] not in ("queued", "preparing", "solving"):
+                break
+            time.sleep(0.1)
+        assert job["status"] == "completed"
+
+        result = client.get(f"/api/optimization/jobs/{job_id}/result").json()
+        assert result["assigned_count"] == 0 and result["assignments"][0]["order_id"] == "O1"
+        assert result["stop_reason"] == job["stop_reason"] and result["improvements"][-1]["objective"] > 0
+        assert [job["job_id"] for job in client.get("/api/optimization/jobs").json()] == [job_id]
+        assert client.delete(f"/api/optimization/jobs/{job_id}").json()["status"] == "completed"
+        assert client.get("/api/optimization/jobs/missing").status_code == 404
+
+        service.engine.strategy_stats = {"SAVINGS/TABU_SEARCH": {"runs": 2, "wins": 0}, "PATH_CHEAPEST_ARC/GUIDED_LOCAL_SEARCH": {"runs": 2, "wins": 2}}
+        assert [item["strategy"] for item in client.get("/api/optimization/strategies").json()] == [
+            "PATH_CHEAPEST_ARC/GUIDED_LOCAL_SEARCH", "SAVINGS/TABU_SEARCH"
+        ]
+    service.shutdown()
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from server.benchmarks.rate_sheet_generator import generate_workbook
+from server.crud import order_crud
+from server.database.models import OrderModel
+from server.models.order_models import Order
+from server.services.rate_service import LBS_PER_KG, RateService
+
+@pytest.fixture
+def rate_service(tmp_path, monkeypatch):
+    sheets = generate_workbook(str(tmp_path / "Bench.xlsx"), warehouses=2, destinations=40)
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.sheets = sheets
+    monkeypatch.setattr(order_crud, "get_rate_service", lambda: service)
+    return service
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    OrderModel.__table__.create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def make_order(order_id, ship_to, manufacturer="Bench", ship_from="Warehouse 2 Dock", weight_kg=2000.0):
+    return Order(
+        id=order_id,
+        customer_id="C1",
+        customer_name="Customer",
+        ship_from=ship_from,
+        ship_to=ship_to,
+        pickup_date=datetime(2025, 1, 6),
+        weight_kg=weight_kg,
+        manufacturer=manufacturer
+    )
+
+def test_resolve_warehouse(rate_service):
+    assert rate_service.resolve_warehouse("Bench", "Warehouse 1") == "Warehouse 1"
+    assert rate_service.resolve_warehouse("Bench", "WAREHOUSE 2 dock") == "Warehouse 2"
+    assert rate_service.resolve_warehouse("Bench", "Elsewhere") is None
+    assert rate_service.resolve_warehouse("Missing", "Warehouse 1") is None
+
+def test_quote_shipments_matches_single_quotes(rate_service):
+    destination = rate_service.sheets["Warehouse 2"][3]
+    quotes = rate_service.quote_shipments([
+        ("Bench", "Warehouse 2", f"12 Main St, {destination}", 5000),
+        ("Bench", "Warehouse 2", destination, 25000),
+        ("Bench", "Elsewhere", destination, 5000),
+        (None, "Warehouse 2", destination, 5000),
+    ])
+
+    compiled = rate_service.get_compiled_sheet("Bench", "Warehouse 2")
+    assert quotes[0]["warehouse"] == "Warehouse 2"
+    assert quotes[0]["destination"] == destination
+    assert quotes[0]["rate"] == compiled.quote(destination, 5000)
+    assert quotes[1]["rate"] == compiled.quote(destination, 25000)
+    assert quotes[0]["version"] == quotes[1]["version"]
+    assert quotes[2] is None and quotes[3] is None
+
+def test_create_order_stores_quote(rate_service, db):
+    destination = rate_service.sheets["Warehouse 2"][0]
+    order = order_crud.create_order(db, make_order("O1", destination))
+
+    compiled = rate_service.get_compiled_sheet("Bench", "Warehouse 2")
+    assert order.quoted_rate == compiled.quote(destination, 2000.0 * LBS_PER_KG)
+    assert order.quote_warehouse == "Warehouse 2"
+    assert order.rate_sheet_version and order.quoted_at
+    assert order_crud.get_order(db, "O1").quoted_rate == order.quoted_rate
+
+    # Orders without a manufacturer are stored unquoted
+    assert order_crud.create_order(db, make_order("O2", destination, manufacturer=None)).quoted_rate is None
+
+def test_quote_order_async_matches_quote_order(rate_service):
+    destination = rate_service.sheets["Warehouse 1"][2]
+    order = make_order("O1", destination, ship_from="Warehouse 1")
+
+    quoted = asyncio.run(order_crud.quote_order_async(order))
+    assert quoted.quoted_rate == order_crud.quote_order(order).quoted_rate
+    assert quoted.quote_warehouse == "Warehouse 1"
+
+def test_backfill_order_quotes(rate_service, db):
+    destinations = rate_service.sheets["Warehouse 1"]
+    for i, destination in enumerate(destinations[:5]):
+        db.add(OrderModel(
+            id=f"O{i}", customer_id="C1", customer_name="Customer", ship_from="Warehouse 1", ship_to=destination,
+            pickup_date=datetime(2025, 1, 6), status="pending", priority="medium", weight_kg=1000.0 * (i + 1),
+            special_requirements={}, manufacturer="Bench"
+        ))
+    db.add(OrderModel(
+        id="O9", customer_id="C1", customer_name="Customer", ship_from="Warehouse 1", ship_to="Nowhere At All",
+        pickup_date=datetime(2025, 1, 6), status="pending", priority="medium", weight_kg=1000.0,
+        special_requirements={}, manufacturer="Bench"
+    ))
+    db.commit()
+
+    assert order_crud.backfill_order_quotes(db) == {"checked": 6, "quoted": 5, "unquoted": 1}
+    assert order_crud.backfill_order_quotes(db) == {"checked": 1, "quoted": 0, "unquoted": 1}
+
+    compiled = rate_service.get_compiled_sheet("Bench", "Warehouse 1")
+    order = order_crud.get_order(db, "O2")
+    assert order.quoted_rate == compiled.quote(destinations[2], 3000.0 * LBS_PER_KG)
+    assert order.quote_destination == destinations[2]
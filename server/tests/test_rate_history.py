@@ -0,0 +1,187 @@
+import os
+import threading
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from unittest.mock import patch
+from server.models.rate_models import RateRequest
+from server.services.rate_history import RateHistory, RateSheetHistory
+from server.services.rate_index import CompiledRateSheet
+from server.services.rate_service import RateService
+from server.services.rate_snapshot import compile_rate_sheets
+
+CITIES = ['Winnipeg', 'Calgary', 'Regina']
+
+def compiled_sheet(rates, mtime):
+    return CompiledRateSheet.from_rows(CITIES, np.array([[rate] * 7 for rate in rates], dtype=np.float64), mtime, ['MB', 'AB', 'SK'])
+
+def rate_sheet(rates):
+    return pd.DataFrame({
+        'City': CITIES,
+        'Province': ['MB', 'AB', 'SK'],
+        'Zone': [1, 2, 3],
+        'Minimum': rates,
+        '2000': rates,
+        '5000': rates,
+        '10000': rates,
+        '20000': rates,
+        '40000': rates,
+        'Max': [9999.0] * 3
+    })
+
+def test_versions_share_unchanged_rows():
+    history = RateSheetHistory()
+    assert history.add_version(compiled_sheet([10.0, 20.0, 30.0], 1000.0), 1000.0)
+    assert not history.add_version(compiled_sheet([10.0, 20.0, 30.0], 1500.0), 1500.0)  # Unchanged
+    assert history.add_version(compiled_sheet([10.0, 25.0, 30.0], 2000.0), 2000.0)
+    assert history.add_version(compiled_sheet([10.0, 20.0, 30.0], 3000.0), 3000.0)  # Back to the first rates
+
+    # Only the changed row was added to the pool
+    assert len(history.cities) == 4
+    assert len(history.versions) == 3
+
+    assert history.version_at(500.0) == 0  # Before the first version: the earliest
+    assert history.version_at(1000.0) == 0
+    assert history.version_at(2999.0) == 1
+    assert history.version_at(5000.0) == 2
+    sheet = history.get_sheet(1)
+    assert sheet.quote('Calgary', 1000) == 250.0 and sheet.quote('Regina', 1000) == 300.0
+    assert sheet.mtime == 2000.0
+
+def test_history_is_persisted(tmp_path):
+    history = RateHistory(str(tmp_path))
+    assert history.record('IPCO', 1000.0, {'Winnipeg': compiled_sheet([10.0, 20.0, 30.0], 1000.0)}) == 1
+    assert history.record('IPCO', 2000.0, {'Winnipeg': compiled_sheet([11.0, 20.0, 30.0], 2000.0)}) == 1
+    assert history.record('IPCO', 2000.0, {'Winnipeg': compiled_sheet([11.0, 20.0, 30.0], 2000.0)}) == 0
+
+    reloaded = RateHistory(str(tmp_path))
+    assert [v['changed_rows'] for v in reloaded.get_versions('IPCO', 'Winnipeg')] == [3, 1]
+    assert reloaded.version_at('IPCO', 'Winnipeg', 1500.0) == 0
+    assert reloaded.version_at('IPCO', 'Winnipeg', 2500.0) is None  # Latest version: use the current sheet
+    assert reloaded.get_sheet('IPCO', 'Winnipeg', 0).quote('Winnipeg', 1000) == 100.0
+
+    # Versions recorded after a reload extend the persisted pool
+    assert reloaded.record('IPCO', 3000.0, {'Winnipeg': compiled_sheet([12.0, 20.0, 30.0], 3000.0)}) == 1
+    assert len(RateHistory(str(tmp_path)).get_versions('IPCO', 'Winnipeg')) == 3
+
+@patch('pandas.read_excel')
+def test_dated_requests_use_rates_in_effect_at_pickup(mock_read_excel, tmp_path):
+    path = tmp_path / "IPCO.xlsx"
+    path.write_bytes(b"")
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.history_dir = str(tmp_path / "history")
+    service.watcher_active = True
+
+    january = datetime(2025, 1, 1).timestamp()
+    os.utime(path, (january, january))
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet([10.0, 20.0, 30.0])}
+    service.reload_workbook('IPCO')
+
+    march = datetime(2025, 3, 1).timestamp()
+    os.utime(path, (march, march))
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet([10.0, 40.0, 30.0])}
+    assert service.reload_workbook('IPCO')['changed_sheets'] == 1
+
+    def request(pickup_date=None):
+        return RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000, pickup_date=pickup_date)
+
+    february, april = datetime(2025, 2, 10), datetime(2025, 4, 10)
+    assert service.calculate_rate(request()) == 400.0
+    assert service.calculate_rate(request(april)) == 400.0
+    assert service.calculate_rate(request(february)) == 200.0
+    assert service.calculate_rates([request(february), request(), request(april), request(february)]) == [200.0, 400.0, 400.0, 200.0]
+
+    quotes = service.quote_shipments([('IPCO', 'Winnipeg', 'Calgary', 1000)] * 2, [february, None])
+    assert [quote['rate'] for quote in quotes] == [200.0, 400.0]
+    assert quotes[0]['version'] < quotes[1]['version']
+
+@patch('pandas.read_excel')
+def test_versions_are_recorded_without_the_watcher(mock_read_excel, tmp_path):
+    path = tmp_path / "IPCO.xlsx"
+    path.write_bytes(b"")
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.history_dir = str(tmp_path / "history")
+
+    january = datetime(2025, 1, 1).timestamp()
+    os.utime(path, (january, january))
+    mock_read_excel.return_value = rate_sheet([10.0, 20.0, 30.0])
+    assert service.get_compiled_sheet('IPCO', 'Winnipeg').quote('Calgary', 1000) == 200.0
+
+    march = datetime(2025, 3, 1).timestamp()
+    os.utime(path, (march, march))
+    mock_read_excel.return_value = rate_sheet([10.0, 40.0, 30.0])
+    assert service.get_compiled_sheet('IPCO', 'Winnipeg').quote('Calgary', 1000) == 400.0
+
+    assert [v['changed_rows'] for v in service.rate_history.get_versions('IPCO', 'Winnipeg')] == [3, 1]
+    request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000, pickup_date=datetime(2025, 2, 10))
+    assert service.calculate_rate(request) == 200.0
+
+@pytest.mark.asyncio
+@patch('pandas.read_excel')
+async def test_dated_bulk_requests_read_the_history_off_the_event_loop(mock_read_excel, tmp_path):
+    path = tmp_path / "IPCO.xlsx"
+    path.write_bytes(b"")
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.history_dir = str(tmp_path / "history")
+    service.watcher_active = True
+
+    january = datetime(2025, 1, 1).timestamp()
+    os.utime(path, (january, january))
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet([10.0, 20.0, 30.0])}
+    service.reload_workbook('IPCO')
+    march = datetime(2025, 3, 1).timestamp()
+    os.utime(path, (march, march))
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet([10.0, 40.0, 30.0])}
+    service.reload_workbook('IPCO')
+
+    history = service.rate_history
+    threads = []
+    def on_thread(method):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+        return wrapper
+
+    with patch.object(history, 'version_at', on_thread(history.version_at)), \
+            patch.object(history, 'get_sheet', on_thread(history.get_sheet)):
+        requests = [
+            RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000, pickup_date=pickup_date)
+            for pickup_date in (datetime(2025, 2, 10), None, datetime(2025, 4, 10))
+        ]
+        assert await service.calculate_rates_async(requests) == [200.0, 400.0, 400.0]
+
+    assert threads and threading.main_thread() not in threads
+
+def test_snapshot_versions_are_recorded_by_the_compiling_process(tmp_path):
+    rate_sheets_dir = tmp_path / "rate_sheets"
+    rate_sheets_dir.mkdir()
+    path = rate_sheets_dir / "IPCO.xlsx"
+    rate_sheet([10.0, 20.0, 30.0]).to_excel(path, sheet_name='Winnipeg', index=False)
+    january = datetime(2025, 1, 1).timestamp()
+    os.utime(path, (january, january))
+    history_dir = str(tmp_path / "history")
+    compile_rate_sheets(str(rate_sheets_dir), str(tmp_path / "snapshot"), history_dir=history_dir)
+
+    service = RateService()
+    service.rate_sheets_dir = str(rate_sheets_dir)
+    service.snapshot_dir = str(tmp_path / "snapshot")
+    service.history_dir = history_dir
+    service.watcher_active = True
+
+    rate_sheet([10.0, 40.0, 30.0]).to_excel(path, sheet_name='Winnipeg', index=False)
+    march = datetime(2025, 3, 1).timestamp()
+    os.utime(path, (march, march))
+    assert service.reload_workbook('IPCO')['changed_sheets'] == 1
+
+    # The worker serving the snapshot kept no rows of its own; dated requests read the persisted history
+    assert service.rate_history.histories == {}
+    request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000, pickup_date=datetime(2025, 2, 10))
+    assert service.calculate_rate(request) == 200.0
+    assert [v['changed_rows'] for v in service.rate_history.get_versions('IPCO', 'Winnipeg')] == [3, 1]
@@ -1,8 +1,14 @@
 import pytest
+import time
+import asyncio
 import os
+import numpy as np
 import pandas as pd
 from unittest.mock import patch, MagicMock
-from server.services.rate_service import RateService
+from concurrent.futures import ThreadPoolExecutor
+from server.services.rate_service import TARIFF_CACHE_SIZE, RateService
+from server.services.rate_snapshot import compile_rate_sheets
+from server.services.rate_cache import LaneCache
 from server.models.rate_models import RateRequest
 
 # Mock Excel data
@@ -24,6 +30,8 @@ class TestRateService:
         service = RateService()
         # Override rate_sheets_dir to use test directory
         service.rate_sheets_dir = "./rate_sheets/"
+        # Always read the (mocked) Excel sheets rather than a compiled snapshot
+        service.snapshot_dir = None
         return service
     
     @patch('pandas.read_excel')
@@ -154,3 +162,220 @@ class TestRateService:
         assert matrix[0, 1] > 0  # Winnipeg to Calgary
         assert matrix[0, 2] > 0  # Winnipeg to Edmonton
         assert matrix[1, 2] > 0  # Calgary to Edmonton
+    
+    @pytest.mark.asyncio
+    async def test_distance_matrix_served_from_coordinate_cache(self, rate_service):
+        locations = ['Winnipeg', 'Calgary', 'Edmonton', 'Regina']
+        matrix = await rate_service.get_distance_matrix(locations)
+        
+        # Matches the pairwise calculation
+        for i, loc1 in enumerate(locations):
+            for j, loc2 in enumerate(locations):
+                expected = 0 if i == j else rate_service._calculate_distance(loc1, loc2)
+                assert matrix[i, j] == pytest.approx(expected)
+        
+        # A reordered subset is served from cached points, and unknown locations are unreachable
+        misses = rate_service.distance_cache.stats()['misses']
+        subset = await rate_service.get_distance_matrix(['Regina', 'Unknown', 'Winnipeg'])
+        assert rate_service.distance_cache.stats()['misses'] == misses
+        assert subset[0, 2] == matrix[3, 0]
+        assert subset[1, 1] == 0
+        assert np.isinf(subset[0, 1]) and np.isinf(subset[1, 2])
+    
+    @patch('pandas.read_excel')
+    def test_compiled_sheet_reused_until_mtime_changes(self, mock_read_excel, rate_service):
+        # Setup mock
+        mock_read_excel.return_value = mock_excel_data
+        
+        # Repeated quotes against the same sheet compile it once
+        request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='calgary ', weight=3000)
+        assert rate_service.calculate_rate(request) == 300.0
+        request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Edmonton', weight=8000)
+        assert rate_service.calculate_rate(request) == 400.0
+        assert mock_read_excel.call_count == 1
+        
+        # A newer workbook triggers a rebuild
+        compiled = rate_service.compiled_sheets[('IPCO', 'Winnipeg')]
+        compiled.mtime -= 1
+        rate_service.get_destinations('IPCO', 'Winnipeg')
+        assert mock_read_excel.call_count == 2
+        assert rate_service.compiled_sheets[('IPCO', 'Winnipeg')] is not compiled
+        
+        # Unknown destinations are not found
+        request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Unknown', weight=3000)
+        assert rate_service.calculate_rate(request) == 0.0
+    
+    @patch('pandas.read_excel')
+    def test_calculate_rates_matches_scalar_path(self, mock_read_excel, rate_service):
+        # Setup mock
+        mock_read_excel.return_value = mock_excel_data
+        
+        # Weights on and around every bracket boundary
+        weights = [0, 500, 1999.99, 2000, 3000, 4999.99, 5000, 8000, 9999.99, 10000, 15000, 19999.99, 20000, 25000]
+        requests = [
+            RateRequest(manufacturer=manufacturer, warehouse='Winnipeg', destination=destination, weight=weight)
+            for manufacturer in ['IPCO', 'Missing']
+            for destination in ['Winnipeg', 'Calgary', 'Edmonton', 'Unknown']
+            for weight in weights
+        ]
+        
+        # Test
+        rates = rate_service.calculate_rates(requests)
+        
+        # Verify
+        assert rates == [rate_service.calculate_rate(request) for request in requests]
+        assert rates[len(weights)] > 0
+        assert rates[-1] == 0.0
+    
+    def test_snapshot_serves_compiled_sheets(self, tmp_path):
+        # Build a small workbook and compile it into a snapshot
+        rate_sheets_dir = tmp_path / "rate_sheets"
+        rate_sheets_dir.mkdir()
+        with pd.ExcelWriter(rate_sheets_dir / "IPCO.xlsx") as writer:
+            mock_excel_data.to_excel(writer, sheet_name='Winnipeg', index=False)
+            mock_excel_data.head(1).to_excel(writer, sheet_name='Calgary', index=False)
+        snapshot = compile_rate_sheets(str(rate_sheets_dir), str(tmp_path / "snapshot"))
+        assert snapshot is not None
+        
+        service = RateService()
+        service.rate_sheets_dir = str(rate_sheets_dir)
+        service.snapshot_dir = str(tmp_path / "snapshot")
+        
+        # The snapshot answers without touching the workbook
+        with patch('pandas.read_excel') as mock_read_excel, patch('pandas.ExcelFile') as mock_excel_file:
+            assert service.get_warehouses('IPCO') == ['Winnipeg', 'Calgary']
+            assert service.get_destinations('IPCO', 'Calgary') == ['Winnipeg']
+            request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=3000)
+            assert service.calculate_rate(request) == 300.0
+            mock_read_excel.assert_not_called()
+            mock_excel_file.assert_not_called()
+        
+        # A workbook newer than the snapshot is read from Excel again
+        os.utime(rate_sheets_dir / "IPCO.xlsx", (0, 0))
+        with patch('pandas.read_excel', return_value=mock_excel_data) as mock_read_excel:
+            assert service.get_destinations('IPCO', 'Calgary') == ['Winnipeg', 'Calgary', 'Edmonton']
+            mock_read_excel.assert_called_once()
+    
+    def test_snapshot_is_memory_mapped_and_hot_swapped(self, tmp_path):
+        # Setup a compiled snapshot
+        rate_sheets_dir = tmp_path / "rate_sheets"
+        rate_sheets_dir.mkdir()
+        mock_excel_data.to_excel(rate_sheets_dir / "IPCO.xlsx", sheet_name='Winnipeg', index=False)
+        first = compile_rate_sheets(str(rate_sheets_dir), str(tmp_path / "snapshot"))
+        
+        service = RateService()
+        service.rate_sheets_dir = str(rate_sheets_dir)
+        service.snapshot_dir = str(tmp_path / "snapshot")
+        snapshot = service.get_snapshot()
+        assert isinstance(snapshot.rates, np.memmap)
+        assert not snapshot.rates.flags.writeable
+        
+        # Another process publishes a new version; it is picked up on the next check
+        second = compile_rate_sheets(str(rate_sheets_dir), str(tmp_path / "snapshot"), force=True)
+        assert second.version != first.version
+        service.snapshot_checked_at = float('-inf')
+        assert service.get_snapshot().version == second.version
+    
+    @patch('pandas.read_excel')
+    def test_lane_cache(self, mock_read_excel, rate_service):
+        # Setup mock
+        mock_read_excel.return_value = mock_excel_data
+        rate_service.lane_cache = LaneCache(max_size=1)
+        
+        # Lanes that have not been quoted are not cached
+        assert rate_service.get_cached_rate('IPCO', 'Winnipeg', 'Calgary', 3000) is None
+        
+        # Once quoted, the lane answers for any weight
+        request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000)
+        rate_service.calculate_rate(request)
+        assert rate_service.get_cached_rate('IPCO', 'Winnipeg', 'calgary', 3000) == 300.0
+        
+        # Quoting another lane evicts the least recently used one
+        request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Edmonton', weight=1000)
+        rate_service.calculate_rate(request)
+        assert rate_service.get_cached_rate('IPCO', 'Winnipeg', 'Calgary', 3000) is None
+        
+        stats = rate_service.get_cache_stats()
+        assert stats['size'] == 1
+        assert stats['hits'] == 1
+        assert stats['misses'] == 4
+        assert stats['evictions'] == 1
+    
+    @patch('pandas.read_excel')
+    def test_get_tariff_matrix(self, mock_read_excel, rate_service):
+        # Setup mock
+        mock_read_excel.return_value = mock_excel_data
+        weights = [1000, 3000, 8000, 15000, 25000]
+        
+        # Test
+        tariff = rate_service.get_tariff_matrix('IPCO', 'Winnipeg', weights)
+        
+        # Verify every cell matches a single quote
+        assert tariff['destinations'] == ['Winnipeg', 'Calgary', 'Edmonton']
+        assert tariff['weights'] == weights
+        for destination, rates in zip(tariff['destinations'], tariff['rates']):
+            for weight, rate in zip(weights, rates):
+                request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination=destination, weight=weight)
+                assert rate == rate_service.calculate_rate(request)
+        
+        # Repeated requests are served from the cache
+        assert rate_service.get_tariff_matrix('IPCO', 'Winnipeg', weights) is tariff
+        assert rate_service.get_tariff_matrix('Missing', 'Winnipeg', weights) is None
+    
+    @patch('pandas.read_excel')
+    def test_resolve_destination(self, mock_read_excel, rate_service):
+        # Setup mock
+        mock_read_excel.return_value = mock_excel_data
+        
+        # Exact, province-qualified and misspelled destinations
+        assert rate_service.resolve_destination('IPCO', 'Winnipeg', 'calgary').score == 1.0
+        assert rate_service.resolve_destination('IPCO', 'Winnipeg', 'CALGARY, AB').destination == 'Calgary'
+        match = rate_service.resolve_destination('IPCO', 'Winnipeg', 'Edmonten')
+        assert match.destination == 'Edmonton'
+        assert 0.5 <= match.score < 1.0
+        assert rate_service.resolve_destination('IPCO', 'Winnipeg', 'Unknown') is None
+        
+        # Fuzzy matches are priced like the canonical destination, in both paths
+        requests = [
+            RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination=destination, weight=3000)
+            for destination in ['Edmonton', 'Edmonten', 'edmonton, ab']
+        ]
+        rates = rate_service.calculate_rates(requests)
+        assert rates[0] > 0
+        assert rates == [rates[0]] * 3
+        assert [rate_service.calculate_rate(r) for r in requests] == rates
+    
+    @pytest.mark.asyncio
+    @patch('pandas.read_excel')
+    async def test_concurrent_async_requests_load_sheet_once(self, mock_read_excel, rate_service):
+        # Setup mock: a slow parse, so every request arrives while it is in flight
+        def slow_read_excel(*args, **kwargs):
+            time.sleep(0.2)
+            return mock_excel_data
+        mock_read_excel.side_effect = slow_read_excel
+        
+        # Test
+        requests = [
+            RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000 + i)
+            for i in range(50)
+        ]
+        rates = await asyncio.gather(*(rate_service.calculate_rate_async(r) for r in requests))
+        
+        # Verify one parse served all 50 awaiters, with the same rates as the sync path
+        assert mock_read_excel.call_count == 1
+        assert rates == [rate_service.calculate_rate(r) for r in requests]
+        assert await rate_service.calculate_rates_async(requests) == rates
+        assert rate_service.loads_in_flight == {}
+    
+    @patch('pandas.read_excel')
+    def test_tariff_cache_is_thread_safe(self, mock_read_excel, rate_service):
+        mock_read_excel.return_value = mock_excel_data
+        rate_service.get_compiled_sheet('IPCO', 'Winnipeg')
+        
+        # More weight grids than the cache holds, requested from many threads at once
+        grids = [[1000.0 * (i + 1)] for i in range(TARIFF_CACHE_SIZE * 2)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tariffs = list(executor.map(lambda grid: rate_service.get_tariff_matrix('IPCO', 'Winnipeg', grid), grids * 4))
+        
+        assert all(tariff is not None for tariff in tariffs)
+        assert len(rate_service.tariff_cache) == TARIFF_CACHE_SIZE
@@ -0,0 +1,136 @@
+import os
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from watchdog.events import FileModifiedEvent, FileMovedEvent
+from server.services import rate_snapshot
+from server.services.rate_service import RateService
+from server.services.rate_sheet_watcher import RateSheetHandler, RateSheetWatcher
+from server.models.rate_models import RateRequest
+
+def rate_sheet(rate):
+    return pd.DataFrame({
+        'City': ['Winnipeg', 'Calgary'],
+        'Province': ['MB', 'AB'],
+        'Zone': [1, 2],
+        'Minimum': [rate, rate],
+        '2000': [rate, rate],
+        '5000': [rate, rate],
+        '10000': [rate, rate],
+        '20000': [rate, rate],
+        '40000': [rate, rate],
+        'Max': [9999.0, 9999.0]
+    })
+
+@pytest.fixture
+def rate_service(tmp_path):
+    (tmp_path / "IPCO.xlsx").write_bytes(b"")
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    service.history_dir = None
+    return service
+
+@patch('pandas.read_excel')
+def test_reload_swaps_workbook_and_emits_event(mock_read_excel, rate_service):
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet(10.0)}
+    watcher = RateSheetWatcher(rate_service)
+    events = []
+    watcher.add_listener(events.append)
+    rate_service.watcher_active = True
+    
+    event = watcher.reload('IPCO')
+    assert event['manufacturer'] == 'IPCO'
+    assert event['sheets'] == 1
+    assert event['version'] and event['load_time_ms'] >= 0
+    assert events == [event]
+    assert list(rate_service.reload_events) == [event]
+    
+    request = RateRequest(manufacturer='IPCO', warehouse='Winnipeg', destination='Calgary', weight=1000)
+    assert rate_service.calculate_rate(request) == 100.0
+    
+    # While watching, requests never reload the workbook themselves, even after it changes on disk
+    path = os.path.join(rate_service.rate_sheets_dir, 'IPCO.xlsx')
+    os.utime(path, (0, 12345))
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet(20.0)}
+    assert rate_service.calculate_rate(request) == 100.0
+    assert mock_read_excel.call_count == 1
+    
+    # The next reload swaps the new version in and drops lanes cached from the old one
+    watcher.reload('IPCO')
+    assert rate_service.calculate_rate(request) == 200.0
+    
+    # Removing the workbook drops its sheets
+    os.remove(path)
+    assert watcher.reload('IPCO')['sheets'] == 0
+    assert rate_service.calculate_rate(request) == 0.0
+
+def test_handler_debounces_workbook_events(rate_service):
+    watcher = RateSheetWatcher(rate_service, debounce=60)
+    handler_events = [
+        FileModifiedEvent(os.path.join(rate_service.rate_sheets_dir, 'IPCO.xlsx')),
+        FileModifiedEvent(os.path.join(rate_service.rate_sheets_dir, 'IPCO.xlsx')),
+        FileModifiedEvent(os.path.join(rate_service.rate_sheets_dir, '~$IPCO.xlsx')),
+        FileModifiedEvent(os.path.join(rate_service.rate_sheets_dir, 'notes.txt')),
+        FileMovedEvent(
+            os.path.join(rate_service.rate_sheets_dir, 'tmp1234'),
+            os.path.join(rate_service.rate_sheets_dir, 'BASF.xlsx')
+        ),
+    ]
+    handler = RateSheetHandler(watcher)
+    for event in handler_events:
+        handler.on_any_event(event)
+    
+    try:
+        assert sorted(watcher.timers) == ['BASF', 'IPCO']
+    finally:
+        watcher.stop()
+    assert watcher.timers == {}
+
+@patch('pandas.read_excel')
+def test_workers_share_the_published_snapshot(mock_read_excel, tmp_path):
+    mock_read_excel.return_value = {'Winnipeg': rate_sheet(10.0)}
+    sheets_dir = tmp_path / "sheets"
+    sheets_dir.mkdir()
+    (sheets_dir / "IPCO.xlsx").write_bytes(b"")
+
+    def worker():
+        service = RateService()
+        service.rate_sheets_dir = str(sheets_dir)
+        service.snapshot_dir = str(tmp_path / "snapshot")
+        service.history_dir = None
+        service.watcher_active = True
+        return service
+    first, second = worker(), worker()
+
+    # The second worker reloads while the first holds the compile lock: it waits for the published snapshot
+    os.makedirs(first.snapshot_dir)
+    lock_path = os.path.join(first.snapshot_dir, rate_snapshot.LOCK_FILE)
+    open(lock_path, "w").close()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        waiting = executor.submit(second.reload_workbook, 'IPCO')
+        time.sleep(0.5)
+        assert not waiting.done()
+        os.remove(lock_path)
+        first_event = first.reload_workbook('IPCO')
+        second_event = waiting.result(timeout=10)
+
+    assert first_event['version'] == second_event['version']
+    for service in (first, second):
+        assert isinstance(service.compiled_sheets[('IPCO', 'Winnipeg')].rates, np.memmap)
+
+    # A worker that compiled on its own (the lock holder never published) switches once a snapshot appears
+    os.utime(sheets_dir / "IPCO.xlsx", (0, 12345))
+    open(lock_path, "w").close()
+    with patch('server.services.rate_service.SNAPSHOT_WAIT_TIMEOUT', 0.1):
+        event = second.reload_workbook('IPCO')
+    os.remove(lock_path)
+    assert not isinstance(second.compiled_sheets[('IPCO', 'Winnipeg')].rates, np.memmap)
+    assert first.reload_workbook('IPCO')['version'] == event['version']
+    second.snapshot_checked_at = float("-inf")
+    assert second.adopt_snapshot() == ['IPCO']
+    assert isinstance(second.compiled_sheets[('IPCO', 'Winnipeg')].rates, np.memmap)
+    assert second.adopt_snapshot() == []
@@ -0,0 +1,109 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server.api import rates
+from server.services import bulk_quoting
+from server.benchmarks.rate_sheet_generator import generate_workbook
+from server.services.rate_service import RateService
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    generate_workbook(str(tmp_path / "Bench.xlsx"), warehouses=2, destinations=40)
+    service = RateService()
+    service.rate_sheets_dir = str(tmp_path)
+    service.snapshot_dir = None
+    monkeypatch.setattr(rates, "rate_service", service)
+    
+    app = FastAPI()
+    app.include_router(rates.router, prefix="/api")
+    return TestClient(app)
+
+def test_metadata_endpoints_support_conditional_requests(client, tmp_path):
+    for path, key in [
+        ("/api/rates/manufacturers", "manufacturers"),
+        ("/api/rates/warehouses?manufacturer=Bench", "warehouses"),
+        ("/api/rates/destinations?manufacturer=Bench&warehouse=Warehouse%201", "destinations"),
+    ]:
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.json()[key]
+        etag = response.headers["etag"]
+        
+        # Clients holding the current version get a 304 by ETag or by date
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(path, headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": '"stale"'}).status_code == 200
+    
+    assert client.get("/api/rates/manufacturers").json() == {"manufacturers": ["Bench"]}
+    assert client.get("/api/rates/warehouses?manufacturer=Missing").status_code == 404
+    assert client.get("/api/rates/destinations?manufacturer=Bench&warehouse=Missing").status_code == 404
+
+def test_metadata_etag_changes_with_workbooks(client, tmp_path):
+    etag = client.get("/api/rates/manufacturers").headers["etag"]
+    
+    # A new workbook is picked up once the metadata is re-checked
+    generate_workbook(str(tmp_path / "Other.xlsx"), warehouses=1, destinations=10)
+    rates.rate_service.metadata_checked_at = float("-inf")
+    response = client.get("/api/rates/manufacturers", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"manufacturers": ["Bench", "Other"]}
+    assert response.headers["etag"] != etag
+
+def test_tariff_rejects_invalid_weights(client):
+    path = "/api/rates/tariff?manufacturer=Bench&warehouse=Warehouse%201"
+    response = client.get(f"{path}&min_weight=1000&max_weight=3000&step=1000")
+    assert response.status_code == 200
+    assert response.json()["weights"] == [1000, 2000, 3000]
+    
+    for query in ["max_weight=inf", "min_weight=nan", "step=nan", "step=inf", "min_weight=-1000",
+                  "weights=1000,nan", "weights=inf", "weights=-5", "weights=1000,abc"]:
+        assert client.get(f"{path}&{query}").status_code == 400, query
+
+def test_bulk_calculate_stream(client, monkeypatch):
+    monkeypatch.setattr(bulk_quoting, "BULK_CHUNK_SIZE", 2)  # Several chunks
+    destinations = client.get("/api/rates/destinations?manufacturer=Bench&warehouse=Warehouse%201").json()["destinations"]
+    requests = [
+        {"id": f"r{i}", "manufacturer": "Bench", "warehouse": "Warehouse 1", "destination": destination, "weight": 1000 * (i + 1)}
+        for i, destination in enumerate(destinations[:5])
+    ]
+    body = "\n".join(json.dumps(request) for request in requests[:3])
+    body += '\nnot json\n\n{"manufacturer": "Bench"}\n'
+    body += "\n".join(json.dumps(request) for request in requests[3:])
+    
+    response = client.post("/api/rates/bulk-calculate/stream", content=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    
+    expected = client.post("/api/rates/bulk-calculate", json={"requests": requests}).json()["rates"]
+    quoted = [result for result in results if "rate" in result]
+    assert [result["id"] for result in quoted] == [request["id"] for request in requests]
+    assert [result["rate"] for result in quoted] == expected
+    assert [result["line"] for result in results if "error" in result] == [4, 6]
+
+def test_autocomplete_follows_workbook_changes(client, tmp_path):
+    destinations = client.get("/api/rates/destinations?manufacturer=Bench&warehouse=Warehouse%201").json()["destinations"]
+    destination = destinations[0]
+    
+    response = client.get(f"/api/rates/autocomplete?q={destination[:3].lower()}&limit=50")
+    assert response.status_code == 200
+    suggestions = response.json()["suggestions"]
+    assert destination in [s["destination"] for s in suggestions]
+    assert all(s["destination"].lower().startswith(destination[:3].lower()) or
+               f" {destination[:3].lower()}" in s["destination"].lower() for s in suggestions)
+    
+    exact = client.get(f"/api/rates/autocomplete?q={destination}&limit=1").json()["suggestions"]
+    assert exact[0]["destination"] == destination
+    assert {"manufacturer": "Bench", "warehouse": "Warehouse 1"} in exact[0]["sheets"]
+    
+    # A new workbook is searchable once the metadata is re-checked
+    generate_workbook(str(tmp_path / "Other.xlsx"), warehouses=1, destinations=10, seed=7)
+    rates.rate_service.metadata_checked_at = float("-inf")
+    other = rates.rate_service.get_destinations("Other", "Warehouse 1")[0]
+    suggestions = client.get(f"/api/rates/autocomplete?q={other}&manufacturer=Other").json()["suggestions"]
+    assert suggestions[0]["destination"] == other
+    assert all(any(sheet["manufacturer"] == "Other" for sheet in s["sheets"]) for s in suggestions)
+    
+    assert client.get("/api/rates/autocomplete?q=&limit=5").json()["suggestions"] == []
+    assert client.get("/api/rates/autocomplete?q=a&limit=0").status_code == 422
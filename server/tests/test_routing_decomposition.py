@@ -0,0 +1,51 @@
+import asyncio
+import numpy as np
+import pytest
+from server.benchmarks.bench_optimization import make_instance
+from server.services.optimization_engine import OptimizationEngine
+from server.services.routing_decomposition import cluster_nodes, merge_solutions, route_cost, share_vehicles, split_problem
+from server.services.routing_model import RoutingProblem, shutdown_solver_pool, solve_routing
+
+@pytest.fixture(scope="module", autouse=True)
+def solver_pool():
+    yield
+    shutdown_solver_pool()
+
+def test_cluster_nodes_separates_regions():
+    # Two groups of points far apart on a line, with the depot between them
+    points = np.array([0, 1, 2, 3, 100, 101, 102, 50])
+    distance = np.abs(points[:, None] - points[None, :])
+
+    clusters = cluster_nodes(distance, range(7), 2)
+    assert sorted(map(sorted, clusters)) == [[0, 1, 2, 3], [4, 5, 6]]
+    assert sorted(cluster_nodes(distance, [1, 2], 5)) == [[1], [2]]
+
+def test_share_vehicles_is_proportional():
+    assert share_vehicles([60, 30, 10], 10) == [6, 3, 1]
+    assert share_vehicles([5, 5, 5], 3) == [1, 1, 1]
+    assert sum(share_vehicles([7, 4, 2], 8)) == 8
+    with pytest.raises(ValueError):
+        share_vehicles([1, 1, 1], 2)
+
+def test_merged_regions_cover_every_location():
+    distance, time, windows = make_instance(60, seed=5)
+    problem = RoutingProblem(distance, time, windows, num_vehicles=4, time_limit=1)
+    nodes = list(range(1, 60))
+    clusters = cluster_nodes(distance, nodes, 2)
+    subproblems = split_problem(problem, clusters, share_vehicles([len(cluster) for cluster in clusters], 4), 1)
+
+    merged = merge_solutions(problem, subproblems, [solve_routing(subproblem) for subproblem, _ in subproblems])
+    assert len(merged.routes) == 4
+    assert sorted(node for route in merged.routes for node in route) == nodes
+    assert merged.objective == route_cost(problem, merged.routes)
+
+def test_large_problems_are_solved_by_region():
+    distance, time, windows = make_instance(80, seed=8)
+    problem = RoutingProblem(distance, time, windows, num_vehicles=4, time_limit=2)
+    engine = OptimizationEngine()
+    engine.decomposition_threshold = 50
+    engine.decomposition_cluster_size = 40
+
+    solution = asyncio.run(engine.solve(problem))
+    assert sorted(node for route in solution.routes for node in route) == list(range(1, 80))
+    assert solution.objective <= route_cost(problem, solution.routes)
@@ -0,0 +1,208 @@
+import asyncio
+import numpy as np
+from datetime import datetime
+from unittest.mock import AsyncMock
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+from server.benchmarks.bench_optimization import build_callback_model, make_instance, run_benchmarks, solve
+from server.models.order_models import Order, Trailer, Truck
+from server.services.optimization_engine import OptimizationEngine
+from server.services.routing_model import (
+    STOP_PLATEAU, STOP_TIME_LIMIT, UNREACHABLE_DISTANCE, RoutingProblem, build_routing_model, insert_nodes, solve_routing, to_int_matrix
+)
+
+def test_to_int_matrix_rounds_and_caps_missing_arcs():
+    matrix = to_int_matrix([[0.4, 1.6, np.inf], [2.5, 0.0, np.nan], [3.49, 4.0, 7.0]], UNREACHABLE_DISTANCE)
+    assert matrix.dtype == np.int64
+    assert matrix.tolist() == [[0, 2, UNREACHABLE_DISTANCE], [2, 0, UNREACHABLE_DISTANCE], [3, 4, 0]]
+
+def test_time_windows_are_applied_per_location():
+    # Node 2 is closest to the depot but its window closes before node 1 can be served first
+    distance = np.array([[0, 10, 5], [10, 0, 5], [5, 5, 0]]) * 1000
+    time = np.array([[0, 100, 300], [100, 0, 10], [300, 10, 0]])
+    manager, routing = build_routing_model(distance, time, [(0, 1440), (0, 120), (0, 1440)], num_vehicles=1)
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    solution = routing.SolveWithParameters(search_parameters)
+
+    index = solution.Value(routing.NextVar(routing.Start(0)))
+    assert manager.IndexToNode(index) == 1
+
+def test_matrix_model_matches_callback_model():
+    distance, time, windows = make_instance(30, seed=3)
+    assert solve(build_routing_model(distance, time, windows, 3))["objective"] == solve(build_callback_model(distance, time, windows, 3))["objective"]
+
+    results = run_benchmarks(sizes=[20], vehicles=2, time_limit=0, repeat=1)
+    assert set(results["20"]) == {"callback", "matrix", "engine", "job", "speedup", "engine_speedup", "job_speedup"}
+    assert results["20"]["callback"]["objective"] == results["20"]["matrix"]["objective"] == results["20"]["engine"]["objective"] == results["20"]["job"]["objective"]
+
+def test_fallback_matrices_are_in_metres_and_minutes():
+    engine = OptimizationEngine()
+    engine.google_maps.get_route_matrix = AsyncMock(side_effect=RuntimeError("no API key"))
+    engine.rate_service.get_distance_matrix = AsyncMock(return_value=np.array([[0.0, 120.0, np.inf], [120.0, 0.0, np.inf], [np.inf, np.inf, 0.0]]))
+    engine._get_weather_adjustments = AsyncMock(return_value=[0.0, 0.3, 0.0])
+
+    trucks = [Truck(id="T1", name="Truck 1", driver="D", current_hours=0, max_hours=11, warehouse="Winnipeg")]
+    orders = [Order(id="O1", customer_id="C", customer_name="C", ship_from="Brandon", ship_to="Atlantis",
+                    pickup_date=datetime(2025, 1, 1), weight_kg=1000, priority="high")]
+    distance, time, windows = asyncio.run(engine._create_distance_matrix(orders, trucks))
+
+    assert distance[0, 1] == 120000 and distance[1, 2] == UNREACHABLE_DISTANCE
+    assert time[0, 1] == 156 and time[1, 0] == 120  # 60 km/h, 30% longer into snow at Brandon
+    assert windows == [(0, 1440), (0, 240), (0, 1440)]
+
+def test_insert_nodes_respects_time_windows():
+    distance = np.array([[0, 10, 10, 1], [10, 0, 1, 10], [10, 1, 0, 10], [1, 10, 10, 0]]) * 1000
+    time = np.array([[0, 100, 100, 5], [100, 0, 5, 100], [100, 5, 0, 100], [5, 100, 100, 0]])
+    windows = [(0, 1440), (0, 1440), (0, 104), (0, 1440)]
+
+    # Node 3 is cheapest right after the depot, but that pushes node 2 past its window
+    assert insert_nodes([[2, 1]], [3], distance, time, windows) == [[2, 1, 3]]
+    assert insert_nodes([[1]], [2], distance, time, [(0, 1440), (0, 1440), (0, 50), (0, 1440)]) is None  # Unreachable in time
+
+def test_re_plans_start_from_the_accepted_plan():
+    engine = OptimizationEngine()
+    trucks = [Truck(id=f"T{i}", name="Truck", driver="D", current_hours=0, max_hours=11, warehouse="Depot") for i in range(2)]
+    engine.samsara.get_available_trucks = AsyncMock(return_value=trucks)
+    engine.samsara.get_available_trailers = AsyncMock(return_value=[Trailer(id="TR1", name="Trailer", max_weight_kg=20000, has_pallet_jack=True, warehouse="Depot")])
+    distance, time, _ = make_instance(7, seed=5)
+    names = ["Depot", "A", "B", "C", "D", "E", "F"]
+    engine._create_distance_matrix = AsyncMock(side_effect=lambda orders, trucks: (
+        distance[np.ix_(*[[names.index(l) for l in engine._get_locations(orders, trucks)]] * 2)],
+        time[np.ix_(*[[names.index(l) for l in engine._get_locations(orders, trucks)]] * 2)],
+        [(0, 1440)] * len(engine._get_locations(orders, trucks))
+    ))
+
+    def order(order_id, ship_from, ship_to):
+        return Order(id=order_id, customer_id="C", customer_name="C", ship_from=ship_from, ship_to=ship_to,
+                     pickup_date=datetime(2025, 1, 1), weight_kg=1000)
+
+    orders = [order("O1", "A", "B"), order("O2", "C", "D")]
+    problem, _, _ = asyncio.run(engine.prepare_problem(orders))
+    assert problem.initial_routes is None and problem.time_limit == engine.get_time_limit(5)
+    engine.record_plan(problem, solve_routing(problem), trucks)
+
+    # O2 moved its delivery to E and O3 was added: D is dropped, E and F are inserted
+    problem, _, _ = asyncio.run(engine.prepare_problem([order("O1", "A", "B"), order("O2", "C", "E"), order("O3", "A", "F")]))
+    assert problem.locations == ["Depot", "A", "C", "B", "E", "F"]
+    assert sorted(node for route in problem.initial_routes for node in route) == [1, 2, 3, 4, 5]
+    assert problem.time_limit == min(engine.get_time_limit(6), engine.warm_start_time_limit)
+    assert solve_routing(problem) is not None
+
+    problem, _, _ = asyncio.run(engine.prepare_problem(orders, warm_start=False))
+    assert problem.initial_routes is None
+
+def test_time_limit_grows_with_the_problem():
+    engine = OptimizationEngine()
+    engine.min_optimization_time, engine.optimization_time_per_location, engine.max_optimization_time = 2, 0.1, 30
+    assert [engine.get_time_limit(locations) for locations in (3, 100, 1000)] == [2, 10, 30]
+
+def test_search_stops_when_the_objective_plateaus():
+    distance, time, windows = make_instance(100, seed=2)
+    problem = RoutingProblem(distance, time, windows, num_vehicles=4, time_limit=60, local_search_metaheuristic="GUIDED_LOCAL_SEARCH",
+                             plateau_improvement=0.5, plateau_time=0.5)
+    solution = solve_routing(problem)
+    assert solution.stop_reason == STOP_PLATEAU and solution.solve_time < 10
+    assert solution.improvements[-1][1] == solution.objective
+    assert all(a[1] > b[1] for a, b in zip(solution.improvements, solution.improvements[1:]))
+
+    solution = solve_routing(problem._replace(time_limit=1, plateau_time=0))
+    assert solution.stop_reason == STOP_TIME_LIMIT
+
+def test_small_batches_are_inserted_into_the_current_plan():
+    engine = OptimizationEngine()
+    trucks = [Truck(id=f"T{i}", name="Truck", driver="D", current_hours=0, max_hours=11, warehouse="Depot") for i in range(2)]
+    engine.samsara.get_available_trucks = AsyncMock(return_value=trucks)
+    engine.samsara.get_available_trailers = AsyncMock(return_value=[Trailer(id="TR1", name="Trailer", max_weight_kg=20000, has_pallet_jack=True, warehouse="A")])
+    distance, time, _ = make_instance(8, seed=5)
+    names = ["Depot", "A", "B", "C", "D", "E", "F", "Atlantis"]
+    engine._create_distance_matrix = AsyncMock(side_effect=lambda orders, trucks: (
+        distance[np.ix_(*[[names.index(l) for l in engine._get_locations(orders, trucks)]] * 2)],
+        time[np.ix_(*[[names.index(l) for l in engine._get_locations(orders, trucks)]] * 2)],
+        [(0, 1440)] * len(engine._get_locations(orders, trucks))
+    ))
+    km = distance / 1000.0
+    km[names.index("Atlantis"), :] = km[:, names.index("Atlantis")] = np.inf
+    engine.rate_service.get_distance_matrix = AsyncMock(side_effect=lambda locations: km[np.ix_(*[[names.index(l) for l in locations]] * 2)])
+
+    def order(order_id, ship_from, ship_to):
+        return Order(id=order_id, customer_id="C", customer_name="C", ship_from=ship_from, ship_to=ship_to,
+                     pickup_date=datetime(2025, 1, 1), weight_kg=1000, quoted_rate=5000.0)
+
+    assert asyncio.run(engine.insert_orders([order("O1", "A", "B")])) is None  # No plan yet
+    plan = asyncio.run(engine.plan_assignments([order("O1", "A", "B"), order("O2", "C", "D")], fast_path=False))
+    assert engine.samsara.get_available_trucks.await_count == 1
+    assert asyncio.run(engine.insert_orders([order("O3", "A", "F")])) is None  # Not applied, so not the plan yet
+    engine.accept_plan(plan)
+    assert set(engine.route_plans["Depot"]) == {assignment.truck_id for assignment in plan.assignments}
+
+    # F is new: it gets distances from the rate service and is inserted without fetching the fleet or solving
+    engine.solve = AsyncMock(side_effect=AssertionError("solved"))
+    plan = asyncio.run(engine.plan_assignments([order("O3", "A", "F")]))
+    assignments = plan.assignments
+    assert [(a.order_id, a.trailer_id) for a in assignments] == [("O3", "TR1")]
+    # Nothing changes until the insertion is accepted
+    assert "F" not in str(engine.route_plans)
+    assert engine.plan_contexts["Depot"].trailers[0].current_weight_kg == 1000
+    engine.accept_plan(plan)
+    assert engine.plan_contexts["Depot"].trailers[0].current_weight_kg == 2000
+    assert engine.plan_contexts["Depot"].hitches == {assignments[0].truck_id: "TR1"}
+    assert engine.samsara.get_available_trucks.await_count == 1
+    plan = engine.route_plans["Depot"]
+    assert "F" in plan[assignments[0].truck_id] and sorted(l for route in plan.values() for l in route) == ["A", "B", "C", "D", "F"]
+
+    # An unreachable location fits nowhere, so the full optimization runs
+    assert asyncio.run(engine.insert_orders([order("O4", "A", "Atlantis")])) is None
+    engine.solve = AsyncMock(return_value=None)
+    asyncio.run(engine.optimize_assignments([order("O4", "A", "Atlantis")]))
+    engine.solve.assert_awaited_once()
+
+    # Orders go to the plan of the depot whose locations include their pickups
+    engine.plan_contexts["North"] = engine.plan_contexts["Depot"]._replace(
+        problem=engine.plan_contexts["Depot"].problem._replace(locations=["North", "G"])
+    )
+    assert engine._orders_depot([order("O5", "A", "B")]) == "Depot"
+    assert engine._orders_depot([order("O5", "G", "B")]) == "North"
+    assert engine._orders_depot([order("O5", "A", "B"), order("O6", "G", "B")]) is None
+    assert engine._orders_depot([order("O5", "Nowhere", "B")]) is None
+
+def test_inserted_orders_keep_to_their_truck_trailer():
+    engine = OptimizationEngine()
+    trucks = [Truck(id=f"T{i}", name="Truck", driver="D", current_hours=0, max_hours=11, warehouse="Depot") for i in range(2)]
+    trailers = [Trailer(id=f"TR{i}", name="Trailer", max_weight_kg=5000, has_pallet_jack=True, warehouse="A") for i in range(2)]
+    order = Order(id="O1", customer_id="C", customer_name="C", ship_from="A", ship_to="B", pickup_date=datetime(2025, 1, 1), weight_kg=3000)
+
+    hitches = {"T1": "TR0"}
+    assert engine._find_truck_trailer(order, trucks[1], trailers, hitches).id == "TR0"
+    assert engine._find_truck_trailer(order, trucks[0], trailers, hitches).id == "TR1"  # TR0 is T1's
+    trailers[1].current_weight_kg = 3000
+    assert engine._find_truck_trailer(order, trucks[0], trailers, hitches) is None  # TR1 is too full
+
+def test_inserted_locations_are_scaled_to_road_times():
+    engine = OptimizationEngine()
+    engine.max_optimization_time = 1
+    trucks = [Truck(id="T0", name="Truck", driver="D", current_hours=0, max_hours=11, warehouse="Depot")]
+    engine.samsara.get_available_trucks = AsyncMock(return_value=trucks)
+    engine.samsara.get_available_trailers = AsyncMock(return_value=[Trailer(id="TR1", name="Trailer", max_weight_kg=20000, has_pallet_jack=True, warehouse="A")])
+    # Locations on a line (km); the plan's roads are 20% longer than straight lines, driven at 30 km/h
+    names = ["Depot", "A", "B", "Near", "Far"]
+    km = np.abs(np.subtract.outer(*[np.array([0.0, 100.0, 200.0, 300.0, 1000.0])] * 2))
+    index = lambda locations: np.ix_(*[[names.index(l) for l in locations]] * 2)
+    engine._create_distance_matrix = AsyncMock(side_effect=lambda orders, trucks: (
+        to_int_matrix(km[index(engine._get_locations(orders, trucks))] * 1200, UNREACHABLE_DISTANCE),
+        to_int_matrix(km[index(engine._get_locations(orders, trucks))] * 2, UNREACHABLE_DISTANCE),
+        [(0, 1440)] * len(engine._get_locations(orders, trucks))
+    ))
+    engine.rate_service.get_distance_matrix = AsyncMock(side_effect=lambda locations: km[index(locations)])
+
+    def order(order_id, ship_from, ship_to):
+        return Order(id=order_id, customer_id="C", customer_name="C", ship_from=ship_from, ship_to=ship_to,
+                     pickup_date=datetime(2025, 1, 1), weight_kg=1000, quoted_rate=5000.0)
+
+    engine.accept_plan(asyncio.run(engine.plan_assignments([order("O1", "A", "B")], fast_path=False)))
+
+    # Far is 1000 km away: 1000 minutes at 60 km/h, within its window, but 2000 on the plan's roads
+    assert asyncio.run(engine.insert_orders([order("O2", "A", "Far")])) is None
+    plan = asyncio.run(engine.insert_orders([order("O3", "A", "Near")]))
+    near = plan.problem.locations.index("Near")
+    assert plan.problem.time_matrix[0, near] == 600 and plan.problem.distance_matrix[0, near] == 360000